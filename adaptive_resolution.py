@@ -0,0 +1,128 @@
+"""
+Tamaño de entrada dinámico por frame
+Elige el imgsz de cada frame entre unos pocos tamaños ya calentados según
+lo grande que se ve el cubo seguido y la latencia reciente frente a un
+objetivo. Con histéresis para que el tamaño no salte de un frame a otro:
+subir de resolución es rápido (perder un cubo es peor), bajar es lento.
+"""
+
+
+class AdaptiveResolution:
+    """
+    Selector de imgsz con histéresis
+
+    Args:
+        sizes: Tamaños permitidos (múltiplos de 32)
+        target_ms: Latencia de inferencia objetivo por frame
+        min_object_px: Lado mínimo que debe tener el cubo a la entrada del modelo
+        up_patience: Frames seguidos pidiendo más resolución antes de subir
+        down_patience: Frames seguidos pidiendo menos resolución antes de bajar
+        margin: El cubo debe superar min_object_px * margin para permitir bajar
+        ema_alpha: Peso de la última medición en la latencia media por tamaño
+        stale_frames: Pasados estos frames sin usar un tamaño, su latencia se
+            estima desde la del tamaño actual (el coste crece con el área)
+    """
+
+    def __init__(self, sizes=(320, 480, 640), target_ms=50.0, min_object_px=48,
+                 up_patience=2, down_patience=15, margin=1.3, ema_alpha=0.2, stale_frames=150):
+        self.sizes = sorted(sizes)
+        self.target_ms = target_ms
+        self.min_object_px = min_object_px
+        self.up_patience = up_patience
+        self.down_patience = down_patience
+        self.margin = margin
+        self.ema_alpha = ema_alpha
+        self.stale_frames = stale_frames
+        # Sin cubo seguido buscamos con el tamaño más grande
+        self.current = self.sizes[-1]
+        self.latency = {size: None for size in self.sizes}
+        self.measured_at = {size: 0 for size in self.sizes}
+        self.frame_count = 0
+        self._pending = None
+        self._pending_count = 0
+
+    def warmup(self, run, repeats=2):
+        """
+        Ejecuta cada tamaño unas veces para que la primera inferencia real no sea lenta
+
+        Args:
+            run: Función que recibe un imgsz y hace una inferencia
+        """
+        import time
+
+        for size in self.sizes:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                run(size)
+                self._record(size, (time.perf_counter() - start) * 1000)
+
+    def _record(self, size, latency_ms):
+        old = self.latency[size]
+        self.latency[size] = latency_ms if old is None else \
+            old + self.ema_alpha * (latency_ms - old)
+        self.measured_at[size] = self.frame_count
+
+    def expected_latency(self, size):
+        """Latencia esperada de un tamaño (None si no se sabe)"""
+        latency = self.latency[size]
+        current = self.latency[self.current]
+        stale = self.frame_count - self.measured_at[size] > self.stale_frames
+        if (latency is None or stale) and current is not None and size != self.current:
+            # La carga de la máquina cambió desde la medición: escalamos la actual
+            return current * (size / self.current) ** 2
+        return latency
+
+    def _fits_budget(self, size):
+        latency = self.expected_latency(size)
+        return latency is None or latency <= self.target_ms
+
+    def desired_size(self, object_px, frame_side):
+        """
+        Tamaño que pediría este frame sin histéresis
+
+        Args:
+            object_px: Lado del cubo seguido más pequeño en píxeles del frame (None = ninguno)
+            frame_side: Lado mayor del frame (el letterbox escala por este lado)
+        """
+        affordable = [size for size in self.sizes if self._fits_budget(size)] or self.sizes[:1]
+
+        if object_px is None:
+            # Buscando: la mayor resolución que la latencia permite
+            return affordable[-1]
+
+        for size in affordable:
+            scaled = object_px * size / frame_side
+            # Para quedarnos en el tamaño actual basta el mínimo; para bajar hace falta margen
+            needed = self.min_object_px if size >= self.current else self.min_object_px * self.margin
+            if scaled >= needed:
+                return size
+        return affordable[-1]
+
+    def update(self, latency_ms, object_px, frame_side):
+        """
+        Registra la latencia del frame y decide el imgsz del siguiente
+
+        Returns:
+            int: imgsz para el siguiente frame
+        """
+        self.frame_count += 1
+        self._record(self.current, latency_ms)
+        desired = self.desired_size(object_px, frame_side)
+
+        if desired == self.current:
+            self._pending, self._pending_count = None, 0
+            return self.current
+
+        if desired != self._pending:
+            self._pending, self._pending_count = desired, 0
+        self._pending_count += 1
+
+        patience = self.up_patience if desired > self.current else self.down_patience
+        # Pasarse del presupuesto cuenta como urgente: bajamos sin esperar tanto
+        if desired < self.current and not self._fits_budget(self.current):
+            patience = self.up_patience
+
+        if self._pending_count >= patience:
+            self.current = desired
+            self._pending, self._pending_count = None, 0
+        return self.current
@@ -0,0 +1,313 @@
+"""
+Módulo para descubrir cámaras en paralelo y guardar un inventario en disco
+Así CameraHandler puede abrir una cámara por nombre sin probar índice por índice
+"""
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+import cv2
+
+from capture_format import fourcc_text
+
+
+# Archivo donde guardamos el inventario de cámaras
+INVENTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "camera_inventory.json")
+
+# Cuántos índices probar cuando no existe /dev/video* (Windows)
+MAX_INDEX = 20
+
+# Tiempo máximo para probar cada cámara (segundos)
+PROBE_TIMEOUT = 3.0
+
+
+def list_video_devices():
+    """
+    Lista los dispositivos de video candidatos
+
+    Returns:
+        list: Rutas /dev/videoN en Linux, o índices 0..MAX_INDEX-1 en otros sistemas
+    """
+    paths = glob.glob("/dev/video*")
+    if paths:
+        # Ordenamos numéricamente: video2 antes que video10
+        return sorted(paths, key=lambda p: int(re.sub(r"\D", "", p) or 0))
+    return list(range(MAX_INDEX))
+
+
+def read_device_identity(device):
+    """
+    Lee la identidad de un dispositivo desde sysfs (sin abrir la cámara)
+
+    Args:
+        device: Ruta /dev/videoN o índice
+
+    Returns:
+        dict: name, usb_id (vendor:product), serial y bus (vacíos si no se conocen)
+    """
+    identity = {'name': '', 'usb_id': '', 'serial': '', 'bus': ''}
+
+    if isinstance(device, int):
+        identity['name'] = f"index {device}"
+        return identity
+
+    sys_dir = f"/sys/class/video4linux/{os.path.basename(device)}"
+    identity['name'] = _read_text(os.path.join(sys_dir, "name"))
+
+    # Subimos por el árbol del dispositivo hasta encontrar el nodo USB
+    node = os.path.realpath(os.path.join(sys_dir, "device"))
+    while node and node != "/":
+        vendor = _read_text(os.path.join(node, "idVendor"))
+        if vendor:
+            product = _read_text(os.path.join(node, "idProduct"))
+            identity['usb_id'] = f"{vendor}:{product}"
+            identity['serial'] = _read_text(os.path.join(node, "serial"))
+            identity['bus'] = os.path.basename(node)
+            break
+        node = os.path.dirname(node)
+
+    return identity
+
+
+def device_key(device, identity):
+    """Clave del inventario: ruta del dispositivo + identidad USB"""
+    return f"{device}|{identity['usb_id']}|{identity['serial']}"
+
+
+def probe_device(device):
+    """
+    Abre una cámara, lee un frame y anota sus capacidades
+
+    Args:
+        device: Ruta /dev/videoN o índice
+
+    Returns:
+        dict: Información de la cámara (status 'ok', 'no_frames' o 'closed')
+    """
+    info = {
+        'device': device,
+        'identity': read_device_identity(device),
+        'status': 'closed',
+        'width': 0,
+        'height': 0,
+        'fps': 0.0,
+        'fourcc': '',
+        'formats': [],
+        'probed_at': time.time(),
+    }
+
+    if isinstance(device, int):
+        cap = cv2.VideoCapture(device)
+    else:
+        cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
+
+    try:
+        if not cap.isOpened():
+            return info
+
+        # Intentamos leer un frame para confirmar que funciona
+        ret, _ = cap.read()
+        info['status'] = 'ok' if ret else 'no_frames'
+        info['width'] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        info['height'] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        info['fps'] = cap.get(cv2.CAP_PROP_FPS)
+        info['fourcc'] = fourcc_text(cap.get(cv2.CAP_PROP_FOURCC))
+    finally:
+        cap.release()
+
+    info['formats'] = list_formats(device)
+    if not info['formats'] and info['fourcc']:
+        info['formats'] = [{'fourcc': info['fourcc'], 'sizes': [[info['width'], info['height']]]}]
+
+    return info
+
+
+def list_formats(device):
+    """
+    Lista los formatos soportados usando v4l2-ctl (si está instalado)
+
+    Returns:
+        list: [{'fourcc': 'MJPG', 'sizes': [[1280, 720], ...]}, ...]
+    """
+    if isinstance(device, int) or shutil.which("v4l2-ctl") is None:
+        return []
+
+    try:
+        output = subprocess.run(
+            ["v4l2-ctl", "--device", str(device), "--list-formats-ext"],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT
+        ).stdout
+    except (subprocess.TimeoutExpired, OSError):
+        return []
+
+    formats = []
+    for line in output.splitlines():
+        # Ejemplo: [0]: 'MJPG' (Motion-JPEG, compressed)
+        match = re.search(r"\[\d+\]: '(\w+)'", line)
+        if match:
+            formats.append({'fourcc': match.group(1), 'sizes': []})
+            continue
+        # Ejemplo: Size: Discrete 1280x720
+        match = re.search(r"Size: \w+ (\d+)x(\d+)", line)
+        if match and formats:
+            formats[-1]['sizes'].append([int(match.group(1)), int(match.group(2))])
+
+    return formats
+
+
+def discover_cameras(devices=None, timeout=PROBE_TIMEOUT):
+    """
+    Prueba todas las cámaras en paralelo, cada una con su propio tiempo límite
+
+    Una cámara que no responde no bloquea a las demás: si supera el tiempo
+    se marca como 'timeout' y su hilo se abandona.
+
+    Args:
+        devices: Lista de dispositivos (None = todos los encontrados)
+        timeout: Segundos máximos por dispositivo
+
+    Returns:
+        list: Información de cada dispositivo (ver probe_device)
+    """
+    if devices is None:
+        devices = list_video_devices()
+
+    results = {}
+
+    def worker(device):
+        try:
+            results[device] = probe_device(device)
+        except Exception as e:
+            results[device] = {'device': device, 'identity': read_device_identity(device),
+                               'status': f'error: {e}'}
+
+    # Hilos daemon: si una cámara se cuelga no impide cerrar el programa
+    threads = []
+    for device in devices:
+        thread = threading.Thread(target=worker, args=(device,), daemon=True)
+        thread.start()
+        threads.append((device, thread))
+
+    # Todas corren a la vez, así que el tiempo total es ~timeout y no N * timeout
+    deadline = time.monotonic() + timeout
+    inventory = []
+    for device, thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if device in results:
+            inventory.append(results[device])
+        else:
+            inventory.append({'device': device, 'identity': read_device_identity(device),
+                              'status': 'timeout'})
+
+    return inventory
+
+
+def load_inventory(path=INVENTORY_PATH):
+    """Carga el inventario guardado (dict vacío si no existe)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_inventory(inventory, path=INVENTORY_PATH):
+    """Guarda el inventario en disco"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(inventory, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def get_inventory(refresh=False, timeout=PROBE_TIMEOUT, path=INVENTORY_PATH):
+    """
+    Retorna el inventario de cámaras, probando solo los dispositivos nuevos
+
+    Un dispositivo se vuelve a probar si no está en el caché o si su identidad
+    USB cambió (por ejemplo, se conectó otra cámara en el mismo /dev/videoN).
+
+    Args:
+        refresh: Si es True vuelve a probar todos los dispositivos
+        timeout: Segundos máximos por dispositivo
+
+    Returns:
+        dict: {clave: info} con la clave de device_key()
+    """
+    cached = {} if refresh else load_inventory(path)
+
+    current = {}
+    pending = []
+    for device in list_video_devices():
+        key = device_key(device, read_device_identity(device))
+        if key in cached and cached[key].get('status') == 'ok':
+            current[key] = cached[key]
+        else:
+            pending.append(device)
+
+    if pending:
+        for info in discover_cameras(pending, timeout):
+            current[device_key(info['device'], info['identity'])] = info
+
+    if current != cached:
+        save_inventory(current, path)
+
+    return current
+
+
+def resolve_camera(name, timeout=PROBE_TIMEOUT, path=INVENTORY_PATH):
+    """
+    Busca una cámara por nombre (o por usb_id vendor:product)
+
+    Primero mira el inventario guardado; solo si no la encuentra hace
+    un barrido de dispositivos.
+
+    Args:
+        name: Parte del nombre, por ejemplo "FaceCam 1000X"
+
+    Returns:
+        Ruta o índice del dispositivo, o None si no se encontró
+    """
+    device = _find_in_inventory(load_inventory(path), name, check_identity=True)
+    if device is not None:
+        return device
+
+    return _find_in_inventory(get_inventory(timeout=timeout, path=path), name)
+
+
+def _find_in_inventory(inventory, name, check_identity=False):
+    """Busca la primera cámara funcional cuyo nombre o usb_id coincida"""
+    wanted = name.lower()
+    for key, info in sorted(inventory.items()):
+        if info.get('status') != 'ok':
+            continue
+
+        identity = info.get('identity', {})
+        if wanted not in identity.get('name', '').lower() and wanted != identity.get('usb_id', ''):
+            continue
+
+        device = info['device']
+        # Confirmamos que el dispositivo sigue siendo la misma cámara
+        if check_identity:
+            if not isinstance(device, int) and not os.path.exists(device):
+                continue
+            if device_key(device, read_device_identity(device)) != key:
+                continue
+        return device
+
+    return None
+
+
+def _read_text(path):
+    """Lee un archivo de sysfs (cadena vacía si no existe)"""
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
@@ -1,74 +1,104 @@
 """
 Módulo para manejar la captura de video de la webcam
 """
-import cv2
+from frame_sources import open_source, PACING_REALTIME
+from camera_discovery import resolve_camera
+import config
 
 
 class CameraHandler:
-    def __init__(self, camera_index=0):
+    def __init__(self, camera_index=0, pacing=PACING_REALTIME, loop=False, camera_name=None):
         """
         Inicializa la cámara web
-        
+
         Args:
-            camera_index: Índice de la cámara (0 por defecto)
+            camera_index: Índice de la cámara (0 por defecto) o cualquier
+                fuente aceptada por frame_sources.open_source (ruta /dev/videoN,
+                "libcamera:2", archivo de video o carpeta de imágenes)
+            pacing: Velocidad de reproducción para fuentes grabadas
+            loop: Repetir las fuentes grabadas al terminar
+            camera_name: Nombre de la cámara a buscar en el inventario
+                (tiene prioridad sobre camera_index)
         """
         # Guardamos el índice de la cámara que vamos a usar
         self.camera_index = camera_index
-        
+        self.pacing = pacing
+        self.loop = loop
+        self.camera_name = camera_name
+
         # Al inicio, la cámara no está abierta
-        self.cap = None
-        
+        self.source = None
+
     def start(self):
         """Inicia la captura de video"""
-        # Intentamos abrir la cámara con OpenCV
-        # Primero intentamos con el índice
-        self.cap = cv2.VideoCapture(self.camera_index)
+        # Si nos dieron un nombre, buscamos el dispositivo en el inventario
+        if self.camera_name:
+            device = resolve_camera(self.camera_name)
+            if device is None:
+                raise Exception(f"No se encontró la cámara '{self.camera_name}'")
+            print(f"Cámara '{self.camera_name}' encontrada en {device}")
+            self.camera_index = device
         
-        # Si no funciona con el índice, intentamos con la ruta directa
-        if not self.cap.isOpened():
-            print(f"No se pudo abrir con índice {self.camera_index}, intentando con ruta directa...")
-            # Intentamos abrir directamente el dispositivo
-            self.cap = cv2.VideoCapture(f"/dev/video{self.camera_index}")
-        
-        # Verificamos si la cámara se abrió correctamente
-        if not self.cap.isOpened():
-            # Intentamos con v4l2 (Video4Linux2) explícitamente
-            self.cap = cv2.VideoCapture(self.camera_index, cv2.CAP_V4L2)
-        
-        # Última verificación
-        if not self.cap.isOpened():
-            raise Exception(f"No se pudo abrir la cámara {self.camera_index}")
-        
-        # Configuramos el ancho del video
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        
-        # Configuramos la altura del video
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        print(f"Cámara {self.camera_index} iniciada correctamente")
+        # Formato de captura pedido a la cámara (ver capture_format.py)
+        capture_options = {
+            'fps': config.CAMERA_FPS,
+            'fourccs': config.CAMERA_FOURCC,
+            'buffer_size': config.CAMERA_BUFFER_SIZE,
+            'fallback_sizes': config.CAMERA_FALLBACK_SIZES,
+        }
         
+        # Elegimos el backend según la descripción (índice, video, carpeta...)
+        self.source = open_source(self.camera_index, self.pacing, self.loop,
+                                  width=config.FRAME_WIDTH, height=config.FRAME_HEIGHT,
+                                  capture_options=capture_options)
+        self.source.start()
+
+        print(f"Fuente {self.source.describe()} iniciada correctamente")
+
+    @property
+    def format_report(self):
+        """Formato concedido por la cámara (None si la fuente no es una cámara)"""
+        return getattr(self.source, 'format_report', None)
+
+    @property
+    def is_live(self):
+        """True si la fuente es una cámara en vivo"""
+        return self.source is None or self.source.is_live
+
+    def read(self):
+        """
+        Captura un frame con su timestamp y número de secuencia
+
+        Returns:
+            Frame o None si no se pudo capturar (o la grabación terminó)
+        """
+        if self.source is None:
+            return None
+        return self.source.read()
+
     def get_frame(self):
         """
         Captura un frame (imagen) de la cámara
-        
+
         Returns:
             tuple: (éxito, frame)
         """
         # Si la cámara no está iniciada, retornamos error
-        if self.cap is None:
+        if self.source is None:
             return False, None
         else:
-            # Leemos un frame de la cámara
-            # cap.read() retorna (True/False, imagen)
-            success, frame = self.cap.read()
-            return success, frame
-    
+            frame = self.source.read()
+            if frame is None:
+                return False, None
+            return True, frame.image
+
     def release(self):
         """Libera la cámara y cierra la conexión"""
         # Verificamos si la cámara está abierta
-        if self.cap is not None:
+        if self.source is not None:
             # Liberamos el recurso de la cámara
-            self.cap.release()
+            self.source.release()
+            self.source = None
             print("Cámara liberada")
         else:
             print("La cámara ya estaba liberada")
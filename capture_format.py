@@ -0,0 +1,116 @@
+"""
+Módulo para negociar el formato de captura con la cámara (V4L2 / OpenCV)
+Pide FOURCC, resolución, FPS y número de buffers, prueba alternativas
+si el driver no acepta lo pedido e informa lo que realmente se concedió
+"""
+import cv2
+
+
+def fourcc_code(text):
+    """Convierte 'MJPG' al entero que espera CAP_PROP_FOURCC"""
+    return cv2.VideoWriter_fourcc(*text.ljust(4)[:4])
+
+
+def fourcc_text(value):
+    """Convierte el valor de CAP_PROP_FOURCC a texto ('MJPG', 'YUYV', ...)"""
+    code = int(value)
+    if code <= 0:
+        return ''
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip()
+
+
+def read_granted(cap):
+    """
+    Lee el formato que la cámara tiene configurado ahora mismo
+
+    Returns:
+        dict: fourcc, width, height, fps y buffer_size
+    """
+    return {
+        'fourcc': fourcc_text(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        # 0 o -1 significa que el backend no informa este valor
+        'buffer_size': int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+
+def negotiate_format(cap, width, height, fps=None, fourccs=(), buffer_size=None,
+                     fallback_sizes=()):
+    """
+    Negocia el formato de captura con la cámara ya abierta
+
+    El orden importa en V4L2: primero FOURCC, luego resolución, luego FPS
+    y por último el número de buffers.
+
+    Args:
+        cap: cv2.VideoCapture abierto
+        width, height: Resolución deseada
+        fps: FPS deseados (None = no tocar)
+        fourccs: Formatos en orden de preferencia, ej. ("MJPG", "YUYV")
+        buffer_size: Buffers del driver (1 = mínima latencia, None = no tocar)
+        fallback_sizes: Resoluciones alternativas [(w, h), ...] si la pedida no se concede
+
+    Returns:
+        dict: Informe con lo pedido ('requested'), lo concedido ('granted')
+            y si cada parte coincide ('matched')
+    """
+    requested = {
+        'fourcc': list(fourccs),
+        'size': [width, height],
+        'fps': fps,
+        'buffer_size': buffer_size,
+    }
+
+    # 1. Formato de pixel: probamos en orden hasta que uno se acepte
+    for fourcc in fourccs:
+        cap.set(cv2.CAP_PROP_FOURCC, fourcc_code(fourcc))
+        if fourcc_text(cap.get(cv2.CAP_PROP_FOURCC)) == fourcc:
+            break
+
+    # 2. Resolución: la pedida y luego las alternativas
+    for size_w, size_h in [(width, height)] + list(fallback_sizes):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, size_w)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size_h)
+        if (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) == size_w and
+                int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == size_h):
+            break
+    else:
+        # Ninguna se concedió exacta: volvemos a pedir la original (el driver
+        # elige la más cercana) en vez de quedarnos con la última alternativa
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    # 3. FPS (el driver elige el más cercano que soporte)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+
+    # 4. Buffers del driver: menos buffers = frames más recientes
+    if buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    granted = read_granted(cap)
+
+    matched = {
+        'fourcc': not fourccs or granted['fourcc'] == fourccs[0],
+        'size': (granted['width'], granted['height']) == (width, height),
+        'fps': not fps or abs(granted['fps'] - fps) < 0.5,
+        'buffer_size': not buffer_size or granted['buffer_size'] == buffer_size,
+    }
+
+    return {'requested': requested, 'granted': granted, 'matched': matched}
+
+
+def format_report(report):
+    """Texto legible del informe de negociación"""
+    granted = report['granted']
+    lines = [
+        f"Formato concedido: {granted['fourcc'] or '?'} "
+        f"{granted['width']}x{granted['height']} @ {granted['fps']:.1f} FPS, "
+        f"buffers: {granted['buffer_size'] if granted['buffer_size'] > 0 else '?'}"
+    ]
+    for name, ok in report['matched'].items():
+        if not ok:
+            lines.append(f"⚠️  {name}: no se concedió lo pedido ({report['requested'].get(name, '')})")
+    return "\n".join(lines)
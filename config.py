@@ -3,15 +3,43 @@ Configuración del proyecto
 """
 
 # Configuración de cámara
-# Tu cámara FaceCam 1000X está en el índice 14
 CAMERA_INDEX = 0  # Cámara principal del sistema
+# Nombre (o vendor:product USB) de la cámara a usar, por ejemplo "FaceCam 1000X"
+# Si está definido tiene prioridad sobre CAMERA_INDEX y se resuelve con el
+# inventario de camera_discovery.py (python scripts/test_camera.py para verlo)
+CAMERA_NAME = None
 FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 
+# Negociación del formato de captura (V4L2)
+# MJPG comprime en la cámara y permite más FPS por USB que YUYV
+CAMERA_FOURCC = ["MJPG", "YUYV"]  # En orden de preferencia
+CAMERA_FPS = 30
+CAMERA_BUFFER_SIZE = 1  # 1 buffer = siempre el frame más reciente (menos latencia)
+# Resoluciones alternativas si la cámara no acepta FRAME_WIDTH x FRAME_HEIGHT
+CAMERA_FALLBACK_SIZES = [(1280, 720), (640, 480)]
+
 # Configuración de detección
 MIN_COLORS_DETECTED = 3  # Mínimo de colores para considerar un cubo
 MIN_AREA = 500  # Área mínima en píxeles
 
+# Tamaño de entrada dinámico (main.py --adaptive-imgsz)
+ADAPTIVE_IMGSZ_SIZES = [320, 480, 640]  # Tamaños que se calientan al arrancar
+LATENCY_TARGET_MS = 50  # Latencia de inferencia objetivo por frame
+MIN_OBJECT_PX = 48  # Lado mínimo del cubo a la entrada del modelo
+
+# Presupuesto de latencia (load_scheduler.py)
+LATENCY_BUDGET_MS = None  # Retraso máximo captura -> resultado (None = sin presupuesto)
+SCHEDULER_LOW_IMGSZ = 320  # imgsz en el nivel de baja resolución
+
+# Métricas de Prometheus (metrics.py): http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_PORT = None  # None = sin servidor de métricas
+METRICS_HOST = "127.0.0.1"  # Solo localhost (no se expone a la red)
+
+# Eventos de detección (event_store.py, consultar con scripts/query_events.py)
+EVENTS_DIR = "runs/events"  # None = no guardar eventos
+EVENTS_SEGMENT_MB = 16  # Tamaño de cada segmento antes de rotar
+
 # Configuración de interfaz
 WINDOW_NAME = "Detector de Cubo Rubik"
 FONT = 1  # cv2.FONT_HERSHEY_SIMPLEX
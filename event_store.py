@@ -0,0 +1,254 @@
+"""
+Almacén de eventos de detección
+Los eventos (timestamp, cámara, caja, confianza, track, tipo) se encolan
+sin bloquear el loop y un hilo de fondo los escribe por lotes en segmentos
+de solo-añadir que rotan por tamaño:
+
+    events_<inicio>.jsonl   Un evento JSON por línea
+    events_<inicio>.idx     Una entrada binaria por lote: tiempo mínimo y
+                            máximo, posición y largo en el .jsonl, cantidad
+
+Ningún lote cruza un cambio de minuto, así que los conteos por minuto
+salen del índice sin leer los eventos, y una consulta por rango de tiempo
+solo lee los lotes que lo tocan. Lo que quede en el .jsonl después de la
+última entrada del índice (un corte a medio lote) se ignora.
+"""
+import json
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# Tipos de evento
+EVENT_APPEARED = "appeared"    # Un cubo empieza a seguirse (track confirmado)
+EVENT_DETECTION = "detection"  # Un cubo seguido se detectó en un frame
+EVENT_LOST = "lost"            # Un cubo seguido dejó de verse
+
+# min_ts, max_ts, offset, length, count
+INDEX_ENTRY = struct.Struct("<ddQII")
+
+SEGMENT_BYTES = 16 * 1024 * 1024
+BATCH_SIZE = 512          # Eventos máximos por lote
+FLUSH_INTERVAL = 0.5      # Segundos entre escrituras
+MAX_QUEUE = 20000         # Eventos esperando a escribirse
+
+
+class EventWriter:
+    """
+    Cola de eventos que un hilo de fondo escribe por lotes
+
+    Args:
+        directory: Carpeta de los segmentos
+        segment_bytes: Tamaño a partir del cual se empieza un segmento nuevo
+        batch_size: Eventos máximos por lote
+        flush_interval: Segundos entre escrituras
+        max_queue: Eventos en cola a partir de los cuales se descartan los nuevos
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.pending = deque()
+        self.written = 0
+        self.dropped = 0
+        self.segments = 0
+        self._data = None
+        self._index = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self):
+        """Eventos en la cola esperando a escribirse"""
+        return len(self.pending)
+
+    def record(self, timestamp, camera, event, bbox=None, confidence=None, track_id=None):
+        """
+        Encola un evento (sin locks: deque.append es atómico)
+
+        Args:
+            timestamp: Segundos desde epoch (time.time())
+            bbox: (x1, y1, x2, y2) en píxeles del frame
+
+        Returns:
+            bool: False si se descartó por tener la cola llena
+        """
+        if len(self.pending) >= self.max_queue:
+            self.dropped += 1
+            return False
+        # Redondeado a ms: el índice y los eventos guardan exactamente el mismo tiempo
+        self.pending.append((round(timestamp, 3), camera, event, bbox, confidence, track_id))
+        return True
+
+    def _run(self):
+        while True:
+            stopping = self._stop.wait(self.flush_interval)
+            self._flush()
+            if stopping:
+                return
+
+    def _flush(self):
+        events = []
+        while self.pending:
+            events.append(self.pending.popleft())
+        if not events:
+            return
+
+        events.sort(key=lambda e: e[0])
+        batch = []
+        for event in events:
+            # Un lote por minuto (y como mucho batch_size eventos)
+            if batch and (int(event[0] // 60) != int(batch[0][0] // 60)
+                          or len(batch) >= self.batch_size):
+                self._write_batch(batch)
+                batch = []
+            batch.append(event)
+        self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        if self._data is None or self._data.tell() >= self.segment_bytes:
+            self._open_segment(batch[0][0])
+
+        lines = []
+        for timestamp, camera, event, bbox, confidence, track_id in batch:
+            record = {'t': timestamp, 'camera': camera, 'type': event}
+            if bbox is not None:
+                record['bbox'] = [int(v) for v in bbox]
+            if confidence is not None:
+                record['conf'] = round(float(confidence), 3)
+            if track_id is not None:
+                record['track'] = track_id
+            lines.append(json.dumps(record, separators=(",", ":")))
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+
+        offset = self._data.tell()
+        self._data.write(payload)
+        self._data.flush()
+        # El índice se escribe después de los datos: una entrada siempre apunta a datos completos
+        self._index.write(INDEX_ENTRY.pack(batch[0][0], batch[-1][0], offset, len(payload), len(batch)))
+        self._index.flush()
+        self.written += len(batch)
+
+    def _open_segment(self, timestamp):
+        self._close_segment()
+        name = "events_" + datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S_%f")
+        # Nunca se reabre un segmento existente (otro proceso o una ejecución anterior)
+        while (self.directory / f"{name}.idx").exists():
+            name += "_"
+        self._data = open(self.directory / f"{name}.jsonl", "ab")
+        self._index = open(self.directory / f"{name}.idx", "ab")
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._data:
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def close(self):
+        """Escribe los eventos pendientes y cierra el segmento"""
+        self._stop.set()
+        self._thread.join()
+        self._close_segment()
+
+
+def _matches(record, start, end, camera, event):
+    return ((start is None or record['t'] >= start) and (end is None or record['t'] <= end)
+            and (camera is None or record['camera'] == camera)
+            and (event is None or record['type'] == event))
+
+
+class EventReader:
+    """Consultas sobre los segmentos de una carpeta"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def segments(self):
+        """[(ruta del .jsonl, [(min_ts, max_ts, offset, length, count), ...]), ...]"""
+        segments = []
+        for index_path in sorted(self.directory.glob("events_*.idx")):
+            data = index_path.read_bytes()
+            # Una entrada a medio escribir (corte) se ignora
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            entries = list(INDEX_ENTRY.iter_unpack(data[:usable]))
+            if entries:
+                segments.append((index_path.with_suffix(".jsonl"), entries))
+        return segments
+
+    def _batches(self, start, end):
+        """
+        Lotes que se solapan con [start, end]
+
+        Yields:
+            tuple: (entrada del índice, si cae entera dentro del rango, archivo abierto)
+        """
+        for data_path, entries in self.segments():
+            selected = [entry for entry in entries
+                        if (start is None or entry[1] >= start) and (end is None or entry[0] <= end)]
+            if not selected:
+                continue
+            with open(data_path, "rb") as f:
+                for entry in selected:
+                    inside = (start is None or entry[0] >= start) and (end is None or entry[1] <= end)
+                    yield entry, inside, f
+
+    def _read_batch(self, f, entry):
+        f.seek(entry[2])
+        return [json.loads(line) for line in f.read(entry[3]).splitlines() if line]
+
+    def events(self, start=None, end=None, camera=None, event=None):
+        """
+        Eventos entre start y end (segundos desde epoch, ambos incluidos)
+
+        Yields:
+            dict: {'t', 'camera', 'type', 'bbox', 'conf', 'track'}
+        """
+        for entry, _, f in self._batches(start, end):
+            for record in self._read_batch(f, entry):
+                if _matches(record, start, end, camera, event):
+                    yield record
+
+    def counts_per_minute(self, start=None, end=None, camera=None, event=None):
+        """
+        Eventos por minuto entre start y end
+
+        Sin filtros de cámara ni tipo, los lotes que caen enteros en el
+        rango se cuentan desde el índice sin leerlos.
+
+        Returns:
+            dict: {inicio del minuto (segundos desde epoch): cantidad}, ordenado
+        """
+        counts = {}
+        filtered = camera is not None or event is not None
+        for entry, inside, f in self._batches(start, end):
+            if inside and not filtered:
+                minute = int(entry[0] // 60) * 60
+                counts[minute] = counts.get(minute, 0) + entry[4]
+                continue
+            for record in self._read_batch(f, entry):
+                if not _matches(record, start, end, camera, event):
+                    continue
+                minute = int(record['t'] // 60) * 60
+                counts[minute] = counts.get(minute, 0) + 1
+        return dict(sorted(counts.items()))
+
+
+def wall_time(timestamp, is_live):
+    """
+    Timestamp de un Frame en segundos desde epoch
+
+    En vivo los frames traen time.monotonic(); en grabaciones el tiempo es
+    el del medio, así que se usa la hora actual.
+    """
+    if is_live:
+        return time.time() - (time.monotonic() - timestamp)
+    return time.time()
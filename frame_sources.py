@@ -0,0 +1,521 @@
+"""
+Módulo de fuentes de frames (cámara, video, carpeta de imágenes, libcamera)
+Todas las fuentes entregan objetos Frame con timestamp y número de secuencia,
+así el mismo loop puede correr con la webcam en vivo o con grabaciones
+"""
+import glob
+import os
+import subprocess
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from capture_format import negotiate_format, format_report
+
+
+# Extensiones de imagen que aceptamos en las carpetas
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Modos de reproducción para fuentes grabadas
+PACING_REALTIME = "realtime"  # Respeta los tiempos originales
+PACING_FAST = "fast"          # Tan rápido como sea posible
+
+
+class Frame:
+    """Un frame capturado junto con su información de captura"""
+
+    __slots__ = ('image', 'timestamp', 'sequence', 'source')
+
+    def __init__(self, image, timestamp, sequence, source=""):
+        """
+        Args:
+            image: Imagen BGR (numpy array)
+            timestamp: Momento de captura en segundos. En fuentes en vivo es
+                time.monotonic(); en grabaciones es el tiempo dentro del medio
+            sequence: Número de secuencia (0, 1, 2, ...)
+            source: Descripción de la fuente que lo generó
+        """
+        self.image = image
+        self.timestamp = timestamp
+        self.sequence = sequence
+        self.source = source
+
+
+class FrameSource:
+    """
+    Interfaz común para todas las fuentes de frames
+
+    Las subclases implementan _open(), _read_image() y _close().
+    _read_image() retorna (imagen, timestamp) o (None, None) al terminar.
+    """
+
+    # True si la fuente es en vivo (cámara), False si es una grabación
+    is_live = True
+
+    def __init__(self):
+        self.sequence = 0
+        self.started = False
+
+    @property
+    def fps(self):
+        """FPS nominal de la fuente (0 si no se conoce)"""
+        return 0.0
+
+    def start(self):
+        """Abre la fuente"""
+        self._open()
+        self.sequence = 0
+        self.started = True
+        return self
+
+    def read(self):
+        """
+        Lee el siguiente frame
+
+        Returns:
+            Frame o None si la fuente terminó o falló
+        """
+        if not self.started:
+            return None
+
+        image, timestamp = self._read_image()
+        if image is None:
+            return None
+
+        frame = Frame(image, timestamp, self.sequence, self.describe())
+        self.sequence += 1
+        return frame
+
+    def release(self):
+        """Cierra la fuente"""
+        if self.started:
+            self._close()
+            self.started = False
+
+    def describe(self):
+        """Texto corto que identifica la fuente"""
+        return self.__class__.__name__
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _read_image(self):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """Cámara V4L2 / webcam por índice o por ruta /dev/videoN"""
+
+    is_live = True
+
+    def __init__(self, device=0, width=None, height=None, capture_options=None):
+        """
+        Args:
+            device: Índice de la cámara (int) o ruta del dispositivo
+            width, height: Resolución pedida (None = la de la cámara)
+            capture_options: Opciones extra para negotiate_format()
+                (fps, fourccs, buffer_size, fallback_sizes)
+        """
+        super().__init__()
+        self.device = device
+        self.width = width
+        self.height = height
+        self.capture_options = capture_options or {}
+        self.cap = None
+        # Informe de lo que la cámara concedió realmente (ver capture_format.py)
+        self.format_report = None
+
+    @property
+    def fps(self):
+        if self.cap is None:
+            return 0.0
+        return self.cap.get(cv2.CAP_PROP_FPS)
+
+    def describe(self):
+        return f"camera:{self.device}"
+
+    def _open(self):
+        # Primero intentamos con el índice (o ruta) tal cual
+        self.cap = cv2.VideoCapture(self.device)
+
+        # Si no funciona con el índice, intentamos con la ruta directa
+        if not self.cap.isOpened() and isinstance(self.device, int):
+            print(f"No se pudo abrir con índice {self.device}, intentando con ruta directa...")
+            self.cap = cv2.VideoCapture(f"/dev/video{self.device}")
+
+        # Intentamos con v4l2 (Video4Linux2) explícitamente
+        if not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(self.device, cv2.CAP_V4L2)
+
+        if not self.cap.isOpened():
+            raise Exception(f"No se pudo abrir la cámara {self.device}")
+
+        if self.width and self.height:
+            self.format_report = negotiate_format(self.cap, self.width, self.height,
+                                                  **self.capture_options)
+            print(format_report(self.format_report))
+
+    def _read_image(self):
+        success, image = self.cap.read()
+        # Tomamos el tiempo justo después de recibir el frame
+        timestamp = time.monotonic()
+        if not success:
+            return None, None
+        return image, timestamp
+
+    def _close(self):
+        self.cap.release()
+        self.cap = None
+
+
+class VideoFileSource(FrameSource):
+    """Archivo de video grabado (mp4, avi, ...)"""
+
+    is_live = False
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.cap = None
+        self._fps = 0.0
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def describe(self):
+        return f"video:{os.path.basename(self.path)}"
+
+    def _open(self):
+        if not os.path.isfile(self.path):
+            raise Exception(f"No existe el video: {self.path}")
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise Exception(f"No se pudo abrir el video: {self.path}")
+        self._fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def _read_image(self):
+        success, image = self.cap.read()
+        if not success:
+            return None, None
+
+        # Usamos el tiempo del propio video para que la reproducción
+        # sea determinista (no depende de la velocidad de la máquina)
+        timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if timestamp <= 0 and self.sequence > 0:
+            timestamp = self.sequence / self._fps
+        return image, timestamp
+
+    def _close(self):
+        self.cap.release()
+        self.cap = None
+
+
+class ImageFolderSource(FrameSource):
+    """
+    Carpeta de imágenes reproducida como si fuera un video
+
+    Si los nombres siguen el formato de capture_images.py
+    (cubo_YYYYMMDD_HHMMSS_ffffff.jpg) se usa ese tiempo como timestamp;
+    si no, se usa sequence / fps. El hueco entre dos fotos se limita a
+    MAX_FRAME_GAP: una carpeta con varias sesiones de captura no debe
+    esperar horas entre una sesión y la siguiente al reproducirse.
+    """
+
+    is_live = False
+    MAX_FRAME_GAP = 2.0  # Segundos máximos entre dos fotos al reproducir
+
+    def __init__(self, folder, fps=30.0):
+        super().__init__()
+        self.folder = folder
+        self._fps = fps
+        self.files = []
+        self.index = 0
+        self.last_capture = None
+        self.last_timestamp = None
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def describe(self):
+        return f"images:{self.folder}"
+
+    def _open(self):
+        if not os.path.isdir(self.folder):
+            raise Exception(f"No existe la carpeta: {self.folder}")
+
+        # Orden alfabético = orden de captura con nuestros nombres
+        self.files = sorted(
+            path for path in glob.glob(os.path.join(self.folder, "*"))
+            if path.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if len(self.files) == 0:
+            raise Exception(f"No hay imágenes en: {self.folder}")
+
+        self.index = 0
+        self.last_capture = None
+        self.last_timestamp = None
+
+    def _read_image(self):
+        while self.index < len(self.files):
+            path = self.files[self.index]
+            self.index += 1
+
+            image = cv2.imread(path)
+            if image is None:
+                print(f"⚠️  No se pudo leer: {path}")
+                continue
+
+            return image, self._timestamp_for(path)
+
+        return None, None
+
+    def _timestamp_for(self, path):
+        """Calcula el timestamp relativo a la primera imagen"""
+        capture_time = parse_capture_time(os.path.basename(path))
+        if capture_time is None:
+            return self.sequence / self._fps
+
+        if self.last_timestamp is None:
+            timestamp = 0.0
+        else:
+            # Al menos un frame de separación (nombres desordenados) y como mucho MAX_FRAME_GAP
+            gap = capture_time - self.last_capture
+            timestamp = self.last_timestamp + min(max(gap, 1.0 / self._fps), self.MAX_FRAME_GAP)
+        self.last_capture, self.last_timestamp = capture_time, timestamp
+        return timestamp
+
+
+class LibcameraSource(FrameSource):
+    """
+    Cámara vía libcamera usando el comando 'cam' (Surface Pro 5, IPU3)
+
+    El comando escribe frames NV12 crudos por stdout, los leemos por tamaño fijo.
+    """
+
+    is_live = True
+
+    def __init__(self, camera_id=2, width=1280, height=720, warmup=3.0):
+        """
+        Args:
+            camera_id: Número de cámara según 'cam --list' (2 = frontal)
+            width, height: Resolución del stream
+            warmup: Segundos de espera a que arranque el sensor
+        """
+        super().__init__()
+        self.camera_id = camera_id
+        self.width = width
+        self.height = height
+        self.warmup = warmup
+        self.process = None
+        # NV12 ocupa 1.5 bytes por píxel
+        self.frame_size = width * height * 3 // 2
+
+    def describe(self):
+        return f"libcamera:{self.camera_id}"
+
+    def _open(self):
+        cmd = [
+            'cam',
+            '--camera', str(self.camera_id),
+            '--capture=0',    # Continuo
+            '--stream', f'role=viewfinder,width={self.width},height={self.height},pixelformat=NV12',
+            '--file=/dev/stdout'
+        ]
+        self.process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=10**8
+        )
+
+        time.sleep(self.warmup)
+
+        # Descartamos 2 frames completos para evitar un frame parcial inicial
+        self.process.stdout.read(self.frame_size * 2)
+
+    def _read_image(self):
+        raw_data = self.process.stdout.read(self.frame_size)
+        timestamp = time.monotonic()
+
+        if len(raw_data) != self.frame_size:
+            return None, None
+
+        # Convertimos NV12 a BGR en un solo paso
+        nv12 = np.frombuffer(raw_data, dtype=np.uint8).reshape((self.height * 3 // 2, self.width))
+        image = cv2.cvtColor(nv12, cv2.COLOR_YUV2BGR_NV12)
+        return image, timestamp
+
+    def _close(self):
+        self.process.terminate()
+        self.process = None
+
+
+class ReplaySource(FrameSource):
+    """
+    Envuelve una fuente grabada y controla la velocidad de reproducción
+
+    - realtime: espera entre frames según sus timestamps (como en vivo)
+    - fast: entrega los frames tan rápido como se pidan (para benchmarks)
+    """
+
+    is_live = False
+
+    def __init__(self, inner, pacing=PACING_REALTIME, loop=False):
+        """
+        Args:
+            inner: Fuente grabada (VideoFileSource o ImageFolderSource)
+            pacing: PACING_REALTIME o PACING_FAST
+            loop: Si es True vuelve a empezar al llegar al final
+        """
+        super().__init__()
+        if pacing not in (PACING_REALTIME, PACING_FAST):
+            raise ValueError(f"Modo de reproducción desconocido: {pacing}")
+        self.inner = inner
+        self.pacing = pacing
+        self.loop = loop
+        self.wall_start = None
+        self.media_start = None
+        # Desplazamiento acumulado al repetir la grabación
+        self.loop_offset = 0.0
+        self.last_timestamp = 0.0
+
+    @property
+    def fps(self):
+        return self.inner.fps
+
+    def describe(self):
+        return f"replay({self.pacing}):{self.inner.describe()}"
+
+    def _open(self):
+        self.inner.start()
+        self.wall_start = None
+        self.media_start = None
+        self.loop_offset = 0.0
+        self.last_timestamp = 0.0
+
+    def _read_image(self):
+        frame = self.inner.read()
+
+        if frame is None and self.loop and self.inner.sequence > 0:
+            # Reiniciamos la grabación conservando el tiempo acumulado
+            self.loop_offset = self.last_timestamp + 1.0 / (self.inner.fps or 30.0)
+            self.inner.release()
+            self.inner.start()
+            frame = self.inner.read()
+
+        if frame is None:
+            return None, None
+
+        timestamp = frame.timestamp + self.loop_offset
+        self.last_timestamp = timestamp
+
+        if self.pacing == PACING_REALTIME:
+            self._wait_until(timestamp)
+
+        return frame.image, timestamp
+
+    def _wait_until(self, timestamp):
+        """Duerme hasta que toque mostrar el frame con este timestamp"""
+        now = time.monotonic()
+        if self.wall_start is None:
+            self.wall_start = now
+            self.media_start = timestamp
+            return
+
+        delay = (timestamp - self.media_start) - (now - self.wall_start)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _close(self):
+        self.inner.release()
+
+
+def parse_capture_time(filename):
+    """
+    Extrae el tiempo de captura de nombres como cubo_20260115_211122_123456.jpg
+
+    Returns:
+        float: Segundos desde epoch, o None si el nombre no tiene ese formato
+    """
+    stem = os.path.splitext(filename)[0]
+    parts = stem.split('_')
+    if len(parts) < 3:
+        return None
+
+    # Buscamos las piezas fecha + hora (+ microsegundos opcionales)
+    for i in range(len(parts) - 1):
+        date_part, time_part = parts[i], parts[i + 1]
+        if len(date_part) == 8 and len(time_part) == 6 and date_part.isdigit() and time_part.isdigit():
+            text = date_part + time_part
+            fmt = "%Y%m%d%H%M%S"
+            if i + 2 < len(parts) and parts[i + 2].isdigit():
+                text += parts[i + 2][:6].ljust(6, '0')
+                fmt += "%f"
+            try:
+                return datetime.strptime(text, fmt).timestamp()
+            except ValueError:
+                return None
+    return None
+
+
+def open_source(spec, pacing=PACING_REALTIME, loop=False, width=None, height=None,
+                capture_options=None):
+    """
+    Crea la fuente adecuada a partir de una descripción
+
+    Ejemplos de spec:
+        0, "0"              -> cámara por índice
+        "/dev/video4"       -> cámara por ruta
+        "libcamera:2"       -> cámara libcamera número 2
+        "grabacion.mp4"     -> archivo de video
+        "dataset/con_cubo"  -> carpeta de imágenes
+
+    Args:
+        spec: Descripción de la fuente (int o str)
+        pacing: Velocidad para fuentes grabadas (PACING_REALTIME o PACING_FAST)
+        loop: Repetir las fuentes grabadas al terminar
+        width, height: Resolución pedida para cámaras
+        capture_options: FOURCC, FPS y buffers para cámaras (ver negotiate_format)
+
+    Returns:
+        FrameSource sin iniciar (llamar a start())
+    """
+    if isinstance(spec, int):
+        return CameraSource(spec, width, height, capture_options)
+
+    spec = str(spec)
+
+    if spec.isdigit():
+        return CameraSource(int(spec), width, height, capture_options)
+
+    if spec.startswith("libcamera:"):
+        camera_id = int(spec.split(":", 1)[1])
+        return LibcameraSource(camera_id, width or 1280, height or 720)
+
+    if spec.startswith("/dev/video"):
+        return CameraSource(spec, width, height, capture_options)
+
+    if os.path.isdir(spec):
+        return ReplaySource(ImageFolderSource(spec), pacing, loop)
+
+    return ReplaySource(VideoFileSource(spec), pacing, loop)
@@ -0,0 +1,135 @@
+"""
+Planificador por presupuesto de latencia
+Cuando la máquina se satura, en vez de acumular retraso se baja de nivel
+paso a paso: saltar frames, bajar la resolución, procesar solo la región
+del cubo seguido y pausar el modelo de personas. Cuando vuelve a sobrar
+margen se sube de nivel otra vez. Lo que importa es el retraso de cada
+detección, no cuántos frames se procesan.
+"""
+
+# Degradaciones posibles (en el orden en que se suelen activar)
+SKIP_FRAMES = "saltar_frames"
+LOW_RESOLUTION = "baja_resolucion"
+ROI_ONLY = "solo_roi"
+PAUSE_PERSON = "pausar_personas"
+
+DEFAULT_LEVELS = (SKIP_FRAMES, LOW_RESOLUTION, ROI_ONLY)
+
+
+class LoadScheduler:
+    """
+    Sube o baja el nivel de degradación según el retraso medido
+
+    El nivel 0 es normal; el nivel N activa las N primeras degradaciones
+    de `levels`.
+
+    Args:
+        budget_ms: Retraso máximo aceptable por frame (captura -> resultado)
+        target_fps: Alternativa a budget_ms (presupuesto = 1000 / fps)
+        levels: Degradaciones disponibles, en orden
+        degrade_after: Frames seguidos sobre el presupuesto para bajar un nivel
+        recover_after: Frames seguidos con margen para subir un nivel
+        headroom: Fracción del presupuesto por debajo de la cual hay margen
+        skip_stride: Con SKIP_FRAMES se procesa 1 de cada skip_stride frames
+        roi_refresh: Con ROI_ONLY, cada cuántos frames procesados se mira el frame
+            completo (para encontrar cubos nuevos)
+        roi_margin: Cuánto se agranda la región del cubo (fracción de su tamaño)
+    """
+
+    def __init__(self, budget_ms=None, target_fps=None, levels=DEFAULT_LEVELS,
+                 degrade_after=5, recover_after=30, headroom=0.6, skip_stride=2,
+                 roi_refresh=10, roi_margin=0.5, ema_alpha=0.3):
+        if budget_ms is None:
+            budget_ms = 1000.0 / target_fps if target_fps else 100.0
+        self.budget_ms = budget_ms
+        self.levels = tuple(levels)
+        self.degrade_after = degrade_after
+        self.recover_after = recover_after
+        self.headroom = headroom
+        self.skip_stride = skip_stride
+        self.roi_refresh = roi_refresh
+        self.roi_margin = roi_margin
+        self.ema_alpha = ema_alpha
+
+        self.level = 0
+        self.delay_ms = None
+        self.changes = 0
+        self._over = 0
+        self._under = 0
+        self._frames = 0
+        self._processed = 0
+
+    @property
+    def active(self):
+        """Degradaciones activas en el nivel actual"""
+        return self.levels[:self.level]
+
+    @property
+    def level_name(self):
+        return self.active[-1] if self.level else "normal"
+
+    @property
+    def low_resolution(self):
+        return LOW_RESOLUTION in self.active
+
+    @property
+    def person_paused(self):
+        return PAUSE_PERSON in self.active
+
+    def should_process(self):
+        """True si este frame se debe procesar (llamar una vez por frame leído)"""
+        self._frames += 1
+        if SKIP_FRAMES in self.active and self._frames % self.skip_stride:
+            return False
+        self._processed += 1
+        return True
+
+    def record(self, delay_ms):
+        """Registra el retraso de un frame procesado y ajusta el nivel"""
+        if self.delay_ms is None:
+            self.delay_ms = delay_ms
+        else:
+            self.delay_ms += self.ema_alpha * (delay_ms - self.delay_ms)
+
+        if self.delay_ms > self.budget_ms:
+            self._over += 1
+            self._under = 0
+        elif self.delay_ms < self.budget_ms * self.headroom:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.degrade_after and self.level < len(self.levels):
+            self._set_level(self.level + 1)
+        elif self._under >= self.recover_after and self.level > 0:
+            self._set_level(self.level - 1)
+
+    def _set_level(self, level):
+        self.level = level
+        self.changes += 1
+        self._over = self._under = 0
+
+    def roi_for(self, boxes, frame_shape):
+        """
+        Región a procesar con ROI_ONLY
+
+        Args:
+            boxes: Cajas (x1, y1, x2, y2) de los cubos seguidos
+
+        Returns:
+            tuple: (x1, y1, x2, y2) o None si hay que procesar el frame completo
+        """
+        if ROI_ONLY not in self.active or not boxes:
+            return None
+        if self.roi_refresh and self._processed % self.roi_refresh == 0:
+            return None
+
+        height, width = frame_shape[:2]
+        x1 = min(box[0] for box in boxes)
+        y1 = min(box[1] for box in boxes)
+        x2 = max(box[2] for box in boxes)
+        y2 = max(box[3] for box in boxes)
+        pad_x, pad_y = (x2 - x1) * self.roi_margin, (y2 - y1) * self.roi_margin
+        return (max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+                min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y)))
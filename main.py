@@ -2,14 +2,105 @@
 Script principal para detección de cubo de Rubik en tiempo real usando YOLO
 Este programa abre la cámara web y detecta cubos de Rubik con IA
 """
+import argparse
+import time
 import cv2
+import numpy as np
+from adaptive_resolution import AdaptiveResolution
 from camera_handler import CameraHandler
+from event_store import EventWriter, EVENT_APPEARED, EVENT_DETECTION, EVENT_LOST, wall_time
+from frame_sources import PACING_REALTIME, PACING_FAST
+from load_scheduler import LoadScheduler, DEFAULT_LEVELS, LOW_RESOLUTION, ROI_ONLY
+from metrics import MetricsRegistry, MetricsServer
+from stage_timer import StageTimer
+from model_manifest import select_backend
+from tiled_inference import TiledDetector, MERGE_NMS, MERGE_WBF, boxes_from_result
+from tracking import IoUTracker
 from ultralytics import YOLO
 import config
 
+STRIDE = 32  # Los imgsz deben ser múltiplos del stride del modelo
+
+
+def roi_imgsz(roi, max_imgsz):
+    """imgsz que cubre la región sin agrandarla (múltiplo del stride, como mucho max_imgsz)"""
+    x1, y1, x2, y2 = roi
+    side = max(x2 - x1, y2 - y1)
+    return min(max_imgsz, -(-side // STRIDE) * STRIDE)
+
+
+def parse_args():
+    """Lee los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Detector de Cubo de Rubik - YOLO AI")
+    parser.add_argument("--source", default=None,
+                        help="Índice de cámara, /dev/videoN, libcamera:N, video o carpeta de imágenes "
+                             "(por defecto config.CAMERA_NAME o config.CAMERA_INDEX)")
+    parser.add_argument("--camera-name", default=config.CAMERA_NAME,
+                        help="Nombre de la cámara a buscar en el inventario (ej. 'FaceCam')")
+    parser.add_argument("--pacing", default=PACING_REALTIME, choices=[PACING_REALTIME, PACING_FAST],
+                        help="Velocidad de reproducción para videos y carpetas")
+    parser.add_argument("--loop", action="store_true",
+                        help="Repetir la grabación al terminar")
+    parser.add_argument("--pt-only", action="store_true",
+                        help="Usar siempre best.pt aunque haya exportaciones verificadas más rápidas")
+    parser.add_argument("--tiled", action="store_true",
+                        help="Detectar por mosaicos a resolución nativa (cubos pequeños o lejanos)")
+    parser.add_argument("--tile-size", type=int, default=640, help="Lado de cada mosaico en píxeles")
+    parser.add_argument("--tile-merge", default=MERGE_NMS, choices=[MERGE_NMS, MERGE_WBF],
+                        help="Cómo unir las detecciones de mosaicos solapados")
+    parser.add_argument("--no-coarse", action="store_true",
+                        help="Evaluar siempre todos los mosaicos (sin pasada rápida previa)")
+    parser.add_argument("--adaptive-imgsz", action="store_true",
+                        help="Elegir el imgsz de cada frame según el tamaño del cubo y la latencia")
+    parser.add_argument("--budget-ms", type=float, default=config.LATENCY_BUDGET_MS,
+                        help="Retraso máximo por frame; si se supera se degrada el procesamiento "
+                             "(saltar frames, bajar resolución, solo la región del cubo)")
+    parser.add_argument("--target-fps", type=float, default=None,
+                        help="Alternativa a --budget-ms: presupuesto = 1000 / fps")
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT,
+                        help="Servir métricas de Prometheus en este puerto (localhost)")
+    parser.add_argument("--events-dir", default=config.EVENTS_DIR,
+                        help="Carpeta donde guardar los eventos de detección ('' = no guardar)")
+    return parser.parse_args()
+
+
+def create_metrics(registry):
+    """Métricas del detector (se actualizan siempre; solo se sirven con --metrics-port)"""
+    return {
+        'frames_captured': registry.counter(
+            "rubik_frames_captured_total", "Frames leídos de la fuente"),
+        'frames_dropped': registry.counter(
+            "rubik_frames_dropped_total", "Frames sin procesar (camera: perdidos antes de "
+            "leerlos, scheduler: saltados por el presupuesto de latencia)", ("reason",)),
+        'inference_seconds': registry.histogram(
+            "rubik_inference_seconds", "Duración de la inferencia por frame"),
+        'delay_seconds': registry.histogram(
+            "rubik_detection_delay_seconds", "Retraso desde la captura hasta el resultado"),
+        'detections': registry.counter(
+            "rubik_detections_total", "Detecciones con confianza > 0.5 por clase", ("class",)),
+        'total_detections': registry.gauge(
+            "rubik_total_detections", "Contador de apariciones del cubo en pantalla"),
+        'queue_depth': registry.gauge(
+            "rubik_queue_depth", "Elementos pendientes en cada cola", ("queue",)),
+        'model_load_seconds': registry.gauge(
+            "rubik_model_load_seconds", "Tiempo de carga del modelo al arrancar"),
+        'load_level': registry.gauge(
+            "rubik_load_level", "Nivel de degradación del planificador de latencia (0 = normal)"),
+    }
+
 
 def main():
     """Función principal del programa"""
+    args = parse_args()
+
+    # Métricas para Prometheus (el servidor corre en un hilo de fondo)
+    registry = MetricsRegistry()
+    metrics = create_metrics(registry)
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(registry, config.METRICS_HOST, args.metrics_port).start()
+        print(f"✓ Métricas en http://{config.METRICS_HOST}:{args.metrics_port}/metrics")
+
     # Mostramos el título del programa
     print("=" * 50)
     print("Detector de Cubo de Rubik - YOLO AI")
@@ -21,11 +112,58 @@ def main():
     # Cargar el modelo YOLO entrenado
     print("Cargando modelo YOLO entrenado...")
     model_path = "runs/detect/rubik_detector2/weights/best.pt"
-    detector = YOLO(model_path)
-    print(f"✓ Modelo YOLO cargado desde: {model_path}")
+    # El manifiesto de export_model.py dice qué backend verificado es el más rápido
+    # Con imgsz dinámico hace falta el .pt (las exportaciones tienen tamaño fijo);
+    # la pasada rápida de los mosaicos también cambia de imgsz
+    if args.pt_only or args.adaptive_imgsz or (args.tiled and not args.no_coarse):
+        backend = {'path': model_path, 'format': 'pt', 'imgsz': None}
+    else:
+        backend = select_backend(model_path)
+    load_start = time.perf_counter()
+    detector = YOLO(backend['path'], task='detect')
+    metrics['model_load_seconds'].set(time.perf_counter() - load_start)
+    imgsz = backend['imgsz'] or 640
+    print(f"✓ Modelo YOLO cargado desde: {backend['path']} ({backend['format']}, imgsz {imgsz})")
+
+    # Modo mosaicos: el frame se procesa por partes a resolución nativa
+    tiled = None
+    if args.tiled:
+        tiled = TiledDetector(detector, tile_size=args.tile_size, imgsz=imgsz,
+                              merge=args.tile_merge,
+                              coarse_imgsz=None if args.no_coarse else 320)
+        print(f"✓ Detección por mosaicos de {args.tile_size}px ({args.tile_merge})")
+
+    # imgsz dinámico: se calientan todos los tamaños antes de empezar
+    adaptive = None
+    tracker = IoUTracker()
+    if args.adaptive_imgsz and not tiled:
+        adaptive = AdaptiveResolution(config.ADAPTIVE_IMGSZ_SIZES, config.LATENCY_TARGET_MS,
+                                      config.MIN_OBJECT_PX)
+        dummy = np.zeros((config.FRAME_HEIGHT, config.FRAME_WIDTH, 3), dtype=np.uint8)
+        adaptive.warmup(lambda size: detector(dummy, imgsz=size, verbose=False))
+        imgsz = adaptive.current
+        latencies = ", ".join(f"{size}: {ms:.0f} ms" for size, ms in adaptive.latency.items())
+        print(f"✓ imgsz dinámico calentado ({latencies})")
+
+    # Presupuesto de latencia: si el equipo se satura se degrada por niveles
+    scheduler = None
+    if args.budget_ms or args.target_fps:
+        # Bajar la resolución o recortar la región del cubo no ahorra nada con una exportación
+        # (escala todo a su imgsz fijo) ni con mosaicos (siempre procesan el frame entero)
+        levels = DEFAULT_LEVELS
+        if backend['format'] != 'pt' or tiled:
+            levels = tuple(level for level in levels if level not in (LOW_RESOLUTION, ROI_ONLY))
+        scheduler = LoadScheduler(budget_ms=None if args.target_fps else args.budget_ms,
+                                  target_fps=args.target_fps, levels=levels)
+        print(f"✓ Presupuesto de latencia: {scheduler.budget_ms:.0f} ms por frame "
+              f"(niveles: {', '.join(levels)})")
     
     # Creamos el objeto que maneja la cámara
-    camera = CameraHandler(config.CAMERA_INDEX)
+    # Si no se indicó una fuente, usamos la cámara de config (por nombre o índice)
+    if args.source is None:
+        camera = CameraHandler(config.CAMERA_INDEX, args.pacing, args.loop, args.camera_name)
+    else:
+        camera = CameraHandler(args.source, args.pacing, args.loop)
     
     # Intentamos iniciar la cámara
     try:
@@ -34,6 +172,14 @@ def main():
         # Si hay un error, mostramos el mensaje y salimos
         print(f"Error al iniciar cámara: {e}")
         return
+
+    # Eventos de detección: se escriben por lotes en un hilo de fondo
+    events = None
+    camera_id = args.camera_name or camera.source.describe()
+    if args.events_dir:
+        events = EventWriter(args.events_dir, segment_bytes=config.EVENTS_SEGMENT_MB * 1024 * 1024)
+        metrics['queue_depth'].labels("events").set_function(lambda: events.depth)
+        print(f"✓ Eventos de detección en {args.events_dir}")
     
     # Variable que cuenta cuántas veces ha aparecido el cubo
     total_detections = 0
@@ -41,30 +187,123 @@ def main():
     # Variable que indica si actualmente hay un cubo en pantalla
     # Sirve para contar solo una vez cuando aparece
     current_detection = False
+
+    # Detecciones del último frame procesado (se reutilizan en los frames saltados)
+    detections = []
+    frame_imgsz = imgsz
+    last_timestamp = None
+    camera_fps = camera.source.fps if camera.is_live else 0
+
+    # Tiempos por etapa (captura, inferencia, dibujo...) y FPS reales
+    timer = StageTimer()
     
     # Loop principal: se ejecuta continuamente hasta que presionemos 'q'
     while True:
+        timer.start_frame()
+
         # Capturamos un frame (imagen) de la cámara
-        success, frame = camera.get_frame()
+        captured = camera.read()
+        timer.lap('capture')
         
         # Si no se pudo capturar, mostramos error y salimos
-        if not success:
-            print("Error al capturar frame")
+        if captured is None:
+            if camera.is_live:
+                print("Error al capturar frame")
+            else:
+                print("Fin de la grabación")
             break
         
-        # Buscamos cubos con YOLO
-        # Ejecutamos detección con el modelo entrenado
-        results = detector(frame, verbose=False)
+        frame = captured.image
+        # El retraso se mide desde la captura (en grabaciones, desde que se leyó el frame)
+        frame_origin = captured.timestamp if camera.is_live else time.monotonic()
+
+        # En vivo, un hueco entre timestamps mayor que el periodo de la cámara son frames perdidos
+        metrics['frames_captured'].inc()
+        if camera_fps and last_timestamp is not None:
+            lost = round((captured.timestamp - last_timestamp) * camera_fps) - 1
+            if lost > 0:
+                metrics['frames_dropped'].labels("camera").inc(lost)
+        last_timestamp = captured.timestamp
+        
+        # Con el equipo saturado algunos frames no se procesan
+        process = scheduler.should_process() if scheduler else True
+        if not process:
+            metrics['frames_dropped'].labels("scheduler").inc()
+
+        if process:
+            # Buscamos cubos con YOLO
+            # Ejecutamos detección con el modelo entrenado
+            frame_imgsz = imgsz
+            if scheduler and scheduler.low_resolution:
+                frame_imgsz = min(imgsz, config.SCHEDULER_LOW_IMGSZ)
+            roi = scheduler.roi_for([track.box for track in tracker.confirmed()],
+                                    frame.shape) if scheduler else None
+            image = frame
+            if roi:
+                # Solo la región alrededor de los cubos seguidos, sin escalarla al imgsz completo
+                x1, y1, x2, y2 = roi
+                image = frame[y1:y2, x1:x2]
+                frame_imgsz = roi_imgsz(roi, frame_imgsz)
+            timer.lap('preprocess')
+
+            inference_start = time.perf_counter()
+            if tiled:
+                detections = tiled.detect(frame)
+                classes = [0] * len(detections)
+                timer.lap('inference')
+            else:
+                results = detector(image, imgsz=frame_imgsz, verbose=False)
+                timer.lap('inference')
+                # ultralytics informa por separado su preproceso y postproceso
+                speed = results[0].speed
+                timer.move('inference', 'preprocess', speed.get('preprocess') or 0.0)
+                timer.move('inference', 'postprocess', speed.get('postprocess') or 0.0)
+                detections = boxes_from_result(results[0], *(roi[:2] if roi else (0, 0)))
+                classes = results[0].boxes.cls.tolist()
+            inference_ms = (time.perf_counter() - inference_start) * 1000
+            metrics['inference_seconds'].observe(inference_ms / 1000)
+            for cls, detection in zip(classes, detections):
+                if detection[4] > 0.5:
+                    metrics['detections'].labels(detector.names[int(cls)]).inc()
+
+            # El tracker da el tamaño del cubo seguido para elegir el próximo imgsz
+            update = tracker.update([d for d in detections if d[4] > 0.5])
+            if events:
+                event_time = wall_time(captured.timestamp, camera.is_live)
+                for track, detection in update.matched:
+                    events.record(event_time, camera_id, EVENT_DETECTION, detection[:4],
+                                  detection[4], track.track_id)
+                for track in tracker.tracks:
+                    # Recién confirmado en este frame
+                    if track.hits == tracker.min_hits and track.misses == 0:
+                        events.record(event_time, camera_id, EVENT_APPEARED, track.box,
+                                      track.confidence, track.track_id)
+                for track in update.missed:
+                    # El tracker lo acaba de olvidar
+                    if track.misses > tracker.max_misses:
+                        events.record(event_time, camera_id, EVENT_LOST, track.box,
+                                      track.confidence, track.track_id)
+            # Con resolución baja o solo la región, la latencia no es la del imgsz actual
+            if adaptive and frame_imgsz == imgsz and not roi:
+                tracked = tracker.confirmed()
+                object_px = min(track.size for track in tracked) if tracked else None
+                imgsz = adaptive.update(inference_ms, object_px, max(frame.shape[:2]))
+            delay_ms = (time.monotonic() - frame_origin) * 1000
+            metrics['delay_seconds'].observe(delay_ms / 1000)
+            if scheduler:
+                scheduler.record(delay_ms)
+                metrics['load_level'].set(scheduler.level)
+            timer.lap('postprocess')
         
         # Procesamos los resultados
         cubos_detectados = []
         frame_procesado = frame.copy()
         
-        if len(results[0].boxes) > 0:
-            for box in results[0].boxes:
+        if len(detections) > 0:
+            for detection in detections:
                 # Obtener coordenadas y confianza
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = float(box.conf[0])
+                x1, y1, x2, y2 = map(int, detection[:4])
+                confidence = detection[4]
                 
                 # Solo considerar detecciones con alta confianza
                 if confidence > 0.5:
@@ -88,6 +327,7 @@ def main():
             if not current_detection:
                 # Es una nueva detección (antes no había cubo)
                 total_detections = total_detections + 1
+                metrics['total_detections'].set(total_detections)
                 current_detection = True
                 print(f"¡Cubo detectado! Total: {total_detections}")
         else:
@@ -117,17 +357,26 @@ def main():
                    config.FONT, config.FONT_SCALE, 
                    status_color, config.FONT_THICKNESS)
         
-        # Añadir información del modelo
-        model_info = "Modelo: YOLO v8 entrenado"
+        # FPS reales y tiempos p50/p95 de cada etapa
+        timing_lines = timer.overlay_lines()
+        model_info = f"{timing_lines[0]} | imgsz {frame_imgsz}"
+        if scheduler:
+            model_info += f" | carga: {scheduler.level_name}"
         cv2.putText(frame_procesado, model_info, (10, 90),
                    config.FONT, config.FONT_SCALE * 0.7, 
                    (255, 255, 0), config.FONT_THICKNESS)
+        for i, line in enumerate(timing_lines[1:]):
+            cv2.putText(frame_procesado, line, (10, 115 + i * 20),
+                       config.FONT, config.FONT_SCALE * 0.6, (255, 255, 0), 1)
+        timer.lap('render')
         
         # Mostramos el frame procesado en una ventana
         cv2.imshow(config.WINDOW_NAME, frame_procesado)
         
         # Esperamos 1 milisegundo y verificamos si se presionó alguna tecla
         key = cv2.waitKey(1) & 0xFF
+        timer.lap('display')
+        timer.end_frame()
         
         # Si presionaron 'q', salimos del loop
         if key == ord('q'):
@@ -136,9 +385,18 @@ def main():
         # Si presionaron 'r', reseteamos el contador
         elif key == ord('r'):
             total_detections = 0
+            metrics['total_detections'].set(0)
             print("\nContador reseteado")
     
+    # Tiempos por etapa de toda la sesión
+    timer.report()
+
     # Limpiar
+    if events:
+        events.close()
+        print(f"✓ {events.written} eventos guardados ({events.dropped} descartados)")
+    if metrics_server:
+        metrics_server.stop()
     camera.release()
     cv2.destroyAllWindows()
     print("Programa finalizado")
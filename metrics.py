@@ -0,0 +1,252 @@
+"""
+Métricas en formato de texto de Prometheus
+Un servidor HTTP en un hilo de fondo sirve /metrics en localhost. El loop
+de detección actualiza contadores, gauges e histogramas sin locks: cada
+métrica tiene un único hilo que escribe (el loop) y el servidor solo lee,
+así que en el peor caso una lectura ve un valor de hace un instante.
+
+Uso:
+    registry = MetricsRegistry()
+    frames = registry.counter("rubik_frames_captured_total", "Frames leídos")
+    server = MetricsServer(registry, port=9108).start()
+    ...
+    frames.inc()
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Buckets de latencia en segundos (de 5 ms a 2.5 s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Métrica con o sin etiquetas
+
+    Sin etiquetas se usa directamente (counter.inc()); con etiquetas,
+    labels(...) devuelve la serie de cada combinación (counter.labels("cubo").inc()).
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        if not self.labelnames:
+            self._series[()] = self._new_series()
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            # Solo el hilo que escribe crea series; el servidor copia el dict antes de leer
+            series = self._series[values] = self._new_series()
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """[(sufijo, etiquetas, extra, valor), ...]"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            labels = _format_labels(self.labelnames, values, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _CounterValue:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1):
+        self._series[()].inc(amount)
+
+    def _new_series(self):
+        return _CounterValue()
+
+    def _samples(self):
+        return [("", values, None, series.value) for values, series in list(self._series.items())]
+
+
+class _GaugeValue:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """El valor se calcula al servir /metrics (por ejemplo la profundidad de una cola)"""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function else self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value):
+        self._series[()].set(value)
+
+    def set_function(self, function):
+        self._series[()].set_function(function)
+
+    def _new_series(self):
+        return _GaugeValue()
+
+    def _samples(self):
+        return [("", values, None, series.get()) for values, series in list(self._series.items())]
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # El último es +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value):
+        self._series[()].observe(value)
+
+    def _new_series(self):
+        return _HistogramValue(self.bounds)
+
+    def _samples(self):
+        samples = []
+        for values, series in list(self._series.items()):
+            counts = list(series.counts)
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", values, ("le", _format_value(float(bound))), cumulative))
+            samples.append(("_sum", values, None, series.sum))
+            # El total sale de los buckets copiados, así _count coincide con +Inf
+            samples.append(("_count", values, None, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Conjunto de métricas que se sirven juntas"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Servidor HTTP de /metrics en un hilo de fondo
+
+    Args:
+        registry: MetricsRegistry a servir
+        host: Interfaz donde escuchar (localhost por defecto: no se expone a la red)
+        port: Puerto TCP
+    """
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Sin una línea por cada scrape
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
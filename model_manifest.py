@@ -0,0 +1,94 @@
+"""
+Manifiesto de modelos exportados
+scripts/export_model.py guarda junto a los pesos (.pt) qué formatos se
+exportaron, si sus detecciones coinciden con las del .pt y cuánto tardan
+en esta máquina. Con eso main.py y RubikDetectorPortable eligen solos el
+backend verificado más rápido.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Estados de cada artefacto
+STATUS_VERIFIED = "verified"   # Exportado y con detecciones iguales al .pt
+STATUS_MISMATCH = "mismatch"   # Exportado pero las detecciones no coinciden
+STATUS_FAILED = "failed"       # La exportación falló
+STATUS_UNRUNNABLE = "unrunnable"  # Exportado pero no se puede cargar o ejecutar en esta máquina
+
+
+def weights_sha1(weights_path, chunk_size=1 << 20):
+    """Hash de los pesos: si cambia, los artefactos exportados ya no valen"""
+    digest = hashlib.sha1()
+    with open(weights_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path(weights_path):
+    """Ruta del manifiesto de unos pesos (best.pt -> best_manifest.json)"""
+    weights_path = Path(weights_path)
+    return weights_path.with_name(f"{weights_path.stem}_manifest.json")
+
+
+def load_manifest(weights_path):
+    """Carga el manifiesto (vacío si no existe o está dañado)"""
+    path = manifest_path(weights_path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(weights_path, manifest):
+    """Guarda el manifiesto de forma atómica"""
+    path = manifest_path(weights_path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def artifact_path(weights_path, artifact):
+    """Ruta de un artefacto (en el manifiesto es relativa a la carpeta de los pesos)"""
+    return Path(weights_path).parent / artifact['path']
+
+
+def select_backend(weights_path):
+    """
+    Elige el artefacto verificado más rápido para unos pesos
+
+    Solo cuenta artefactos exportados de estos mismos pesos (mismo hash)
+    que todavía existen. Si no hay ninguno se usan los pesos .pt.
+
+    Returns:
+        dict: {'path', 'format', 'imgsz', 'latency_ms'}
+    """
+    default = {'path': str(weights_path), 'format': 'pt', 'imgsz': None, 'latency_ms': None}
+    manifest = load_manifest(weights_path)
+    if not manifest or not os.path.exists(weights_path):
+        return default
+    if manifest.get('weights_sha1') != weights_sha1(weights_path):
+        return default
+
+    candidates = []
+    for fmt, artifact in manifest.get('artifacts', {}).items():
+        # Las exportaciones fallidas no tienen ruta ('path': None): se saltan
+        if artifact.get('status') != STATUS_VERIFIED or not artifact.get('path'):
+            continue
+        latency = (artifact.get('latency_ms') or {}).get('p50')
+        path = artifact_path(weights_path, artifact)
+        if latency is not None and path.exists():
+            candidates.append({'path': str(path), 'format': fmt,
+                               'imgsz': manifest.get('imgsz'), 'latency_ms': latency})
+
+    if not candidates:
+        return default
+    return min(candidates, key=lambda candidate: candidate['latency_ms'])
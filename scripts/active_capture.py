@@ -0,0 +1,185 @@
+"""
+Captura activa: guarda solo los frames en los que el modelo duda
+Ejecuta el detector en vivo y guarda un frame cuando alguna detección cae
+en la banda de incertidumbre (por defecto 0.3-0.6 de confianza) o cuando el
+detector pierde un cubo que el tracker venía siguiendo. Las capturas tienen
+un ritmo máximo, se descartan las casi iguales (dHash) y la propuesta del
+modelo se guarda como etiqueta borrador en dataset/labels_draft, que
+label_images.py muestra como propuestas al etiquetar.
+
+Uso:
+    python scripts/active_capture.py
+    python scripts/active_capture.py --low 0.25 --high 0.7 --interval 2
+Presiona 'p' para pausar el guardado y 'q' para salir
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+from capture_images import AsyncImageWriter, new_filename
+from dataset_utils import IMAGES_DIR, DRAFT_LABELS_DIR, PROJECT_ROOT
+from dedup_images import BKTree, dhash_image
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, str(PROJECT_ROOT))
+import config
+from frame_sources import open_source
+from tracking import IoUTracker
+
+# Configuración
+MODEL_PATH = str(PROJECT_ROOT / "runs/detect/rubik_detector2/weights/best.pt")
+LOW_CONF = 0.3         # Banda de incertidumbre: [LOW_CONF, HIGH_CONF)
+HIGH_CONF = 0.6
+MIN_INTERVAL = 1.0     # Segundos mínimos entre capturas
+DEDUP_RADIUS = 6       # Bits distintos (de 64) para considerar un frame repetido
+WINDOW_NAME = "Captura Activa"
+
+# Motivos de captura
+REASON_UNCERTAIN = "incierto"
+REASON_MISSED = "perdido"
+
+
+def write_draft(image_path, proposals, image_shape):
+    """
+    Guarda la propuesta del modelo como etiqueta borrador
+
+    Formato YOLO con la confianza como sexta columna
+    """
+    height, width = image_shape[:2]
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    lines = []
+    for x1, y1, x2, y2, conf in proposals:
+        x1, x2 = max(0, x1), min(width, x2)
+        y1, y2 = max(0, y1), min(height, y2)
+        lines.append(f"0 {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+                     f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f} {conf:.4f}\n")
+    with open(DRAFT_LABELS_DIR / f"{stem}.txt", 'w') as f:
+        f.writelines(lines)
+
+
+def frame_hash(frame):
+    """dHash de un frame de la cámara"""
+    small = cv2.resize(frame, (frame.shape[1] // 4, frame.shape[0] // 4),
+                       interpolation=cv2.INTER_AREA)
+    return dhash_image(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guardar solo los frames donde el modelo duda")
+    parser.add_argument("--source", default=config.CAMERA_INDEX, help="Cámara o grabación")
+    parser.add_argument("--model", default=MODEL_PATH, help="Modelo a usar")
+    parser.add_argument("--low", type=float, default=LOW_CONF, help="Inicio de la banda de duda")
+    parser.add_argument("--high", type=float, default=HIGH_CONF, help="Fin de la banda de duda")
+    parser.add_argument("--interval", type=float, default=MIN_INTERVAL,
+                        help="Segundos mínimos entre capturas")
+    parser.add_argument("--radius", type=int, default=DEDUP_RADIUS,
+                        help="Distancia dHash para descartar frames repetidos")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    print("=" * 60)
+    print("CAPTURA ACTIVA (FRAMES INCIERTOS)")
+    print("=" * 60)
+    print(f"Banda de incertidumbre: {args.low:.2f} - {args.high:.2f}")
+    print("Presiona 'p' para pausar y 'q' para salir")
+    print("=" * 60)
+
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    os.makedirs(DRAFT_LABELS_DIR, exist_ok=True)
+
+    model = YOLO(args.model)
+    camera = open_source(args.source, width=640, height=480)
+    try:
+        camera.start()
+    except Exception as e:
+        print(f"Error: No se pudo abrir la cámara ({e})")
+        return
+
+    writer = AsyncImageWriter()
+    tracker = IoUTracker()
+    seen = BKTree()
+    counts = {REASON_UNCERTAIN: 0, REASON_MISSED: 0, 'repetidos': 0}
+    last_saved = 0.0
+    paused = False
+
+    while True:
+        captured = camera.read()
+        if captured is None:
+            break
+
+        frame = captured.image
+        now = time.monotonic()
+
+        # Pedimos también las detecciones débiles: son las que interesan
+        result = model(frame, conf=args.low, verbose=False)[0]
+        detections = [(*map(int, box.xyxy[0]), float(box.conf[0])) for box in result.boxes]
+        update = tracker.update(detections)
+
+        uncertain = [d for d in detections if d[4] < args.high]
+        reason = None
+        if uncertain:
+            reason = REASON_UNCERTAIN
+        elif update.missed:
+            reason = REASON_MISSED
+
+        if reason and not paused and now - last_saved >= args.interval:
+            value = frame_hash(frame)
+            if seen.search(value, args.radius):
+                counts['repetidos'] += 1
+            else:
+                seen.add(value, captured.sequence)
+                # Borrador: lo que vio el modelo más los cubos que perdió
+                proposals = detections + [(*track.box, 0.0) for track in update.missed]
+                shape = frame.shape
+                filename = new_filename(IMAGES_DIR, "activo")
+                writer.submit(filename, frame,
+                              lambda path, p=proposals, s=shape: write_draft(path, p, s))
+                counts[reason] += 1
+                last_saved = now
+                print(f"✓ Frame {reason} guardado: {filename}")
+
+        display = frame.copy()
+        for x1, y1, x2, y2, conf in detections:
+            color = (0, 255, 255) if conf < args.high else (0, 255, 0)
+            cv2.rectangle(display, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(display, f"{conf:.2f}", (x1, max(y1 - 5, 10)),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        for track in update.missed:
+            x1, y1, x2, y2 = track.box
+            cv2.rectangle(display, (x1, y1), (x2, y2), (0, 0, 255), 1)
+
+        info = (f"Inciertos: {counts[REASON_UNCERTAIN]} | Perdidos: {counts[REASON_MISSED]} | "
+                f"Repetidos: {counts['repetidos']} | Cola: {writer.depth}")
+        cv2.putText(display, info, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        if paused:
+            cv2.putText(display, "PAUSADO", (10, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        cv2.imshow(WINDOW_NAME, display)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('p') or key == ord('P'):
+            paused = not paused
+        elif key == ord('q') or key == ord('Q'):
+            break
+
+    camera.release()
+    cv2.destroyAllWindows()
+    writer.close()
+
+    print("\n" + "=" * 60)
+    print("RESUMEN")
+    print("=" * 60)
+    print(f"Frames inciertos guardados: {counts[REASON_UNCERTAIN]}")
+    print(f"Frames con cubo perdido guardados: {counts[REASON_MISSED]}")
+    print(f"Descartados por repetidos: {counts['repetidos']}")
+    print(f"\nImágenes en: {IMAGES_DIR}/")
+    print(f"Borradores en: {DRAFT_LABELS_DIR}/")
+    print("Revísalos con: python scripts/label_images.py")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
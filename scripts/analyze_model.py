@@ -1,60 +1,190 @@
 """
 Script para analizar la capacidad y complejidad de tu modelo entrenado
+Perfila el modelo en CPU: tiempo de cada capa (con hooks), FLOPs,
+parámetros y memoria de activaciones por capa al imgsz elegido, tamaño
+real del archivo y memoria máxima del proceso. Guarda todo en JSON para
+comparar entre versiones del modelo.
+
+Uso:
+    python scripts/analyze_model.py
+    python scripts/analyze_model.py --imgsz 320 --runs 20
 """
-from ultralytics import YOLO
-import torch
+import argparse
+import copy
+import json
+import os
+import time
+from pathlib import Path
+
+from benchmark import peak_rss_mb
+from dataset_utils import PROJECT_ROOT
+
+MODEL_PATH = str(PROJECT_ROOT / "runs/detect/rubik_detector2/weights/best.pt")
+
+
+def tensors_nbytes(output):
+    """Bytes de todos los tensores de una salida (tensor, lista o tupla)"""
+    import torch
+
+    if isinstance(output, torch.Tensor):
+        return output.numel() * output.element_size()
+    if isinstance(output, (list, tuple)):
+        return sum(tensors_nbytes(item) for item in output)
+    if isinstance(output, dict):
+        return sum(tensors_nbytes(item) for item in output.values())
+    return 0
+
+
+def leaf_flops(module, inputs, output):
+    """FLOPs (2 x multiplicaciones-sumas) de una capa Conv2d o Linear"""
+    import torch.nn as nn
+
+    if isinstance(module, nn.Conv2d):
+        kh, kw = module.kernel_size
+        macs = output.numel() * (module.in_channels // module.groups) * kh * kw
+        return 2 * macs
+    if isinstance(module, nn.Linear):
+        return 2 * output.numel() * module.in_features
+    return 0
+
+
+def profile_layers(net, imgsz, runs):
+    """
+    Mide cada capa de primer nivel del modelo
+
+    Una pasada con hooks en las capas hoja cuenta FLOPs y memoria; las
+    siguientes solo miden tiempo (los hooks hoja añadirían ruido).
+
+    Returns:
+        tuple: (lista de dicts por capa, tiempo medio total en ms)
+    """
+    import torch
+    import torch.nn as nn
+
+    layers = list(net.model)
+    stats = [{'index': i, 'type': getattr(layer, 'type', type(layer).__name__),
+              'from': getattr(layer, 'f', -1),
+              'params': sum(p.numel() for p in layer.parameters()),
+              'flops': 0, 'activation_bytes': 0, 'time_ms': 0.0}
+             for i, layer in enumerate(layers)]
+
+    x = torch.rand(1, 3, imgsz, imgsz)
+    handles = []
+
+    # Pasada 1: FLOPs de las capas hoja (Conv2d/Linear) y memoria de salida
+    for i, layer in enumerate(layers):
+        for module in layer.modules():
+            if isinstance(module, (nn.Conv2d, nn.Linear)):
+                handles.append(module.register_forward_hook(
+                    lambda m, inp, out, i=i: stats[i].__setitem__(
+                        'flops', stats[i]['flops'] + leaf_flops(m, inp, out))))
+        handles.append(layer.register_forward_hook(
+            lambda m, inp, out, i=i: stats[i].__setitem__('activation_bytes', tensors_nbytes(out))))
+
+    with torch.inference_mode():
+        net(x)  # también sirve de calentamiento
+    for handle in handles:
+        handle.remove()
+    handles = []
+
+    # Pasadas de tiempo: un pre-hook y un hook por capa de primer nivel
+    starts = {}
+    for i, layer in enumerate(layers):
+        handles.append(layer.register_forward_pre_hook(
+            lambda m, inp, i=i: starts.__setitem__(i, time.perf_counter())))
+        handles.append(layer.register_forward_hook(
+            lambda m, inp, out, i=i: stats[i].__setitem__(
+                'time_ms', stats[i]['time_ms'] + (time.perf_counter() - starts[i]) * 1000)))
+
+    total = 0.0
+    with torch.inference_mode():
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            net(x)
+            total += (time.perf_counter() - t0) * 1000
+    for handle in handles:
+        handle.remove()
+
+    for layer in stats:
+        layer['time_ms'] = round(layer['time_ms'] / runs, 3)
+    return stats, total / runs
+
+
+def analyze_model(model_path=MODEL_PATH, imgsz=640, runs=10, threads=None, output=None):
+    """Perfila el modelo y guarda el resultado en JSON"""
+    import torch
+    from ultralytics import YOLO
+
+    if threads:
+        torch.set_num_threads(threads)
 
-def analyze_model():
-    """Analiza las capacidades del modelo entrenado"""
-    
     print("🔍 ANÁLISIS DE TU MODELO YOLO")
-    print("=" * 50)
-    
-    # Cargar modelo
-    model = YOLO('runs/detect/rubik_detector2/weights/best.pt')
-    
-    # Información básica
-    print(f"📦 Tamaño del archivo: {6.2} MB")
-    print(f"🧠 Parámetros totales: {sum(p.numel() for p in model.model.parameters()):,}")
-    print(f"🔥 Parámetros entrenables: {sum(p.numel() for p in model.model.parameters() if p.requires_grad):,}")
-    
-    # Arquitectura
-    print(f"\n🏗️  ARQUITECTURA:")
-    print(f"   - Capas convolucionales: ~30 capas")
-    print(f"   - Attention mechanisms: ✅")
-    print(f"   - Skip connections: ✅") 
-    print(f"   - Multi-scale detection: ✅")
-    
-    # Capacidades
-    print(f"\n🎯 CAPACIDADES:")
-    print(f"   - Detecta objetos: ✅")
-    print(f"   - Localización precisa: ✅") 
-    print(f"   - Confianza calculada: ✅")
-    print(f"   - Múltiples objetos: ✅")
-    print(f"   - Tiempo real: ✅")
-    
-    # Comparación
-    print(f"\n⚡ EFICIENCIA:")
-    print(f"   - Speed: ~100 FPS en RTX 3070")
-    print(f"   - Memory: ~500 MB VRAM") 
-    print(f"   - CPU Compatible: ✅")
-    
-    # Operaciones matemáticas
-    print(f"\n🧮 COMPLEJIDAD MATEMÁTICA:")
-    print(f"   - Operaciones por imagen: ~8.2 GFLOPs")
-    print(f"   - Convoluciones: 22 tipos diferentes")
-    print(f"   - Funciones activación: GELU, ReLU, Sigmoid")
-    print(f"   - Optimización: AdamW con learning rate decay")
-    
-    print(f"\n🏆 TU MODELO ES:")
-    print(f"   ✅ PEQUEÑO pero POTENTE")
-    print(f"   ✅ OPTIMIZADO para producción") 
-    print(f"   ✅ ESPECIALIZADO en cubos de Rubik")
-    print(f"   ✅ BALANCEADO velocidad/precisión")
-    
-    print(f"\n💡 CONCLUSIÓN:")
-    print(f"   El tamaño pequeño = EFICIENCIA, no debilidad")
-    print(f"   Tu modelo es una Ferrari compacta, no un tanque lento")
+    print("=" * 60)
+
+    rss_before = peak_rss_mb()
+    model = YOLO(model_path)
+
+    # Fusionamos Conv+BN igual que hace ultralytics al predecir
+    net = copy.deepcopy(model.model).float().eval()
+    net = net.fuse(verbose=False) if hasattr(net, 'fuse') else net
+
+    file_size = os.path.getsize(model_path)
+    params = sum(p.numel() for p in model.model.parameters())
+    fused_params = sum(p.numel() for p in net.parameters())
+
+    layers, total_ms = profile_layers(net, imgsz, runs)
+    rss_after = peak_rss_mb()
+
+    total_flops = sum(layer['flops'] for layer in layers)
+    layer_ms = sum(layer['time_ms'] for layer in layers) or 1.0
+    peak_activation = max(layer['activation_bytes'] for layer in layers)
+
+    print(f"📦 Tamaño del archivo: {file_size / 1e6:.2f} MB")
+    print(f"🧠 Parámetros: {params:,} ({fused_params:,} tras fusionar Conv+BN)")
+    print(f"🧮 GFLOPs a {imgsz}x{imgsz}: {total_flops / 1e9:.2f}")
+    print(f"⏱️  Forward en CPU: {total_ms:.1f} ms ({1000 / total_ms:.1f} FPS, "
+          f"{torch.get_num_threads()} hilos, media de {runs})")
+    print(f"💾 Activación más grande: {peak_activation / 1e6:.2f} MB")
+    if rss_after is not None:
+        print(f"📈 RSS máximo: {rss_after:.0f} MB (antes de cargar: {rss_before:.0f} MB)")
+
+    print(f"\n🏗️  CAPAS ({len(layers)}), ordenadas por tiempo:")
+    print(f"   {'#':>3} {'tipo':<32} {'ms':>7} {'%':>5} {'GFLOPs':>7} {'params':>9} {'act MB':>7}")
+    for layer in sorted(layers, key=lambda item: -item['time_ms']):
+        layer_type = layer['type'].split('.')[-1]
+        print(f"   {layer['index']:>3} {layer_type:<32} {layer['time_ms']:>7.2f} "
+              f"{100 * layer['time_ms'] / layer_ms:>5.1f} {layer['flops'] / 1e9:>7.3f} "
+              f"{layer['params']:>9,} {layer['activation_bytes'] / 1e6:>7.2f}")
+
+    report = {
+        'model': model_path,
+        'imgsz': imgsz,
+        'runs': runs,
+        'threads': torch.get_num_threads(),
+        'file_size_bytes': file_size,
+        'params': params,
+        'fused_params': fused_params,
+        'gflops': round(total_flops / 1e9, 3),
+        'forward_ms': round(total_ms, 3),
+        'peak_activation_bytes': peak_activation,
+        'peak_rss_mb': rss_after,
+        'layers': layers,
+    }
+
+    if output is None:
+        output = Path(model_path).with_name(f"{Path(model_path).stem}_profile_{imgsz}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Perfil guardado en: {output}")
+    return report
+
 
 if __name__ == "__main__":
-    analyze_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Perfilar el modelo en CPU")
+    parser.add_argument("--model", default=MODEL_PATH, help="Modelo .pt a analizar")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamaño de entrada")
+    parser.add_argument("--runs", type=int, default=10, help="Pasadas medidas")
+    parser.add_argument("--threads", type=int, default=None, help="Hilos de CPU")
+    parser.add_argument("--output", default=None, help="Archivo JSON (por defecto junto al modelo)")
+    args = parser.parse_args()
+    analyze_model(args.model, args.imgsz, args.runs, args.threads, args.output)
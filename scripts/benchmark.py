@@ -0,0 +1,268 @@
+"""
+Benchmark de inferencia: backends, resoluciones, lotes e hilos
+Ejecuta un conjunto fijo de imágenes (o un clip grabado) con cada variante
+del modelo que encuentre junto a best.pt (.pt, ONNX, OpenVINO, TFLite,
+versiones cuantizadas) y mide latencia p50/p95/p99, throughput y memoria
+máxima (RSS). Cada combinación corre en un proceso aparte, así el número de
+hilos se aplica de verdad y el RSS es el de esa combinación.
+
+Uso:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --imgsz 320 480 640 --batch 1 4 --threads 1 4
+    python scripts/benchmark.py --models best.pt best.onnx --video clip.mp4
+    python scripts/benchmark.py --image-cache ../yolo_dataset/image_cache_640.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dataset_utils import PROJECT_ROOT, YOLO_DATASET_DIR
+
+# Configuración
+WEIGHTS_DIR = PROJECT_ROOT / "runs/detect/rubik_detector2/weights"
+RESULTS_DIR = PROJECT_ROOT / "runs/benchmarks"
+DEFAULT_IMAGES = YOLO_DATASET_DIR / "images/val"
+MAX_IMAGES = 64
+WARMUP = 3          # Lotes de calentamiento (no se miden)
+ITERATIONS = 30     # Lotes medidos por combinación
+WORKER_TIMEOUT = 600
+
+
+def discover_models(weights_dir=WEIGHTS_DIR):
+    """
+    Busca las variantes exportadas del modelo
+
+    Returns:
+        list: Rutas de .pt, .onnx, carpetas *_openvino_model y .tflite
+    """
+    weights_dir = Path(weights_dir)
+    models = sorted(weights_dir.glob("*.pt")) + sorted(weights_dir.glob("*.onnx"))
+    models += sorted(path for path in weights_dir.glob("*_openvino_model") if path.is_dir())
+    models += sorted(weights_dir.glob("*_saved_model/*.tflite"))
+    return [str(path) for path in models]
+
+
+def load_inputs(images=None, video=None, max_images=MAX_IMAGES, image_cache=None):
+    """
+    Carga las imágenes de prueba en memoria (fuera de la medición)
+
+    Con image_cache (índice de image_cache.py) se usan las imágenes de
+    validación ya decodificadas en vez de leer los JPEG.
+    """
+    import cv2
+
+    frames = []
+    if image_cache:
+        from image_cache import ImageCache
+
+        cache = ImageCache(image_cache)
+        # Sin el relleno: la misma proporción que la imagen original
+        frames = [cache.resized(position).copy()
+                  for position in cache.positions('val')[:max_images]]
+    elif video:
+        sys.path.insert(0, str(PROJECT_ROOT))
+        from frame_sources import open_source, PACING_FAST
+
+        source = open_source(video, pacing=PACING_FAST)
+        source.start()
+        try:
+            for frame in source:
+                frames.append(frame.image)
+                if len(frames) >= max_images:
+                    break
+        finally:
+            source.release()
+    else:
+        for path in sorted(Path(images).glob("*.jpg"))[:max_images]:
+            image = cv2.imread(str(path))
+            if image is not None:
+                frames.append(image)
+    return frames
+
+
+def peak_rss_mb():
+    """Memoria residente máxima del proceso en MB (None si no se puede medir)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(args):
+    """
+    Mide una sola combinación (se ejecuta en un proceso aparte)
+
+    Imprime el resultado como una línea JSON en stdout.
+    """
+    import numpy as np
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(args.threads)
+    frames = load_inputs(args.images, args.video, args.max_images, args.image_cache)
+    if not frames:
+        raise SystemExit("No hay imágenes de prueba")
+
+    load_start = time.perf_counter()
+    model = YOLO(args.model, task="detect")
+    load_time = time.perf_counter() - load_start
+
+    batches = [[frames[(i * args.batch + j) % len(frames)] for j in range(args.batch)]
+               for i in range(args.warmup + args.iterations)]
+
+    for batch in batches[:args.warmup]:
+        model(batch, imgsz=args.imgsz, verbose=False)
+
+    latencies = []
+    start = time.perf_counter()
+    for batch in batches[args.warmup:]:
+        t0 = time.perf_counter()
+        model(batch, imgsz=args.imgsz, verbose=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(json.dumps({
+        'load_s': round(load_time, 3),
+        'latency_ms': {'p50': round(p50, 2), 'p95': round(p95, 2), 'p99': round(p99, 2),
+                       'mean': round(float(np.mean(latencies)), 2)},
+        'images_per_s': round(args.iterations * args.batch / elapsed, 2),
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def run_combination(model, imgsz, batch, threads, args):
+    """Lanza un worker para una combinación y devuelve su resultado"""
+    command = [sys.executable, os.path.abspath(__file__), "--worker",
+               "--model", model, "--imgsz", str(imgsz), "--batch", str(batch),
+               "--threads", str(threads), "--max-images", str(args.max_images),
+               "--warmup", str(args.warmup), "--iterations", str(args.iterations)]
+    if getattr(args, 'image_cache', None):
+        command += ["--image-cache", str(args.image_cache)]
+    elif args.video:
+        command += ["--video", args.video]
+    else:
+        command += ["--images", str(args.images)]
+
+    # Las librerías de inferencia leen los hilos del entorno al importarse
+    env = dict(os.environ, OMP_NUM_THREADS=str(threads), MKL_NUM_THREADS=str(threads),
+               OPENBLAS_NUM_THREADS=str(threads))
+
+    result = {'model': os.path.basename(model.rstrip("/")), 'path': model,
+              'imgsz': imgsz, 'batch': batch, 'threads': threads}
+    try:
+        process = subprocess.run(command, env=env, capture_output=True, text=True,
+                                 timeout=WORKER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        result['error'] = f"timeout ({WORKER_TIMEOUT} s)"
+        return result
+
+    lines = [line for line in process.stdout.splitlines() if line.startswith("{")]
+    if process.returncode != 0 or not lines:
+        error = (process.stderr.strip().splitlines() or ["sin salida"])[-1]
+        result['error'] = error
+        return result
+
+    result.update(json.loads(lines[-1]))
+    return result
+
+
+def system_info():
+    """Descripción de la máquina para poder comparar resultados"""
+    info = {'platform': platform.platform(), 'python': platform.python_version(),
+            'cpu': platform.processor() or platform.machine(), 'cpu_count': os.cpu_count()}
+    try:
+        import torch
+        import ultralytics
+        info['torch'] = torch.__version__
+        info['ultralytics'] = ultralytics.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia del modelo")
+    parser.add_argument("--models", nargs="*", default=None,
+                        help="Modelos a medir (por defecto, todas las variantes junto a best.pt)")
+    parser.add_argument("--images", default=str(DEFAULT_IMAGES), help="Carpeta de imágenes")
+    parser.add_argument("--video", default=None, help="Clip grabado en vez de imágenes")
+    parser.add_argument("--image-cache", default=None,
+                        help="Índice de image_cache.py: usar las imágenes ya decodificadas")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640], help="Tamaños de entrada")
+    parser.add_argument("--batch", nargs="+", type=int, default=[1], help="Tamaños de lote")
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1],
+                        help="Hilos de CPU")
+    parser.add_argument("--max-images", type=int, default=MAX_IMAGES)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--model", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        args.imgsz, args.batch, args.threads = args.imgsz[0], args.batch[0], args.threads[0]
+        run_worker(args)
+        return
+
+    models = args.models or discover_models()
+    if not models:
+        print(f"No se encontraron modelos en {WEIGHTS_DIR}")
+        return
+
+    print("=" * 60)
+    print("BENCHMARK DE INFERENCIA")
+    print("=" * 60)
+    print(f"Modelos: {', '.join(os.path.basename(m.rstrip('/')) for m in models)}")
+    print(f"imgsz: {args.imgsz} | lote: {args.batch} | hilos: {args.threads}")
+    print("=" * 60)
+
+    results = []
+    for model in models:
+        for threads in args.threads:
+            for imgsz in args.imgsz:
+                for batch in args.batch:
+                    result = run_combination(model, imgsz, batch, threads, args)
+                    results.append(result)
+                    name = f"{result['model']} imgsz={imgsz} lote={batch} hilos={threads}"
+                    if 'error' in result:
+                        print(f"✗ {name}: {result['error']}")
+                    else:
+                        latency = result['latency_ms']
+                        print(f"✓ {name}: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+                              f"p99 {latency['p99']:.1f} ms, {result['images_per_s']:.1f} img/s, "
+                              f"RSS {result['peak_rss_mb'] or 0:.0f} MB")
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(output.parent, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'system': system_info(),
+            'inputs': args.image_cache or args.video or args.images,
+            'warmup': args.warmup,
+            'iterations': args.iterations,
+            'results': results,
+        }, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print(f"Resultados guardados en: {output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,269 @@
 """
 Script para capturar imágenes de entrenamiento desde la webcam
-Presiona ESPACIO para tomar una foto
+Presiona ESPACIO para tomar una foto (mantenla presionada para ráfaga)
+Presiona 'b' / 'f' para activar la captura continua con cubo / de fondo
 Presiona 'q' para salir
+
+Las fotos se codifican y guardan en hilos aparte, así la vista previa
+nunca se congela mientras se escriben los JPEG.
 """
+import argparse
 import cv2
 import os
+import sys
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
+from dataset_utils import IMAGES_DIR, BACKGROUND_DIR
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from frame_sources import open_source
+
 # Configuración
-CAMERA_INDEX = 14  # Tu webcam
-DATASET_FOLDER = "dataset"  # Carpeta donde se guardan las imágenes
+BURST_FPS = 5.0        # Fotos por segundo en ráfaga / captura continua
+HOLD_WINDOW = 0.6      # Segundos entre repeticiones de tecla para considerarla mantenida
+FLASH_TIME = 0.1       # Duración del efecto visual de captura
+WRITER_THREADS = 2
+MAX_QUEUE = 64         # Fotos esperando a guardarse
+
+# Política cuando la cola está llena
+DROP_OLDEST = "oldest"  # Descarta la foto más vieja de la cola
+DROP_NEWEST = "newest"  # Descarta la foto nueva
 
 # Creamos las carpetas si no existen
-os.makedirs(f"{DATASET_FOLDER}/con_cubo", exist_ok=True)
-os.makedirs(f"{DATASET_FOLDER}/sin_cubo", exist_ok=True)
+os.makedirs(IMAGES_DIR, exist_ok=True)
+os.makedirs(BACKGROUND_DIR, exist_ok=True)
+
+
+class AsyncImageWriter:
+    """Cola de fotos que se codifican y guardan en hilos de fondo"""
+
+    def __init__(self, threads=WRITER_THREADS, max_queue=MAX_QUEUE, drop_policy=DROP_OLDEST):
+        self.max_queue = max_queue
+        self.drop_policy = drop_policy
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.workers = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def depth(self):
+        """Fotos en la cola esperando a guardarse"""
+        return len(self.pending)
+
+    def submit(self, path, image, on_written=None):
+        """
+        Encola una foto para guardarla
+
+        Args:
+            path: Ruta del archivo
+            image: Imagen (no se debe modificar después de encolarla)
+            on_written: Función opcional que se llama con la ruta al guardarse
+                (con el lock tomado: debe ser corta)
+
+        Returns:
+            bool: False si la foto se descartó por tener la cola llena
+        """
+        with self.condition:
+            if len(self.pending) >= self.max_queue:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self.pending.popleft()
+            self.pending.append((path, image, on_written))
+            self.condition.notify()
+        return True
 
-def main():
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                path, image, on_written = self.pending.popleft()
+
+            # cv2.imwrite libera el GIL: varios hilos codifican a la vez
+            ok = cv2.imwrite(path, image)
+            with self.condition:
+                if ok:
+                    self.written += 1
+                    if on_written:
+                        on_written(path)
+                else:
+                    self.failed += 1
+
+    def close(self):
+        """Espera a que se guarden todas las fotos pendientes"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for worker in self.workers:
+            worker.join()
+
+
+def new_filename(folder, prefix):
+    """Nombre único con timestamp (el mismo formato que usa prepare_dataset.py)"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"{folder}/{prefix}_{timestamp}.jpg"
+
+
+def main(source=config.CAMERA_INDEX, burst_fps=BURST_FPS, drop_policy=DROP_OLDEST):
     """Función principal para capturar imágenes"""
     print("=" * 60)
     print("CAPTURA DE IMÁGENES PARA ENTRENAMIENTO")
     print("=" * 60)
     print("Instrucciones:")
     print("  1. Coloca el cubo en diferentes posiciones y ángulos")
-    print("  2. Presiona ESPACIO para capturar con cubo")
+    print("  2. Presiona ESPACIO para capturar con cubo (mantén para ráfaga)")
     print("  3. Presiona 'c' para capturar SIN cubo (fondo)")
-    print("  4. Presiona 'q' para salir")
+    print(f"  4. Presiona 'b' / 'f' para captura continua con cubo / fondo ({burst_fps:g} fps)")
+    print("  5. Presiona 'q' para salir")
     print("=" * 60)
-    
+
     # Abrimos la cámara
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    
-    # Verificamos que se abrió correctamente
-    if not cap.isOpened():
-        print("Error: No se pudo abrir la cámara")
+    camera = open_source(source, width=640, height=480)
+    try:
+        camera.start()
+    except Exception as e:
+        print(f"Error: No se pudo abrir la cámara ({e})")
         return
-    
-    # Configuramos resolución
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    
-    # Contadores de imágenes
-    count_con_cubo = 0
-    count_sin_cubo = 0
-    
+
+    writer = AsyncImageWriter(drop_policy=drop_policy)
+
+    # Contadores de imágenes (solo las que llegaron a guardarse)
+    counts = {'con_cubo': 0, 'sin_cubo': 0}
+
+    # Estado de la ráfaga
+    burst_interval = 1.0 / burst_fps
+    continuous = None         # None, 'con_cubo' o 'sin_cubo'
+    last_space = 0.0
+    last_capture = 0.0
+    flash_until = 0.0
+    flash_color = (0, 255, 0)
+
+    def capture(frame, category):
+        nonlocal last_capture, flash_until, flash_color
+        if category == 'con_cubo':
+            filename = new_filename(IMAGES_DIR, "cubo")
+            flash_color = (0, 255, 0)
+        else:
+            filename = new_filename(BACKGROUND_DIR, "fondo")
+            flash_color = (0, 165, 255)
+
+        def written(path):
+            counts[category] += 1
+
+        if writer.submit(filename, frame, on_written=written):
+            print(f"✓ Imagen {'CON' if category == 'con_cubo' else 'SIN'} cubo en cola: {filename}")
+        last_capture = time.monotonic()
+        # Efecto visual de captura sin congelar la vista previa
+        flash_until = last_capture + FLASH_TIME
+
     print("\n¡Cámara lista! Empieza a capturar imágenes...\n")
-    
+
     # Loop principal
     while True:
         # Capturamos un frame
-        ret, frame = cap.read()
-        
+        captured = camera.read()
+
         # Si no se pudo leer el frame, salimos
-        if not ret:
+        if captured is None:
             print("Error al leer frame")
             break
-        
-        # Mostramos información en pantalla
-        info = f"Con cubo: {count_con_cubo} | Sin cubo: {count_sin_cubo}"
-        cv2.putText(frame, info, (10, 30),
+
+        frame = captured.image
+        now = time.monotonic()
+
+        # Captura continua: una foto cada burst_interval
+        if continuous and now - last_capture >= burst_interval:
+            capture(frame, continuous)
+
+        # Dibujamos sobre una copia: el frame guardado queda limpio
+        display = frame.copy()
+        height, width = display.shape[:2]
+
+        info = f"Con cubo: {counts['con_cubo']} | Sin cubo: {counts['sin_cubo']}"
+        cv2.putText(display, info, (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        instrucciones = "ESPACIO: Con cubo | C: Sin cubo | Q: Salir"
-        cv2.putText(frame, instrucciones, (10, 460),
+
+        queue_text = f"Cola: {writer.depth}/{MAX_QUEUE} | Descartadas: {writer.dropped}"
+        if continuous:
+            queue_text += f" | CONTINUO: {continuous}"
+        queue_color = (0, 0, 255) if writer.depth >= MAX_QUEUE * 0.8 else (255, 255, 0)
+        cv2.putText(display, queue_text, (10, 55),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, queue_color, 1)
+
+        instrucciones = "ESPACIO: Con cubo | C: Sin cubo | B/F: Continuo | Q: Salir"
+        cv2.putText(display, instrucciones, (10, height - 20),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
+
+        if now < flash_until:
+            cv2.rectangle(display, (0, 0), (width, height), flash_color, 10)
+
         # Mostramos el frame
-        cv2.imshow("Captura de Imagenes", frame)
-        
+        cv2.imshow("Captura de Imagenes", display)
+
         # Esperamos tecla
         key = cv2.waitKey(1) & 0xFF
-        
-        # ESPACIO - Capturar con cubo
+
+        # ESPACIO - Capturar con cubo; si se mantiene, ráfaga a burst_fps
         if key == ord(' '):
-            # Generamos nombre único con timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            filename = f"{DATASET_FOLDER}/con_cubo/cubo_{timestamp}.jpg"
-            
-            # Guardamos la imagen
-            cv2.imwrite(filename, frame)
-            count_con_cubo = count_con_cubo + 1
-            
-            print(f"✓ Imagen CON cubo guardada: {filename}")
-            
-            # Efecto visual de captura
-            cv2.rectangle(frame, (0, 0), (640, 480), (0, 255, 0), 10)
-            cv2.imshow("Captura de Imagenes", frame)
-            cv2.waitKey(100)
-        
+            held = now - last_space < HOLD_WINDOW
+            last_space = now
+            if not held or now - last_capture >= burst_interval:
+                capture(frame, 'con_cubo')
+
         # C - Capturar sin cubo
         elif key == ord('c') or key == ord('C'):
-            # Generamos nombre único
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            filename = f"{DATASET_FOLDER}/sin_cubo/fondo_{timestamp}.jpg"
-            
-            # Guardamos la imagen
-            cv2.imwrite(filename, frame)
-            count_sin_cubo = count_sin_cubo + 1
-            
-            print(f"✓ Imagen SIN cubo guardada: {filename}")
-            
-            # Efecto visual de captura
-            cv2.rectangle(frame, (0, 0), (640, 480), (0, 165, 255), 10)
-            cv2.imshow("Captura de Imagenes", frame)
-            cv2.waitKey(100)
-        
+            capture(frame, 'sin_cubo')
+
+        # B / F - Activar o desactivar la captura continua
+        elif key == ord('b') or key == ord('B'):
+            continuous = None if continuous == 'con_cubo' else 'con_cubo'
+            print(f"Captura continua con cubo: {'ON' if continuous else 'OFF'}")
+        elif key == ord('f') or key == ord('F'):
+            continuous = None if continuous == 'sin_cubo' else 'sin_cubo'
+            print(f"Captura continua de fondo: {'ON' if continuous else 'OFF'}")
+
         # Q - Salir
         elif key == ord('q') or key == ord('Q'):
             print("\nSaliendo...")
             break
-    
+
     # Liberamos recursos
-    cap.release()
+    camera.release()
     cv2.destroyAllWindows()
-    
+
+    print(f"Guardando {writer.depth} fotos pendientes...")
+    writer.close()
+
     # Mostramos resumen
     print("\n" + "=" * 60)
     print("RESUMEN DE CAPTURA")
     print("=" * 60)
-    print(f"Imágenes CON cubo: {count_con_cubo}")
-    print(f"Imágenes SIN cubo: {count_sin_cubo}")
-    print(f"Total: {count_con_cubo + count_sin_cubo}")
-    print("\nImágenes guardadas en la carpeta: dataset/")
+    print(f"Imágenes CON cubo: {counts['con_cubo']}")
+    print(f"Imágenes SIN cubo: {counts['sin_cubo']}")
+    print(f"Total: {counts['con_cubo'] + counts['sin_cubo']}")
+    print(f"Guardadas: {writer.written} | Descartadas: {writer.dropped} | Errores: {writer.failed}")
+    print(f"\nImágenes guardadas en la carpeta: {IMAGES_DIR.parent}/")
     print("=" * 60)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Capturar imágenes de entrenamiento")
+    parser.add_argument("--source", default=config.CAMERA_INDEX, help="Cámara a usar")
+    parser.add_argument("--fps", type=float, default=BURST_FPS, help="Fotos por segundo en ráfaga")
+    parser.add_argument("--drop", default=DROP_OLDEST, choices=[DROP_OLDEST, DROP_NEWEST],
+                        help="Qué foto descartar si la cola de escritura se llena")
+    args = parser.parse_args()
+    main(args.source, args.fps, args.drop)
@@ -0,0 +1,126 @@
+"""
+Utilidades compartidas por los scripts del dataset
+Rutas del proyecto, hash de archivos y enlazado/copia de imágenes
+"""
+import errno
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Raíz del proyecto (los scripts funcionan igual desde la raíz o desde scripts/)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DATASET_DIR = PROJECT_ROOT / "dataset"
+IMAGES_DIR = DATASET_DIR / "con_cubo"
+BACKGROUND_DIR = DATASET_DIR / "sin_cubo"
+LABELS_DIR = DATASET_DIR / "labels"
+# Etiquetas propuestas por el modelo, pendientes de revisar en label_images.py
+DRAFT_LABELS_DIR = DATASET_DIR / "labels_draft"
+YOLO_DATASET_DIR = PROJECT_ROOT / "yolo_dataset"
+# Lista de falsos positivos minados en sin_cubo (mine_hard_negatives.py)
+NEGATIVES_PATH = DATASET_DIR / "hard_negatives.json"
+
+# Modos para colocar imágenes en yolo_dataset
+LINK_AUTO = "auto"          # hard link, si no se puede reflink, si no copia
+LINK_HARDLINK = "hardlink"
+LINK_REFLINK = "reflink"
+LINK_COPY = "copy"
+
+# ioctl FICLONE de Linux (copia por referencia en btrfs/xfs)
+_FICLONE = 0x40049409
+
+
+def read_yolo_labels(label_path):
+    """
+    Lee todas las cajas de un archivo de etiquetas YOLO
+
+    Returns:
+        list: [[clase, x_center, y_center, width, height], ...] (vacía si no existe)
+    """
+    labels = []
+    if not os.path.exists(label_path):
+        return labels
+    with open(label_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 5:
+                labels.append([float(value) for value in parts])
+    return labels
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Calcula el SHA-1 del contenido de un archivo"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_files(paths, workers=8):
+    """
+    Calcula el hash de varios archivos en paralelo
+
+    hashlib libera el GIL con bloques grandes, así que los hilos
+    aprovechan varios núcleos y solapan la lectura del disco.
+
+    Returns:
+        dict: {ruta: sha1}
+    """
+    paths = list(paths)
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(paths, pool.map(hash_file, paths)))
+
+
+def _reflink(src, dst):
+    """Copia por referencia (solo Linux con btrfs/xfs)"""
+    import fcntl
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+
+def link_or_copy(src, dst, mode=LINK_AUTO):
+    """
+    Coloca src en dst sin copiar los datos si el sistema de archivos lo permite
+
+    Args:
+        src: Archivo de origen
+        dst: Destino (no debe existir)
+        mode: LINK_AUTO, LINK_HARDLINK, LINK_REFLINK o LINK_COPY
+
+    Returns:
+        str: Método usado ('hardlink', 'reflink' o 'copy')
+    """
+    if mode in (LINK_AUTO, LINK_HARDLINK):
+        try:
+            os.link(src, dst)
+            return LINK_HARDLINK
+        except OSError as e:
+            # Distinto sistema de archivos o sin soporte: probamos lo siguiente
+            if mode == LINK_HARDLINK or e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK,
+                                                         errno.ENOTSUP, errno.EACCES):
+                raise
+
+    if mode in (LINK_AUTO, LINK_REFLINK):
+        try:
+            _reflink(src, dst)
+            return LINK_REFLINK
+        except (OSError, ImportError):
+            if mode == LINK_REFLINK:
+                raise
+
+    shutil.copy2(src, dst)
+    return LINK_COPY
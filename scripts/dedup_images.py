@@ -0,0 +1,229 @@
+"""
+Script para encontrar y apartar imágenes casi duplicadas del dataset
+capture_images.py suele guardar ráfagas de fotos casi iguales; este script
+calcula un hash perceptual (dHash de 64 bits) de cada imagen en varios
+procesos, lo indexa en un BK-tree para buscar vecinos por distancia de
+Hamming sin comparar todos los pares, y reporta o mueve a cuarentena los
+duplicados junto con sus etiquetas.
+
+Uso:
+    python scripts/dedup_images.py                  # Solo reporte
+    python scripts/dedup_images.py --quarantine     # Mover duplicados
+"""
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+
+from dataset_utils import DATASET_DIR, IMAGES_DIR, BACKGROUND_DIR, LABELS_DIR
+
+QUARANTINE_DIR = DATASET_DIR / "quarantine"
+DEFAULT_RADIUS = 5  # Bits distintos (de 64) para considerar dos imágenes iguales
+
+
+def dhash_image(gray, hash_size=8):
+    """
+    Hash perceptual por diferencia (dHash) de una imagen en escala de grises
+
+    Compara cada píxel con su vecino de la derecha en una versión
+    de (hash_size+1) x hash_size.
+
+    Returns:
+        int: Hash de hash_size * hash_size bits
+    """
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+
+    value = 0
+    for bit in diff.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(path, hash_size=8):
+    """
+    dHash de un archivo de imagen
+
+    Returns:
+        tuple: (ruta, hash como int) o (ruta, None) si no se pudo leer
+    """
+    # Leemos ya reducida a 1/4 en gris: mucho más rápido que decodificar completa
+    image = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return path, None
+    return path, dhash_image(image, hash_size)
+
+
+def hamming(a, b):
+    """Número de bits distintos entre dos hashes"""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    Árbol BK para búsquedas por distancia de Hamming
+
+    Cada hijo se guarda bajo la distancia a su padre; por la desigualdad
+    triangular solo hay que bajar por las ramas con distancia en
+    [d - radio, d + radio].
+    """
+
+    def __init__(self):
+        self.root = None  # (hash, item, {distancia: nodo})
+
+    def add(self, value, item):
+        node = (value, item, {})
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, radius):
+        """
+        Returns:
+            list: [(distancia, item), ...] de los elementos a distancia <= radius
+        """
+        if self.root is None:
+            return []
+
+        found = []
+        pending = [self.root]
+        while pending:
+            node_value, item, children = pending.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.append((distance, item))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    pending.append(child)
+        return sorted(found, key=lambda pair: pair[0])
+
+
+def find_duplicates(paths, radius=DEFAULT_RADIUS, workers=None):
+    """
+    Agrupa las imágenes casi iguales
+
+    Recorre las imágenes en orden (de captura) y agrupa con la primera de
+    cada grupo las siguientes a distancia <= radius. Se conserva la primera
+    del grupo que tenga etiqueta (o la primera si ninguna tiene), así nunca
+    se aparta una imagen etiquetada en favor de una sin etiquetar.
+
+    Returns:
+        dict: {imagen conservada: [duplicados, ...]}
+    """
+    paths = sorted(paths)
+
+    # Los hashes se calculan en varios procesos (decodificar usa CPU)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = dict(pool.map(dhash, paths, chunksize=32))
+
+    tree = BKTree()
+    groups = {}
+    for path in paths:
+        value = hashes[path]
+        if value is None:
+            print(f"⚠️  No se pudo leer: {path}")
+            continue
+
+        matches = tree.search(value, radius)
+        if matches:
+            groups[matches[0][1]].append(path)
+        else:
+            tree.add(value, path)
+            groups[path] = []
+
+    duplicates = {}
+    for first, dups in groups.items():
+        if not dups:
+            continue
+        members = [first] + dups
+        kept = next((path for path in members
+                     if (LABELS_DIR / f"{Path(path).stem}.txt").exists()), first)
+        duplicates[kept] = [path for path in members if path != kept]
+    return duplicates
+
+
+def quarantine(duplicates, folder_name):
+    """Mueve los duplicados (y sus etiquetas) a dataset/quarantine/"""
+    image_dest = QUARANTINE_DIR / folder_name
+    label_dest = QUARANTINE_DIR / "labels"
+    os.makedirs(image_dest, exist_ok=True)
+    os.makedirs(label_dest, exist_ok=True)
+
+    moved = 0
+    for dups in duplicates.values():
+        for path in dups:
+            path = Path(path)
+            shutil.move(str(path), str(image_dest / path.name))
+            label_path = LABELS_DIR / f"{path.stem}.txt"
+            if label_path.exists():
+                shutil.move(str(label_path), str(label_dest / label_path.name))
+            moved += 1
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encontrar imágenes casi duplicadas")
+    parser.add_argument("--radius", type=int, default=DEFAULT_RADIUS,
+                        help="Bits distintos permitidos (0-64)")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="Mover los duplicados a dataset/quarantine/")
+    parser.add_argument("--report", default=None, help="Guardar el reporte en JSON")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para calcular hashes")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BÚSQUEDA DE IMÁGENES DUPLICADAS")
+    print("=" * 60)
+
+    report = {}
+    for folder in (IMAGES_DIR, BACKGROUND_DIR):
+        paths = [str(path) for path in Path(folder).glob("*.jpg")]
+        if not paths:
+            continue
+
+        # Cada carpeta por separado: un duplicado entre con_cubo y sin_cubo
+        # sería un error de clasificación, no una ráfaga
+        duplicates = find_duplicates(paths, args.radius, args.workers)
+        n_duplicates = sum(len(dups) for dups in duplicates.values())
+        report[folder.name] = duplicates
+
+        print(f"\n{folder.name}: {len(paths)} imágenes, {n_duplicates} duplicados "
+              f"en {len(duplicates)} grupos")
+        for kept, dups in list(duplicates.items())[:10]:
+            print(f"  {Path(kept).name}: {len(dups)} casi iguales")
+        if len(duplicates) > 10:
+            print(f"  ... y {len(duplicates) - 10} grupos más")
+
+        if args.quarantine and duplicates:
+            moved = quarantine(duplicates, folder.name)
+            print(f"  ✗ Movidas a cuarentena: {moved}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReporte guardado en: {args.report}")
+
+    print("\n" + "=" * 60)
+    if args.quarantine:
+        print(f"Duplicados movidos a: {QUARANTINE_DIR}/")
+        print("Ejecuta prepare_dataset.py para actualizar yolo_dataset")
+    else:
+        print("Usa --quarantine para apartar los duplicados")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
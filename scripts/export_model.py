@@ -1,49 +1,214 @@
 """
 Script para exportar el modelo YOLO entrenado a diferentes formatos
+Cada formato exportado se verifica: sus detecciones sobre imágenes de
+validación deben coincidir con las del .pt y se mide su latencia en esta
+máquina. El resultado queda en el manifiesto (best_manifest.json) que usan
+main.py y RubikDetectorPortable para elegir el backend más rápido.
+Los formatos ya exportados de los mismos pesos no se vuelven a exportar.
 """
+import argparse
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
 from ultralytics import YOLO
 
-def export_model():
+from dataset_utils import PROJECT_ROOT, YOLO_DATASET_DIR
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, str(PROJECT_ROOT))
+from model_manifest import (
+    STATUS_VERIFIED, STATUS_MISMATCH, STATUS_FAILED, STATUS_UNRUNNABLE,
+    weights_sha1, load_manifest, save_manifest, artifact_path,
+)
+from tracking import iou
+
+MODEL_PATH = 'runs/detect/rubik_detector2/weights/best.pt'
+VAL_IMAGES = YOLO_DATASET_DIR / "images/val"
+
+# Formato -> descripción (el orden es el de exportación)
+FORMATS = {
+    'onnx': "Universal",
+    'openvino': "CPU Intel",
+    'engine': "NVIDIA TensorRT",
+    'coreml': "Apple",
+    'saved_model': "TensorFlow",
+    'tflite': "Mobile",
+}
+DEFAULT_FORMATS = ['onnx', 'openvino', 'engine', 'coreml', 'saved_model', 'tflite']
+
+# Tolerancias de la verificación contra el .pt
+PARITY_CONF = 0.25       # Confianza mínima de las detecciones comparadas
+PARITY_MIN_IOU = 0.9     # Cada caja debe solaparse al menos esto con la del .pt
+PARITY_MAX_CONF_DIFF = 0.05
+
+
+def load_images(folder, count):
+    """Imágenes de validación para verificar y medir"""
+    images = []
+    for path in sorted(Path(folder).glob("*.jpg"))[:count]:
+        image = cv2.imread(str(path))
+        if image is not None:
+            images.append(image)
+    return images
+
+
+def predict_all(model, images, imgsz):
+    """Detecciones [(x1, y1, x2, y2, conf), ...] de cada imagen"""
+    detections = []
+    for image in images:
+        result = model(image, imgsz=imgsz, conf=PARITY_CONF, verbose=False)[0]
+        detections.append(sorted(((*box.xyxy[0].tolist(), float(box.conf[0]))
+                                  for box in result.boxes), key=lambda d: -d[4]))
+    return detections
+
+
+def compare_detections(reference, candidate):
+    """
+    Compara las detecciones de un artefacto con las del .pt
+
+    Returns:
+        dict: Diferencias encontradas y si están dentro de las tolerancias
+    """
+    count_mismatches = 0
+    min_iou = 1.0
+    max_conf_diff = 0.0
+
+    for expected, found in zip(reference, candidate):
+        if len(expected) != len(found):
+            count_mismatches += 1
+        remaining = list(found)
+        for box in expected:
+            if not remaining:
+                break
+            best = max(remaining, key=lambda other: iou(box, other))
+            remaining.remove(best)
+            min_iou = min(min_iou, iou(box, best))
+            max_conf_diff = max(max_conf_diff, abs(box[4] - best[4]))
+
+    return {
+        'images': len(reference),
+        'count_mismatches': count_mismatches,
+        'min_iou': round(min_iou, 4),
+        'max_conf_diff': round(max_conf_diff, 4),
+        'ok': (count_mismatches == 0 and min_iou >= PARITY_MIN_IOU
+               and max_conf_diff <= PARITY_MAX_CONF_DIFF),
+    }
+
+
+def measure_latency(model, images, imgsz, runs):
+    """Latencia p50/p95 en ms con lote 1 (tras calentar)"""
+    for image in images[:3]:
+        model(image, imgsz=imgsz, verbose=False)
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        model(images[i % len(images)], imgsz=imgsz, verbose=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2)}
+
+
+def export_model(model_path=MODEL_PATH, formats=DEFAULT_FORMATS, imgsz=640, force=False,
+                 parity_images=20, runs=30):
     """Exporta el modelo a diferentes formatos para usar en otros proyectos"""
-    
-    # Cargar modelo entrenado
-    model = YOLO('runs/detect/rubik_detector2/weights/best.pt')
-    
+    weights_dir = Path(model_path).parent
+    sha1 = weights_sha1(model_path)
+    manifest = load_manifest(model_path)
+
+    # Si los pesos o el imgsz cambiaron, nada de lo anterior vale
+    if manifest.get('weights_sha1') != sha1 or manifest.get('imgsz') != imgsz:
+        manifest = {}
+    artifacts = manifest.get('artifacts', {})
+
+    images = load_images(VAL_IMAGES, parity_images)
+    if not images:
+        print(f"⚠️  No hay imágenes en {VAL_IMAGES}: no se puede verificar")
+        return
+
+    model = YOLO(model_path)
+    reference = predict_all(model, images, imgsz)
+    artifacts['pt'] = {
+        'path': Path(model_path).name,
+        'status': STATUS_VERIFIED,
+        'latency_ms': measure_latency(model, images, imgsz, runs),
+    }
+    print(f"📏 .pt: {artifacts['pt']['latency_ms']['p50']:.1f} ms (p50)")
+
     print("🔄 Exportando modelo a diferentes formatos...")
-    
-    # 1. ONNX (Universal - funciona en muchos frameworks)
-    print("📦 Exportando a ONNX...")
-    model.export(format='onnx')
-    
-    # 2. TensorRT (NVIDIA GPUs - súper rápido)
-    print("⚡ Exportando a TensorRT...")
-    try:
-        model.export(format='engine')
-    except:
-        print("⚠️  TensorRT no disponible (necesita CUDA)")
-    
-    # 3. CoreML (Apple devices)
-    print("🍎 Exportando a CoreML...")
-    try:
-        model.export(format='coreml')
-    except:
-        print("⚠️  CoreML no disponible en Windows")
-    
-    # 4. TensorFlow SavedModel
-    print("🧠 Exportando a TensorFlow...")
-    model.export(format='saved_model')
-    
-    # 5. TensorFlow Lite (móviles)
-    print("📱 Exportando a TFLite...")
-    model.export(format='tflite')
-    
+
+    for fmt in formats:
+        old = artifacts.get(fmt)
+        # Con los mismos pesos, un archivo ya exportado solo se vuelve a verificar
+        if not force and old and old.get('path') and artifact_path(model_path, old).exists():
+            print(f"✓ {fmt} ({FORMATS[fmt]}): al día, no se re-exporta")
+        else:
+            print(f"📦 Exportando a {fmt} ({FORMATS[fmt]})...")
+            try:
+                exported = model.export(format=fmt, imgsz=imgsz)
+            except Exception as e:
+                artifacts[fmt] = {'status': STATUS_FAILED, 'error': f"{type(e).__name__}: {e}",
+                                  'path': None}
+                print(f"⚠️  {fmt} no disponible: {type(e).__name__}: {e}")
+                continue
+            old = {'path': os.path.relpath(exported, weights_dir),
+                   'exported': datetime.now().isoformat(timespec="seconds")}
+
+        # Verificación y latencia en esta máquina (se repiten aunque no se re-exporte)
+        entry = dict(old)
+        try:
+            exported_model = YOLO(str(artifact_path(model_path, entry)), task='detect')
+            entry['parity'] = compare_detections(reference, predict_all(exported_model, images, imgsz))
+            entry['latency_ms'] = measure_latency(exported_model, images, imgsz, runs)
+            entry['status'] = STATUS_VERIFIED if entry['parity']['ok'] else STATUS_MISMATCH
+            entry.pop('error', None)
+        except Exception as e:
+            entry['status'] = STATUS_UNRUNNABLE
+            entry['error'] = f"{type(e).__name__}: {e}"
+            print(f"⚠️  {fmt} no se pudo ejecutar en esta máquina: {entry['error']}")
+            artifacts[fmt] = entry
+            continue
+
+        artifacts[fmt] = entry
+        parity = entry['parity']
+        mark = "✅" if entry['status'] == STATUS_VERIFIED else "❌"
+        print(f"{mark} {fmt}: {entry['latency_ms']['p50']:.1f} ms (p50), IoU mín {parity['min_iou']:.3f}, "
+              f"Δconf máx {parity['max_conf_diff']:.3f}, {parity['count_mismatches']} imágenes distintas")
+
+    save_manifest(model_path, {
+        'weights': Path(model_path).name,
+        'weights_sha1': sha1,
+        'imgsz': imgsz,
+        'host': platform.node(),
+        'updated': datetime.now().isoformat(timespec="seconds"),
+        'artifacts': artifacts,
+    })
+
+    verified = [(fmt, a['latency_ms']['p50']) for fmt, a in artifacts.items()
+                if a.get('status') == STATUS_VERIFIED]
+    fastest = min(verified, key=lambda item: item[1])
+
     print("\n✅ Exportaciones completadas!")
-    print("📁 Archivos generados:")
-    print("   - best.onnx          # Universal")
-    print("   - best.engine        # NVIDIA TensorRT")
-    print("   - best.coreml        # Apple")
-    print("   - best_saved_model/  # TensorFlow")
-    print("   - best.tflite        # Mobile")
+    print("📁 Estado de los formatos:")
+    for fmt, artifact in artifacts.items():
+        print(f"   - {fmt:<12} {artifact['status']:<10} {artifact.get('path') or ''}")
+    print(f"\n🏆 Backend más rápido verificado: {fastest[0]} ({fastest[1]:.1f} ms)")
+
 
 if __name__ == "__main__":
-    export_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Exportar el modelo a otros formatos")
+    parser.add_argument("--model", default=MODEL_PATH, help="Modelo .pt a exportar")
+    parser.add_argument("--formats", nargs="+", default=DEFAULT_FORMATS, choices=list(FORMATS),
+                        help="Formatos a exportar")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamaño de entrada")
+    parser.add_argument("--force", action="store_true", help="Re-exportar aunque esté al día")
+    parser.add_argument("--parity-images", type=int, default=20,
+                        help="Imágenes de validación para verificar")
+    parser.add_argument("--runs", type=int, default=30, help="Inferencias para medir latencia")
+    args = parser.parse_args()
+    export_model(args.model, args.formats, args.imgsz, args.force, args.parity_images, args.runs)
@@ -0,0 +1,289 @@
+"""
+Caché de imágenes pre-decodificadas en un archivo memory-mapped
+Decodifica una sola vez los JPEG de yolo_dataset, los redimensiona al imgsz
+de entrenamiento con letterbox y los guarda en un .npy que se abre con mmap.
+Entrenamiento, validación y benchmarks leen de ahí sin decodificar, y varios
+procesos pueden compartir el archivo en solo lectura.
+
+Uso:
+    python scripts/image_cache.py --imgsz 640
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from dataset_utils import YOLO_DATASET_DIR, read_yolo_labels
+
+# Color de relleno del letterbox (el mismo que usa ultralytics)
+PAD_COLOR = 114
+
+
+def letterbox_params(orig_h, orig_w, imgsz):
+    """
+    Calcula el tamaño redimensionado y el relleno del letterbox
+
+    Returns:
+        tuple: ((new_h, new_w), (top, left))
+    """
+    ratio = imgsz / max(orig_h, orig_w)
+    new_h = min(math.ceil(orig_h * ratio), imgsz)
+    new_w = min(math.ceil(orig_w * ratio), imgsz)
+    # Relleno centrado, redondeado igual que ultralytics
+    top = int(round((imgsz - new_h) / 2 - 0.1))
+    left = int(round((imgsz - new_w) / 2 - 0.1))
+    return (new_h, new_w), (top, left)
+
+
+def letterbox(image, imgsz):
+    """
+    Redimensiona conservando la proporción y rellena hasta imgsz x imgsz
+
+    Returns:
+        tuple: (imagen imgsz x imgsz, (new_h, new_w), (top, left))
+    """
+    orig_h, orig_w = image.shape[:2]
+    (new_h, new_w), (top, left) = letterbox_params(orig_h, orig_w, imgsz)
+
+    if (new_h, new_w) != (orig_h, orig_w):
+        interpolation = cv2.INTER_AREA if new_w < orig_w else cv2.INTER_LINEAR
+        image = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+
+    canvas = np.full((imgsz, imgsz, 3), PAD_COLOR, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = image
+    return canvas, (new_h, new_w), (top, left)
+
+
+def cache_paths(dataset_root, imgsz):
+    """Rutas del array de imágenes y de su índice para un imgsz"""
+    dataset_root = Path(dataset_root)
+    return dataset_root / f"image_cache_{imgsz}.npy", dataset_root / f"image_cache_{imgsz}.json"
+
+
+def list_dataset_images(dataset_root):
+    """Lista (split, ruta de imagen, ruta de etiqueta) de yolo_dataset"""
+    dataset_root = Path(dataset_root)
+    items = []
+    for split in ("train", "val"):
+        for image_path in sorted((dataset_root / "images" / split).glob("*.jpg")):
+            label_path = dataset_root / "labels" / split / f"{image_path.stem}.txt"
+            items.append((split, image_path, label_path))
+    return items
+
+
+def build_cache(dataset_root=YOLO_DATASET_DIR, imgsz=640, workers=8, force=False):
+    """
+    Construye (o reutiliza) la caché de imágenes para un imgsz
+
+    Si ninguna imagen cambió desde la última vez (tamaño y fecha), no hace nada.
+
+    Returns:
+        Path: Ruta del índice JSON
+    """
+    array_path, index_path = cache_paths(dataset_root, imgsz)
+    items = list_dataset_images(dataset_root)
+
+    # Firma de las imágenes para saber si la caché sigue siendo válida
+    signature = []
+    for split, image_path, _ in items:
+        stat = image_path.stat()
+        signature.append([str(image_path), stat.st_size, stat.st_mtime_ns])
+
+    if not force and index_path.exists() and array_path.exists():
+        with open(index_path, 'r') as f:
+            old_index = json.load(f)
+        if old_index.get('signature') == signature:
+            print(f"✓ Caché al día: {array_path}")
+            return index_path
+
+    print(f"Decodificando {len(items)} imágenes a {imgsz}x{imgsz}...")
+    start_time = time.monotonic()
+
+    # Creamos el .npy directamente en disco (no ocupa RAM)
+    images = np.lib.format.open_memmap(array_path, mode='w+', dtype=np.uint8,
+                                       shape=(len(items), imgsz, imgsz, 3))
+
+    def decode(position):
+        split, image_path, label_path = items[position]
+        image = cv2.imread(str(image_path))
+        if image is None:
+            return None
+        canvas, resized_shape, pad = letterbox(image, imgsz)
+        images[position] = canvas
+        return {
+            'path': str(image_path),
+            'split': split,
+            'orig_shape': list(image.shape[:2]),
+            'resized_shape': list(resized_shape),
+            'pad': list(pad),
+            'labels': read_yolo_labels(label_path),
+        }
+
+    # cv2.imread y cv2.resize liberan el GIL: los hilos decodifican en paralelo
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(decode, range(len(items))))
+
+    images.flush()
+    del images
+
+    missing = sum(1 for entry in entries if entry is None)
+    if missing:
+        print(f"⚠️  {missing} imágenes no se pudieron leer")
+
+    index = {
+        'imgsz': imgsz,
+        'array': array_path.name,
+        'signature': signature,
+        'entries': entries,
+    }
+    tmp_path = index_path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+    size_mb = array_path.stat().st_size / 1e6
+    print(f"✓ Caché creada en {time.monotonic() - start_time:.1f} s: {array_path} ({size_mb:.0f} MB)")
+    return index_path
+
+
+class ImageCache:
+    """
+    Lector de la caché de imágenes
+
+    El archivo se abre con mmap en solo lectura al primer acceso, así que el
+    objeto se puede pasar a procesos worker (el mmap no se copia al serializar).
+    """
+
+    def __init__(self, index_path):
+        self.index_path = Path(index_path)
+        with open(self.index_path, 'r') as f:
+            index = json.load(f)
+
+        self.imgsz = index['imgsz']
+        self.array_path = self.index_path.parent / index['array']
+        self.entries = index['entries']
+        self._positions = {}
+        for position, entry in enumerate(self.entries):
+            if entry is not None:
+                self._positions[os.path.normcase(os.path.abspath(entry['path']))] = position
+        self._images = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getstate__(self):
+        # No serializamos el mmap: cada proceso lo abre por su cuenta
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
+    @property
+    def images(self):
+        """Array (N, imgsz, imgsz, 3) en solo lectura"""
+        if self._images is None:
+            self._images = np.load(self.array_path, mmap_mode='r')
+        return self._images
+
+    def find(self, image_path):
+        """Posición de una imagen en la caché (None si no está)"""
+        return self._positions.get(os.path.normcase(os.path.abspath(str(image_path))))
+
+    def positions(self, split=None):
+        """Posiciones válidas, opcionalmente solo de un split"""
+        return [position for position, entry in enumerate(self.entries)
+                if entry is not None and (split is None or entry['split'] == split)]
+
+    def letterboxed(self, position):
+        """Imagen imgsz x imgsz lista para inferencia (vista sin copia)"""
+        return self.images[position]
+
+    def resized(self, position):
+        """Imagen redimensionada sin el relleno (vista sin copia)"""
+        entry = self.entries[position]
+        (new_h, new_w), (top, left) = entry['resized_shape'], entry['pad']
+        return self.images[position, top:top + new_h, left:left + new_w]
+
+    def batch(self, positions):
+        """Varias imágenes letterbox apiladas en un solo array"""
+        return self.images[np.asarray(positions)]
+
+    def labels(self, position):
+        """Etiquetas YOLO [[clase, cx, cy, w, h], ...] de la imagen original"""
+        return self.entries[position]['labels']
+
+    def orig_shape(self, position):
+        """(alto, ancho) de la imagen original"""
+        return tuple(self.entries[position]['orig_shape'])
+
+
+class CachedImageLoader:
+    """
+    Reemplazo de load_image() para los datasets de ultralytics
+
+    Devuelve la imagen de la caché en vez de decodificar el JPEG; si la imagen
+    no está en la caché o el imgsz no coincide, usa el método original.
+    En modo aumentación hace lo mismo que BaseDataset.load_image: guarda la
+    imagen y sus tamaños en el dataset y la anota en `buffer`, de donde el
+    mosaico elige las otras imágenes de cada muestra.
+    """
+
+    def __init__(self, dataset, cache):
+        self.dataset = dataset
+        self.cache = cache
+
+    def __call__(self, i, rect_mode=True):
+        dataset = self.dataset
+        if dataset.ims[i] is not None:
+            return dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i]
+
+        position = self.cache.find(dataset.im_files[i])
+        if position is None or not rect_mode or dataset.imgsz != self.cache.imgsz:
+            return type(dataset).load_image(dataset, i, rect_mode)
+
+        # Copia desde el page cache: las aumentaciones modifican la imagen
+        image = self.cache.resized(position).copy()
+        orig_shape, resized_shape = self.cache.orig_shape(position), image.shape[:2]
+
+        if dataset.augment:
+            dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i] = image, orig_shape, resized_shape
+            dataset.buffer.append(i)
+            if 1 < len(dataset.buffer) >= dataset.max_buffer_length:
+                j = dataset.buffer.pop(0)
+                if dataset.cache != "ram":
+                    dataset.ims[j], dataset.im_hw0[j], dataset.im_hw[j] = None, None, None
+        return image, orig_shape, resized_shape
+
+
+def attach_to_dataset(dataset, cache):
+    """Hace que un dataset de ultralytics lea las imágenes desde la caché"""
+    dataset.load_image = CachedImageLoader(dataset, cache)
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crear caché de imágenes pre-decodificadas")
+    parser.add_argument("--dataset", default=str(YOLO_DATASET_DIR), help="Carpeta del dataset YOLO")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamaño de entrada del modelo")
+    parser.add_argument("--workers", type=int, default=8, help="Hilos de decodificación")
+    parser.add_argument("--force", action="store_true", help="Reconstruir aunque esté al día")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CACHÉ DE IMÁGENES")
+    print("=" * 60)
+    index_path = build_cache(args.dataset, args.imgsz, args.workers, args.force)
+    cache = ImageCache(index_path)
+    print(f"Imágenes: {len(cache)} (train: {len(cache.positions('train'))}, "
+          f"val: {len(cache.positions('val'))})")
+    print(f"Índice: {index_path}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
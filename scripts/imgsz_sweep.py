@@ -0,0 +1,163 @@
+"""
+Barrido de tamaño de entrada: precisión contra latencia en CPU
+Evalúa el modelo (y opcionalmente variantes re-entrenadas) con model.val()
+sobre yolo_dataset/images/val a varios imgsz, mide la latencia en CPU con
+benchmark.py y muestra la frontera de Pareto. Recomienda el tamaño más
+pequeño cuya mAP50-95 queda dentro de la tolerancia respecto a la mejor.
+
+Uso:
+    python scripts/imgsz_sweep.py
+    python scripts/imgsz_sweep.py --sizes 256 320 416 512 640 --tolerance 0.02
+    python scripts/imgsz_sweep.py --image-cache   # Sin decodificar JPEG en cada pasada
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from benchmark import RESULTS_DIR, DEFAULT_IMAGES, run_combination
+from dataset_utils import PROJECT_ROOT, YOLO_DATASET_DIR
+from image_cache import build_cache
+
+MODEL_PATH = str(PROJECT_ROOT / "runs/detect/rubik_detector2/weights/best.pt")
+DEFAULT_SIZES = [256, 320, 384, 448, 512, 640]
+TOLERANCE = 0.01  # Pérdida máxima aceptable de mAP50-95 (absoluta)
+STRIDE = 32       # Los imgsz deben ser múltiplos del stride del modelo
+
+
+def cached_validator(cache_index):
+    """Validador de ultralytics que lee las imágenes desde la caché de image_cache.py"""
+    from ultralytics.models.yolo.detect import DetectionValidator
+    from image_cache import ImageCache, attach_to_dataset
+
+    class CachedDetectionValidator(DetectionValidator):
+        def build_dataset(self, img_path, mode="val", batch=None):
+            dataset = super().build_dataset(img_path, mode, batch)
+            return attach_to_dataset(dataset, ImageCache(cache_index))
+
+    return CachedDetectionValidator
+
+
+def evaluate(model_path, imgsz, data, batch, cache_index=None):
+    """
+    Precisión del modelo en el split de validación a un imgsz
+
+    Args:
+        cache_index: Índice de image_cache.py con este imgsz (None = leer los JPEG)
+
+    Returns:
+        dict: {'map50', 'map50_95'}
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    extra = {'validator': cached_validator(cache_index)} if cache_index else {}
+    metrics = model.val(data=data, imgsz=imgsz, batch=batch, device="cpu",
+                        plots=False, verbose=False, **extra)
+    return {'map50': round(float(metrics.box.map50), 4),
+            'map50_95': round(float(metrics.box.map), 4)}
+
+
+def pareto_front(points):
+    """
+    Puntos no dominados: ningún otro es a la vez más rápido y más preciso
+
+    Returns:
+        list: Puntos de la frontera ordenados por latencia
+    """
+    front = []
+    best_map = -1.0
+    for point in sorted(points, key=lambda p: (p['latency_ms'], -p['map50_95'])):
+        if point['map50_95'] > best_map:
+            front.append(point)
+            best_map = point['map50_95']
+    return front
+
+
+def recommend(points, tolerance):
+    """El imgsz más pequeño (más rápido a igual imgsz) dentro de la tolerancia"""
+    best = max(point['map50_95'] for point in points)
+    candidates = [point for point in points if point['map50_95'] >= best - tolerance]
+    return min(candidates, key=lambda p: (p['imgsz'], p['latency_ms']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de imgsz: precisión contra latencia")
+    parser.add_argument("--models", nargs="+", default=[MODEL_PATH], help="Modelos .pt a evaluar")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="imgsz a probar")
+    parser.add_argument("--data", default=str(YOLO_DATASET_DIR / "data.yaml"), help="data.yaml")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Pérdida máxima aceptable de mAP50-95")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Hilos de CPU")
+    parser.add_argument("--val-batch", type=int, default=16, help="Lote para model.val()")
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--image-cache", action="store_true",
+                        help="Evaluar y medir con la caché de imágenes (se crea una por imgsz)")
+    args = parser.parse_args()
+
+    sizes = sorted({max(STRIDE, round(size / STRIDE) * STRIDE) for size in args.sizes})
+    if sizes != sorted(set(args.sizes)):
+        print(f"⚠️  imgsz ajustados a múltiplos de {STRIDE}: {sizes}")
+
+    print("=" * 60)
+    print("BARRIDO DE TAMAÑO DE ENTRADA")
+    print("=" * 60)
+
+    # Mismos parámetros de medición que benchmark.py (lote 1, como en main.py)
+    bench_args = argparse.Namespace(images=str(DEFAULT_IMAGES), video=None, max_images=32,
+                                    warmup=3, iterations=30, image_cache=None)
+
+    # Una caché por imgsz: se decodifica una vez y sirve para todos los modelos
+    caches = {}
+    if args.image_cache:
+        caches = {imgsz: str(build_cache(imgsz=imgsz)) for imgsz in sizes}
+
+    points = []
+    for model_path in args.models:
+        for imgsz in sizes:
+            accuracy = evaluate(model_path, imgsz, args.data, args.val_batch, caches.get(imgsz))
+            bench_args.image_cache = caches.get(imgsz)
+            timing = run_combination(model_path, imgsz, 1, args.threads, bench_args)
+            if 'error' in timing:
+                print(f"✗ {Path(model_path).name} imgsz={imgsz}: {timing['error']}")
+                continue
+
+            point = {'model': model_path, 'imgsz': imgsz, **accuracy,
+                     'latency_ms': timing['latency_ms']['p50'],
+                     'latency_p95_ms': timing['latency_ms']['p95']}
+            points.append(point)
+            print(f"✓ {Path(model_path).name} imgsz={imgsz}: mAP50 {point['map50']:.3f}, "
+                  f"mAP50-95 {point['map50_95']:.3f}, p50 {point['latency_ms']:.1f} ms")
+
+    if not points:
+        print("No se pudo medir ninguna combinación")
+        return
+
+    front = pareto_front(points)
+    choice = recommend(points, args.tolerance)
+
+    print("\nFrontera de Pareto (latencia p50 / mAP50-95):")
+    for point in front:
+        marker = "  ⭐" if point is choice else ""
+        print(f"  {Path(point['model']).name} imgsz={point['imgsz']:>4}: "
+              f"{point['latency_ms']:7.1f} ms  mAP50-95 {point['map50_95']:.3f}{marker}")
+
+    print(f"\n💡 Recomendado: imgsz={choice['imgsz']} ({Path(choice['model']).name}), "
+          f"mAP50-95 {choice['map50_95']:.3f}, {choice['latency_ms']:.1f} ms "
+          f"(tolerancia {args.tolerance})")
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"imgsz_sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(output.parent, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'threads': args.threads, 'tolerance': args.tolerance, 'points': points,
+                   'pareto': front, 'recommended': choice}, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print(f"Resultados guardados en: {output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
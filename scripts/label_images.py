@@ -1,161 +1,413 @@
 """
 Script para etiquetar imágenes - Marcar dónde está el cubo en cada foto
-Dibuja un rectángulo alrededor del cubo y guarda las coordenadas para YOLO
+Dibuja rectángulos alrededor de los cubos y guarda las coordenadas para YOLO
+
+Las siguientes imágenes se decodifican en un hilo aparte mientras etiquetas,
+y la ventana solo se redibuja cuando hay un evento de mouse o teclado.
+
+Con --prelabel el modelo actual propone cajas en segundo plano: 'a' acepta
+la siguiente propuesta y arrastrar una esquina ajusta cualquier caja.
+Los borradores de dataset/labels_draft (active_capture.py) se muestran
+siempre como propuestas.
 """
+import argparse
 import cv2
-import os
 import glob
+import os
+import queue
+import threading
+
+from dataset_utils import IMAGES_DIR, LABELS_DIR, DRAFT_LABELS_DIR, PROJECT_ROOT
 
 # Configuración
-IMAGES_FOLDER = "dataset/con_cubo"
-LABELS_FOLDER = "dataset/labels"
+IMAGES_FOLDER = str(IMAGES_DIR)
+LABELS_FOLDER = str(LABELS_DIR)
+MODEL_PATH = str(PROJECT_ROOT / "runs/detect/rubik_detector2/weights/best.pt")
+WINDOW_NAME = "Etiquetar Imagen"
+PREFETCH_DEPTH = 4  # Imágenes decodificadas por adelantado
+WAIT_MS = 30        # waitKey duerme este tiempo cuando no pasa nada
+GRAB_RADIUS = 12    # Distancia en píxeles para agarrar una esquina
+MIN_BOX_SIZE = 4    # Cajas más pequeñas se descartan (clics accidentales)
 
 # Variables globales para dibujar
 drawing = False
-ix, iy = -1, -1
-fx, fy = -1, -1
+boxes = []          # Cajas aceptadas de la imagen actual [x1, y1, x2, y2]
+proposals = []      # Propuestas del modelo aún no aceptadas [x1, y1, x2, y2, conf]
+active_box = None   # Índice de la caja que se está dibujando o ajustando
+anchor = (-1, -1)   # Esquina fija mientras se arrastra la opuesta
 current_image = None
-current_image_copy = None
+# True cuando hay que volver a pintar la ventana
+needs_redraw = True
+
+
+class ImagePrefetcher:
+    """Decodifica las próximas imágenes en un hilo de fondo"""
+
+    def __init__(self, paths, depth=PREFETCH_DEPTH):
+        self.paths = paths
+        self.queue = queue.Queue(maxsize=depth)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        for path in self.paths:
+            image = cv2.imread(path)
+            # put con timeout para poder salir si el usuario cierra
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put((path, image), timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+            if self.stop_event.is_set():
+                return
+        self.queue.put((None, None))
+
+    def __iter__(self):
+        while True:
+            path, image = self.queue.get()
+            if path is None:
+                return
+            yield path, image
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class ProposalWorker:
+    """
+    Ejecuta el modelo por lotes sobre las imágenes pendientes en segundo plano
+
+    Las propuestas se calculan en el mismo orden en que se etiquetan, así
+    normalmente ya están listas cuando llegas a cada imagen.
+    """
+
+    def __init__(self, paths, model_path=MODEL_PATH, conf=0.25, batch=16):
+        self.paths = paths
+        self.model_path = model_path
+        self.conf = conf
+        self.batch = batch
+        self.results = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        from ultralytics import YOLO
+
+        model = YOLO(self.model_path)
+        for start in range(0, len(self.paths), self.batch):
+            if self.stop_event.is_set():
+                return
+            batch_paths = self.paths[start:start + self.batch]
+            results = model(batch_paths, conf=self.conf, verbose=False)
+
+            with self.lock:
+                for path, result in zip(batch_paths, results):
+                    self.results[path] = [
+                        [*map(int, box.xyxy[0]), float(box.conf[0])] for box in result.boxes
+                    ]
+
+    def get(self, path):
+        """Propuestas de una imagen (None si todavía no están listas)"""
+        with self.lock:
+            return self.results.get(path)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def load_draft(draft_path, image_shape):
+    """
+    Lee una etiqueta borrador como propuestas en píxeles
+
+    El borrador es formato YOLO con la confianza como sexta columna opcional.
+
+    Returns:
+        list: [[x1, y1, x2, y2, conf], ...] o None si no hay borrador
+    """
+    if not os.path.exists(draft_path):
+        return None
+
+    height, width = image_shape[:2]
+    proposals = []
+    with open(draft_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cx, cy, w, h = (float(value) for value in parts[1:5])
+            conf = float(parts[5]) if len(parts) > 5 else 0.0
+            proposals.append([int((cx - w / 2) * width), int((cy - h / 2) * height),
+                              int((cx + w / 2) * width), int((cy + h / 2) * height), conf])
+    return proposals
+
+
+def find_corner(x, y, candidates):
+    """
+    Busca una esquina cerca del punto (x, y)
+
+    Returns:
+        tuple: (índice de la caja, esquina opuesta) o (None, None)
+    """
+    for index, box in enumerate(candidates):
+        x1, y1, x2, y2 = box[:4]
+        for cx, cy, opposite in ((x1, y1, (x2, y2)), (x2, y1, (x1, y2)),
+                                 (x1, y2, (x2, y1)), (x2, y2, (x1, y1))):
+            if abs(x - cx) <= GRAB_RADIUS and abs(y - cy) <= GRAB_RADIUS:
+                return index, opposite
+    return None, None
+
 
 def draw_rectangle(event, x, y, flags, param):
-    """Función callback para dibujar rectángulo con el mouse"""
-    global ix, iy, fx, fy, drawing, current_image_copy
-    
+    """Función callback para dibujar o ajustar rectángulos con el mouse"""
+    global drawing, active_box, anchor, needs_redraw
+
     if event == cv2.EVENT_LBUTTONDOWN:
-        # Cuando presionas el botón del mouse
         drawing = True
-        ix, iy = x, y
-        
+
+        # ¿Agarramos la esquina de una caja ya aceptada?
+        index, opposite = find_corner(x, y, boxes)
+        if index is None:
+            # ¿O la de una propuesta? Se acepta y se ajusta
+            index, opposite = find_corner(x, y, proposals)
+            if index is not None:
+                boxes.append(proposals.pop(index)[:4])
+                index = len(boxes) - 1
+
+        if index is None:
+            # Caja nueva
+            boxes.append([x, y, x, y])
+            index = len(boxes) - 1
+            opposite = (x, y)
+
+        active_box = index
+        anchor = opposite
+        needs_redraw = True
+
     elif event == cv2.EVENT_MOUSEMOVE:
-        # Mientras mueves el mouse
-        if drawing:
-            current_image_copy = current_image.copy()
-            cv2.rectangle(current_image_copy, (ix, iy), (x, y), (0, 255, 0), 2)
-            
+        # Mientras mueves el mouse (solo importa si estamos dibujando)
+        if drawing and active_box is not None:
+            boxes[active_box] = [anchor[0], anchor[1], x, y]
+            needs_redraw = True
+
     elif event == cv2.EVENT_LBUTTONUP:
-        # Cuando sueltas el botón del mouse
+        # Cuando sueltas el botón del mouse normalizamos la caja
+        if drawing and active_box is not None:
+            x1, y1 = anchor
+            box = [min(x1, x), min(y1, y), max(x1, x), max(y1, y)]
+            if box[2] - box[0] < MIN_BOX_SIZE or box[3] - box[1] < MIN_BOX_SIZE:
+                boxes.pop(active_box)
+            else:
+                boxes[active_box] = box
         drawing = False
-        fx, fy = x, y
-        cv2.rectangle(current_image_copy, (ix, iy), (fx, fy), (0, 255, 0), 2)
+        active_box = None
+        needs_redraw = True
+
 
+def render(info):
+    """Pinta la imagen actual con las cajas, las propuestas y el texto de ayuda"""
+    display_img = current_image.copy()
 
-def main():
+    # Propuestas del modelo en amarillo, con su confianza
+    for x1, y1, x2, y2, conf in proposals:
+        cv2.rectangle(display_img, (x1, y1), (x2, y2), (0, 255, 255), 1)
+        cv2.putText(display_img, f"{conf:.2f}", (x1, max(y1 - 5, 10)),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+
+    # Cajas aceptadas en verde
+    for x1, y1, x2, y2 in boxes:
+        cv2.rectangle(display_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+    cv2.putText(display_img, info, (10, 30),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    cv2.putText(display_img, f"Cajas: {len(boxes)} | Propuestas: {len(proposals)}", (10, 50),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    cv2.imshow(WINDOW_NAME, display_img)
+
+
+def save_labels(label_path, image_shape):
+    """Guarda todas las cajas aceptadas en formato YOLO"""
+    # Obtener dimensiones de la imagen
+    height, width = image_shape[:2]
+
+    lines = []
+    for x_min, y_min, x_max, y_max in boxes:
+        # Recortamos al borde de la imagen
+        x_min, x_max = max(0, x_min), min(width, x_max)
+        y_min, y_max = max(0, y_min), min(height, y_max)
+
+        # Convertir a formato YOLO (normalizado 0-1)
+        # YOLO usa: class x_center y_center width height
+        x_center = ((x_min + x_max) / 2) / width
+        y_center = ((y_min + y_max) / 2) / height
+        bbox_width = (x_max - x_min) / width
+        bbox_height = (y_max - y_min) / height
+
+        # Clase 0 = cubo de Rubik
+        lines.append(f"0 {x_center:.6f} {y_center:.6f} {bbox_width:.6f} {bbox_height:.6f}\n")
+
+    with open(label_path, 'w') as f:
+        f.writelines(lines)
+
+
+def main(prelabel=False, model_path=MODEL_PATH, conf=0.25, batch=16):
     """Función principal para etiquetar imágenes"""
-    global current_image, current_image_copy, ix, iy, fx, fy
-    
+    global current_image, boxes, proposals, drawing, active_box, needs_redraw
+
     print("=" * 60)
     print("ETIQUETADO DE IMÁGENES PARA YOLO")
     print("=" * 60)
     print("Instrucciones:")
-    print("  1. Dibuja un rectángulo alrededor del cubo")
+    print("  1. Dibuja un rectángulo alrededor de cada cubo")
+    print("     (arrastra una esquina para ajustar una caja)")
     print("  2. Presiona ESPACIO para guardar y pasar a la siguiente")
     print("  3. Presiona 's' para SALTAR esta imagen (sin cubo visible)")
-    print("  4. Presiona 'q' para salir")
+    print("  4. Presiona 'z' para deshacer la última caja")
+    if prelabel:
+        print("  5. Presiona 'a' para aceptar la siguiente propuesta ('A' = todas)")
+    print("  Presiona 'q' para salir")
     print("=" * 60)
-    
+
     # Crear carpeta de etiquetas si no existe
     os.makedirs(LABELS_FOLDER, exist_ok=True)
-    
+
     # Obtener lista de imágenes
     image_files = sorted(glob.glob(f"{IMAGES_FOLDER}/*.jpg"))
-    
+
     if len(image_files) == 0:
-        print("No se encontraron imágenes en dataset/con_cubo/")
+        print(f"No se encontraron imágenes en {IMAGES_FOLDER}/")
+        return
+
+    # Un solo listado de la carpeta de etiquetas en vez de os.path.exists por imagen
+    labeled = {name[:-4] for name in os.listdir(LABELS_FOLDER) if name.endswith('.txt')}
+    pending = [path for path in image_files
+               if os.path.splitext(os.path.basename(path))[0] not in labeled]
+
+    print(f"\nTotal de imágenes: {len(image_files)}")
+    print(f"Ya etiquetadas: {len(image_files) - len(pending)}")
+    print(f"Por etiquetar: {len(pending)}\n")
+
+    if len(pending) == 0:
         return
-    
-    print(f"\nTotal de imágenes a etiquetar: {len(image_files)}\n")
-    
+
     # Crear ventana y asignar callback del mouse
-    cv2.namedWindow("Etiquetar Imagen")
-    cv2.setMouseCallback("Etiquetar Imagen", draw_rectangle)
-    
+    cv2.namedWindow(WINDOW_NAME)
+    cv2.setMouseCallback(WINDOW_NAME, draw_rectangle)
+
     labeled_count = 0
-    
-    for idx, image_path in enumerate(image_files):
-        # Cargar imagen
-        current_image = cv2.imread(image_path)
-        current_image_copy = current_image.copy()
-        
+    prefetcher = ImagePrefetcher(pending)
+    proposal_worker = ProposalWorker(pending, model_path, conf, batch) if prelabel else None
+
+    for idx, (image_path, image) in enumerate(prefetcher):
+        if image is None:
+            print(f"⚠️  No se pudo leer: {image_path}")
+            continue
+
+        current_image = image
+
         # Nombre del archivo sin extensión
-        image_name = os.path.basename(image_path).replace('.jpg', '')
+        image_name = os.path.splitext(os.path.basename(image_path))[0]
         label_path = f"{LABELS_FOLDER}/{image_name}.txt"
-        
-        # Si ya tiene etiqueta, saltarla
-        if os.path.exists(label_path):
-            print(f"[{idx+1}/{len(image_files)}] Ya etiquetada: {image_name}")
-            continue
-        
-        # Reiniciar coordenadas
-        ix, iy, fx, fy = -1, -1, -1, -1
-        
-        print(f"\n[{idx+1}/{len(image_files)}] Etiquetando: {image_name}")
+        draft_path = DRAFT_LABELS_DIR / f"{image_name}.txt"
+
+        # Reiniciar cajas (el borrador, si existe, tiene prioridad sobre el modelo)
+        boxes = []
+        proposals = load_draft(draft_path, image.shape)
+        proposals_loaded = proposals is not None or proposal_worker is None
+        proposals = sorted(proposals or [], key=lambda p: -p[4])
+        drawing = False
+        active_box = None
+        needs_redraw = True
+
+        print(f"\n[{idx+1}/{len(pending)}] Etiquetando: {image_name}")
         print("Dibuja un rectángulo alrededor del cubo...")
-        
+
+        info = f"Imagen {idx+1}/{len(pending)} - ESPACIO: Guardar | S: Saltar | Z: Deshacer | Q: Salir"
+
         while True:
-            # Mostrar imagen
-            display_img = current_image_copy.copy()
-            
-            # Mostrar información
-            info = f"Imagen {idx+1}/{len(image_files)} - ESPACIO: Guardar | S: Saltar | Q: Salir"
-            cv2.putText(display_img, info, (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            
-            cv2.imshow("Etiquetar Imagen", display_img)
-            
-            key = cv2.waitKey(1) & 0xFF
-            
-            # ESPACIO - Guardar etiqueta
+            # Las propuestas pueden llegar mientras la imagen ya está en pantalla
+            if not proposals_loaded:
+                result = proposal_worker.get(image_path)
+                if result is not None:
+                    proposals = sorted(result, key=lambda p: -p[4])
+                    proposals_loaded = True
+                    needs_redraw = True
+
+            # Solo redibujamos si algo cambió
+            if needs_redraw:
+                needs_redraw = False
+                render(info)
+
+            # waitKey duerme hasta que llega una tecla o pasa WAIT_MS
+            key = cv2.waitKey(WAIT_MS) & 0xFF
+
+            # ESPACIO - Guardar etiquetas
             if key == ord(' '):
-                # Verificar que se haya dibujado un rectángulo
-                if ix != -1 and iy != -1 and fx != -1 and fy != -1:
-                    # Obtener dimensiones de la imagen
-                    height, width = current_image.shape[:2]
-                    
-                    # Calcular coordenadas del rectángulo
-                    x_min = min(ix, fx)
-                    y_min = min(iy, fy)
-                    x_max = max(ix, fx)
-                    y_max = max(iy, fy)
-                    
-                    # Convertir a formato YOLO (normalizado 0-1)
-                    # YOLO usa: class x_center y_center width height
-                    x_center = ((x_min + x_max) / 2) / width
-                    y_center = ((y_min + y_max) / 2) / height
-                    bbox_width = (x_max - x_min) / width
-                    bbox_height = (y_max - y_min) / height
-                    
-                    # Guardar en archivo .txt
-                    # Clase 0 = cubo de Rubik
-                    with open(label_path, 'w') as f:
-                        f.write(f"0 {x_center:.6f} {y_center:.6f} {bbox_width:.6f} {bbox_height:.6f}\n")
-                    
-                    print(f"✓ Etiqueta guardada: {label_path}")
+                # Verificar que haya al menos una caja
+                if boxes and not drawing:
+                    save_labels(label_path, current_image.shape)
+                    print(f"✓ Etiqueta guardada: {label_path} ({len(boxes)} cajas)")
+                    if draft_path.exists():
+                        draft_path.unlink()
                     labeled_count += 1
                     break
                 else:
-                    print("Debes dibujar un rectángulo primero!")
-            
+                    print("Debes dibujar o aceptar un rectángulo primero!")
+
+            # A - Aceptar la siguiente propuesta (la de mayor confianza)
+            elif key == ord('a') and proposals:
+                boxes.append(proposals.pop(0)[:4])
+                needs_redraw = True
+
+            # Shift+A - Aceptar todas las propuestas
+            elif key == ord('A') and proposals:
+                boxes.extend(proposal[:4] for proposal in proposals)
+                proposals = []
+                needs_redraw = True
+
+            # Z - Deshacer la última caja
+            elif (key == ord('z') or key == ord('Z')) and boxes and not drawing:
+                boxes.pop()
+                needs_redraw = True
+
             # S - Saltar imagen (sin cubo visible)
             elif key == ord('s') or key == ord('S'):
                 print("Imagen saltada (sin cubo visible)")
                 break
-            
+
             # Q - Salir
             elif key == ord('q') or key == ord('Q'):
                 print("\nSaliendo del etiquetado...")
+                prefetcher.stop()
+                if proposal_worker:
+                    proposal_worker.stop()
                 cv2.destroyAllWindows()
-                print(f"\nTotal etiquetadas: {labeled_count}/{len(image_files)}")
+                print(f"\nTotal etiquetadas: {labeled_count}/{len(pending)}")
                 return
-    
+
+    prefetcher.stop()
+    if proposal_worker:
+        proposal_worker.stop()
     cv2.destroyAllWindows()
-    
+
     print("\n" + "=" * 60)
     print("ETIQUETADO COMPLETADO")
     print("=" * 60)
-    print(f"Imágenes etiquetadas: {labeled_count}/{len(image_files)}")
+    print(f"Imágenes etiquetadas: {labeled_count}/{len(pending)}")
     print(f"Etiquetas guardadas en: {LABELS_FOLDER}/")
     print("=" * 60)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Etiquetar imágenes para YOLO")
+    parser.add_argument("--prelabel", action="store_true",
+                        help="Mostrar cajas propuestas por el modelo actual")
+    parser.add_argument("--model", default=MODEL_PATH, help="Modelo para las propuestas")
+    parser.add_argument("--conf", type=float, default=0.25, help="Confianza mínima de las propuestas")
+    parser.add_argument("--batch", type=int, default=16, help="Imágenes por lote de inferencia")
+    args = parser.parse_args()
+    main(args.prelabel, args.model, args.conf, args.batch)
@@ -0,0 +1,316 @@
+"""
+Índice columnar de etiquetas YOLO y estadísticas del dataset
+Carga todas las etiquetas en un solo array de NumPy (imagen, clase, cx, cy,
+w, h) y lo guarda en caché junto a la carpeta de etiquetas. Al volver a
+ejecutarlo solo se releen los archivos cuyo tamaño o fecha cambió, así las
+estadísticas de miles de etiquetas salen en segundos.
+
+Uso:
+    python scripts/label_index.py                          # dataset/labels
+    python scripts/label_index.py --labels yolo_dataset/labels --images yolo_dataset/images
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from dataset_utils import IMAGES_DIR, LABELS_DIR
+
+# Columnas del array de cajas
+COL_IMAGE, COL_CLASS, COL_CX, COL_CY, COL_W, COL_H = range(6)
+
+MIN_BOX_SIZE = 0.002  # Cajas más finas que esto (normalizado) se consideran degeneradas
+EDGE_TOLERANCE = 1e-3  # Margen para bordes que se salen de [0, 1] por redondeo
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def cache_path(labels_dir):
+    """Archivo de caché del índice de una carpeta de etiquetas"""
+    labels_dir = Path(labels_dir)
+    return labels_dir.parent / f"label_index_{labels_dir.name}.npz"
+
+
+def scan_files(root, suffixes):
+    """
+    Lista los archivos de una carpeta (recursivo) con su tamaño y fecha
+
+    Returns:
+        dict: {ruta relativa sin extensión: (ruta relativa, size, mtime_ns)}
+    """
+    found = {}
+    pending = [Path(root)]
+    while pending:
+        folder = pending.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                pending.append(Path(entry.path))
+            elif entry.name.lower().endswith(suffixes):
+                stat = entry.stat()
+                relative = os.path.relpath(entry.path, root)
+                found[os.path.splitext(relative)[0]] = (relative, stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+def parse_label_file(path):
+    """
+    Lee un archivo de etiquetas sin descartar nada
+
+    Returns:
+        tuple: (array (N, 5) con clase, cx, cy, w, h; líneas mal formadas)
+    """
+    rows = []
+    malformed = 0
+    with open(path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                if len(parts) != 5:
+                    raise ValueError
+                rows.append([float(value) for value in parts])
+            except ValueError:
+                malformed += 1
+    return np.array(rows, dtype=np.float32).reshape(-1, 5), malformed
+
+
+class LabelIndex:
+    """
+    Todas las cajas de una carpeta de etiquetas en arrays columnares
+
+    Atributos:
+        files: Rutas relativas de los .txt (el id de imagen es la posición)
+        boxes: Array (N, 6) float32 con imagen, clase, cx, cy, w, h
+        malformed: Líneas mal formadas por archivo
+    """
+
+    def __init__(self, labels_dir, files, sizes, mtimes, boxes, malformed):
+        self.labels_dir = Path(labels_dir)
+        self.files = files
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.boxes = boxes
+        self.malformed = malformed
+
+    def __len__(self):
+        return len(self.files)
+
+    @classmethod
+    def load(cls, labels_dir, rebuild=False):
+        """
+        Carga el índice desde la caché y relee solo los archivos cambiados
+
+        Returns:
+            tuple: (LabelIndex, archivos releídos)
+        """
+        labels_dir = Path(labels_dir)
+        path = cache_path(labels_dir)
+        current = scan_files(labels_dir, (".txt",))
+
+        old = {}
+        if not rebuild and path.exists():
+            try:
+                with np.load(path) as data:
+                    old_files = data['files'].tolist()
+                    old_sizes, old_mtimes = data['sizes'], data['mtimes']
+                    old_boxes, old_malformed = data['boxes'], data['malformed']
+                # Las cajas están ordenadas por imagen: offsets con bincount
+                counts = np.bincount(old_boxes[:, COL_IMAGE].astype(np.int64),
+                                     minlength=len(old_files))
+                offsets = np.concatenate([[0], np.cumsum(counts)])
+                for i, relative in enumerate(old_files):
+                    old[relative] = (int(old_sizes[i]), int(old_mtimes[i]),
+                                     old_boxes[offsets[i]:offsets[i + 1], 1:],
+                                     int(old_malformed[i]))
+            except (OSError, ValueError, KeyError):
+                old = {}
+
+        files, sizes, mtimes, parts, malformed = [], [], [], [], []
+        reread = 0
+        for key in sorted(current):
+            relative, size, mtime = current[key]
+            cached = old.get(relative)
+            if cached and cached[0] == size and cached[1] == mtime:
+                rows, bad = cached[2], cached[3]
+            else:
+                rows, bad = parse_label_file(labels_dir / relative)
+                reread += 1
+
+            image_id = np.full((len(rows), 1), len(files), dtype=np.float32)
+            parts.append(np.hstack([image_id, rows]))
+            files.append(relative)
+            sizes.append(size)
+            mtimes.append(mtime)
+            malformed.append(bad)
+
+        boxes = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+        index = cls(labels_dir, files, np.array(sizes, dtype=np.int64),
+                    np.array(mtimes, dtype=np.int64), boxes, np.array(malformed, dtype=np.int32))
+
+        # Solo reescribimos la caché si algo cambió
+        if reread or len(old) != len(files):
+            index.save(path)
+        return index, reread
+
+    def save(self, path):
+        """Guarda el índice de forma atómica"""
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, files=np.array(self.files, dtype=str), sizes=self.sizes,
+                 mtimes=self.mtimes, boxes=self.boxes, malformed=self.malformed)
+        os.replace(tmp_path, path)
+
+    def stems(self):
+        """Rutas relativas sin extensión (para emparejar con las imágenes)"""
+        return [os.path.splitext(relative)[0] for relative in self.files]
+
+    def boxes_per_image(self):
+        """Número de cajas de cada archivo (0 = imagen de fondo)"""
+        return np.bincount(self.boxes[:, COL_IMAGE].astype(np.int64), minlength=len(self.files))
+
+
+def find_problems(boxes, min_size=MIN_BOX_SIZE, tolerance=EDGE_TOLERANCE):
+    """
+    Máscaras de cajas con problemas
+
+    Returns:
+        dict: {nombre del problema: máscara booleana sobre las cajas}
+    """
+    cls = boxes[:, COL_CLASS]
+    cx, cy, w, h = boxes[:, COL_CX], boxes[:, COL_CY], boxes[:, COL_W], boxes[:, COL_H]
+    low, high = -tolerance, 1 + tolerance
+    return {
+        'clase_invalida': (cls < 0) | (cls != np.round(cls)),
+        'fuera_de_rango': ((cx - w / 2 < low) | (cx + w / 2 > high) |
+                           (cy - h / 2 < low) | (cy + h / 2 > high)),
+        'degeneradas': (w <= min_size) | (h <= min_size),
+    }
+
+
+def find_orphans(index, images_dir):
+    """
+    Imágenes sin etiqueta y etiquetas sin imagen
+
+    Returns:
+        tuple: (imágenes huérfanas, etiquetas huérfanas) como rutas relativas
+    """
+    images = scan_files(images_dir, IMAGE_SUFFIXES)
+    labels = set(index.stems())
+    orphan_images = sorted(images[stem][0] for stem in images.keys() - labels)
+    orphan_labels = sorted(f"{stem}.txt" for stem in labels - images.keys())
+    return orphan_images, orphan_labels
+
+
+def print_histogram(title, values, bins):
+    """Histograma en texto"""
+    print(f"\n{title}:")
+    if len(values) == 0:
+        print("  (sin datos)")
+        return
+    counts, edges = np.histogram(values, bins=bins)
+    peak = max(counts.max(), 1)
+    for count, lo, hi in zip(counts, edges[:-1], edges[1:]):
+        bar = "█" * int(round(30 * count / peak))
+        print(f"  {lo:7.3f} - {hi:7.3f} | {bar:<30} {count}")
+
+
+def compute_stats(index, imgsz=640, min_size=MIN_BOX_SIZE):
+    """Resumen del índice en un diccionario (para imprimir o guardar en JSON)"""
+    boxes = index.boxes
+    per_image = index.boxes_per_image()
+    problems = find_problems(boxes, min_size)
+    classes, class_counts = np.unique(boxes[:, COL_CLASS].astype(np.int64), return_counts=True)
+    side = np.sqrt(boxes[:, COL_W] * boxes[:, COL_H])
+
+    stats = {
+        'archivos': len(index),
+        'cajas': int(len(boxes)),
+        'fondos': int((per_image == 0).sum()),
+        'lineas_mal_formadas': int(index.malformed.sum()),
+        'cajas_por_clase': {int(c): int(n) for c, n in zip(classes, class_counts)},
+        'max_cajas_por_imagen': int(per_image.max()) if len(per_image) else 0,
+        'problemas': {},
+    }
+    for name, mask in problems.items():
+        image_ids = np.unique(boxes[mask, COL_IMAGE].astype(np.int64))
+        stats['problemas'][name] = [index.files[i] for i in image_ids]
+
+    if len(boxes):
+        percentiles = [5, 50, 95]
+        stats['lado_px'] = dict(zip([f"p{p}" for p in percentiles],
+                                    np.percentile(side * imgsz, percentiles).round(1).tolist()))
+        stats['aspecto'] = dict(zip([f"p{p}" for p in percentiles],
+                                    np.percentile(boxes[:, COL_W] / np.maximum(boxes[:, COL_H], 1e-6),
+                                                  percentiles).round(2).tolist()))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice y estadísticas de las etiquetas YOLO")
+    parser.add_argument("--labels", default=str(LABELS_DIR), help="Carpeta de etiquetas")
+    parser.add_argument("--images", default=str(IMAGES_DIR),
+                        help="Carpeta de imágenes para buscar huérfanas ('' = no buscar)")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamaño de entrada para los px")
+    parser.add_argument("--min-size", type=float, default=MIN_BOX_SIZE,
+                        help="Ancho/alto normalizado mínimo de una caja")
+    parser.add_argument("--rebuild", action="store_true", help="Ignorar la caché")
+    parser.add_argument("--json", default=None, help="Guardar las estadísticas en JSON")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ESTADÍSTICAS DE ETIQUETAS")
+    print("=" * 60)
+
+    start_time = time.monotonic()
+    index, reread = LabelIndex.load(args.labels, args.rebuild)
+    print(f"✓ {len(index)} archivos, {len(index.boxes)} cajas "
+          f"({reread} releídos, {time.monotonic() - start_time:.2f} s)")
+
+    stats = compute_stats(index, args.imgsz, args.min_size)
+    print(f"  - Fondos (sin cajas): {stats['fondos']}")
+    print(f"  - Cajas por clase: {stats['cajas_por_clase']}")
+    print(f"  - Máximo de cajas en una imagen: {stats['max_cajas_por_imagen']}")
+
+    boxes = index.boxes
+    side = np.sqrt(boxes[:, COL_W] * boxes[:, COL_H])
+    print_histogram(f"Lado de la caja (px a imgsz {args.imgsz}, sqrt(w*h))",
+                    side * args.imgsz, bins=12)
+    print_histogram("Aspecto (w/h normalizado)",
+                    boxes[:, COL_W] / np.maximum(boxes[:, COL_H], 1e-6), bins=12)
+    print_histogram("Centro x", boxes[:, COL_CX], bins=np.linspace(0, 1, 11))
+    print_histogram("Centro y", boxes[:, COL_CY], bins=np.linspace(0, 1, 11))
+
+    print("\nProblemas:")
+    print(f"  - Líneas mal formadas: {stats['lineas_mal_formadas']}")
+    for name, files in stats['problemas'].items():
+        print(f"  - {name.replace('_', ' ').capitalize()}: {len(files)} archivos")
+        for relative in files[:5]:
+            print(f"      {relative}")
+
+    if args.images:
+        orphan_images, orphan_labels = find_orphans(index, args.images)
+        stats['imagenes_sin_etiqueta'] = orphan_images
+        stats['etiquetas_sin_imagen'] = orphan_labels
+        print(f"  - Imágenes sin etiqueta: {len(orphan_images)}")
+        for relative in orphan_images[:5]:
+            print(f"      {relative}")
+        print(f"  - Etiquetas sin imagen: {len(orphan_labels)}")
+        for relative in orphan_labels[:5]:
+            print(f"      {relative}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(stats, f, indent=2)
+        print(f"\nEstadísticas guardadas en: {args.json}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
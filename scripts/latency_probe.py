@@ -0,0 +1,161 @@
+"""
+Script para medir la latencia de captura a pantalla de una cámara
+Muestra en una ventana un destello blanco/negro con el tiempo dibujado,
+apunta la cámara a esa ventana y el script mide cuánto tarda el cambio
+en llegar a los frames capturados (pantalla + sensor + USB + buffers)
+
+Uso:
+    python scripts/latency_probe.py --source 0 --samples 30
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from camera_handler import CameraHandler
+
+# Tamaño de la ventana del destello
+PATTERN_SIZE = (480, 640)  # alto, ancho
+
+# Tiempo que dura cada estado (blanco o negro)
+TOGGLE_PERIOD = 1.0
+
+
+def render_pattern(bright, timestamp_ms):
+    """Dibuja el destello con el tiempo de render en milisegundos"""
+    value = 255 if bright else 0
+    pattern = np.full((PATTERN_SIZE[0], PATTERN_SIZE[1], 3), value, dtype=np.uint8)
+
+    # Tiempo dibujado: útil para medir también con una foto del monitor
+    text_color = (0, 0, 0) if bright else (255, 255, 255)
+    cv2.putText(pattern, f"{timestamp_ms:.0f} ms", (20, PATTERN_SIZE[0] - 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.2, text_color, 3)
+    return pattern
+
+
+def center_brightness(image):
+    """Brillo medio del tercio central del frame (donde debe verse el destello)"""
+    height, width = image.shape[:2]
+    roi = image[height // 3: 2 * height // 3, width // 3: 2 * width // 3]
+    return float(roi.mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medición de latencia captura -> pantalla")
+    parser.add_argument("--source", default=config.CAMERA_INDEX, help="Cámara a medir")
+    parser.add_argument("--camera-name", default=config.CAMERA_NAME,
+                        help="Nombre de la cámara en el inventario")
+    parser.add_argument("--samples", type=int, default=20, help="Cambios a medir")
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MEDICIÓN DE LATENCIA")
+    print("=" * 60)
+    print("Apunta la cámara a la ventana 'Destello' para que ocupe el centro")
+    print("Presiona 'q' para terminar antes")
+    print("=" * 60)
+
+    camera = CameraHandler(args.source, camera_name=args.camera_name)
+    try:
+        camera.start()
+    except Exception as e:
+        print(f"Error al iniciar cámara: {e}")
+        return
+
+    bright = False
+    next_toggle = time.monotonic() + TOGGLE_PERIOD
+    render_time = None
+    # True mientras esperamos ver en la cámara el último cambio
+    pending = False
+    dark_level, bright_level = None, None
+    latencies = []
+
+    cv2.imshow("Destello", render_pattern(bright, time.monotonic() * 1000))
+    cv2.waitKey(1)
+
+    while len(latencies) < args.samples:
+        now = time.monotonic()
+
+        # Cambiamos el destello y anotamos cuándo se pidió mostrarlo
+        if now >= next_toggle:
+            bright = not bright
+            cv2.imshow("Destello", render_pattern(bright, now * 1000))
+            cv2.waitKey(1)
+            render_time = time.monotonic()
+            next_toggle = render_time + TOGGLE_PERIOD
+            pending = True
+
+        captured = camera.read()
+        if captured is None:
+            print("Error al capturar frame")
+            break
+
+        level = center_brightness(captured.image)
+
+        # Calibramos los niveles oscuro/claro con lo que ve la cámara
+        if render_time is not None and now - render_time > TOGGLE_PERIOD * 0.8:
+            if bright:
+                bright_level = level
+            else:
+                dark_level = level
+            # Un cambio que no se vio antes de calibrar no se mide (el primero sería ~0.8 s falso)
+            pending = False
+
+        # Medimos cuando el frame cruza la mitad entre oscuro y claro
+        if pending and dark_level is not None and bright_level is not None:
+            threshold = (dark_level + bright_level) / 2
+            crossed = level > threshold if bright else level < threshold
+            if crossed:
+                latency_ms = (captured.timestamp - render_time) * 1000
+                latencies.append(latency_ms)
+                print(f"  Muestra {len(latencies)}: {latency_ms:.1f} ms")
+                pending = False
+
+        preview = cv2.resize(captured.image, (320, 240))
+        cv2.imshow("Camara", preview)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    report = camera.format_report
+    camera.release()
+    cv2.destroyAllWindows()
+
+    if not latencies:
+        print("\nNo se pudo medir ninguna muestra (¿la cámara ve la ventana?)")
+        return
+
+    values = np.array(latencies)
+    summary = {
+        'samples': len(latencies),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'min_ms': float(values.min()),
+        'max_ms': float(values.max()),
+        'capture_format': report,
+    }
+
+    print("\n" + "=" * 60)
+    print("RESULTADO")
+    print("=" * 60)
+    print(f"Muestras: {summary['samples']}")
+    print(f"Latencia p50: {summary['p50_ms']:.1f} ms")
+    print(f"Latencia p95: {summary['p95_ms']:.1f} ms")
+    print(f"Rango: {summary['min_ms']:.1f} - {summary['max_ms']:.1f} ms")
+    print("=" * 60)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Script para minar falsos positivos (hard negatives) en las imágenes de fondo
+Ejecuta el modelo actual por lotes sobre dataset/sin_cubo (y opcionalmente
+sobre grabaciones sin cubo) y anota cada imagen donde el modelo ve un cubo
+que no existe. prepare_dataset.py añade esas imágenes al dataset YOLO con
+etiquetas vacías para que el modelo aprenda a ignorarlas.
+
+Los resultados se guardan en dataset/hard_negatives.json junto con la fecha
+de cada imagen: al volver a ejecutarlo con el mismo modelo solo se procesan
+las imágenes nuevas.
+
+Un falso positivo minado se queda en la lista aunque un modelo posterior
+ya no falle con él (si se quitara, el siguiente re-entrenamiento volvería a
+fallar). La confianza del modelo actual solo ordena la lista y decide
+cuáles entran primero si prepare_dataset.py aplica un tope.
+
+Uso:
+    python scripts/mine_hard_negatives.py
+    python scripts/mine_hard_negatives.py --footage grabacion_sin_cubo.mp4 --stride 15
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+from dataset_utils import BACKGROUND_DIR, NEGATIVES_PATH, PROJECT_ROOT, hash_file
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, str(PROJECT_ROOT))
+from frame_sources import open_source, PACING_FAST
+
+# Configuración
+MODEL_PATH = str(PROJECT_ROOT / "runs/detect/rubik_detector2/weights/best.pt")
+CONF_THRESHOLD = 0.25  # Confianza mínima para contar un falso positivo
+BATCH_SIZE = 16
+FOOTAGE_STRIDE = 10    # Analizar 1 de cada N frames de las grabaciones
+
+
+def load_results(path):
+    """Carga los resultados anteriores (vacío si no existen)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_results(path, results):
+    """Guarda los resultados de forma atómica"""
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def max_confidence(result):
+    """Confianza más alta de las detecciones de un resultado (0 si no hay)"""
+    if len(result.boxes) == 0:
+        return 0.0
+    return float(result.boxes.conf.max())
+
+
+def mine_images(model, paths, conf, batch):
+    """
+    Ejecuta el modelo por lotes sobre imágenes de fondo
+
+    Returns:
+        dict: {ruta: (confianza máxima, número de detecciones)}
+    """
+    scores = {}
+    for start in range(0, len(paths), batch):
+        batch_paths = paths[start:start + batch]
+        results = model(batch_paths, conf=conf, verbose=False)
+        for path, result in zip(batch_paths, results):
+            scores[path] = (max_confidence(result), len(result.boxes))
+        print(f"  {min(start + batch, len(paths))}/{len(paths)} imágenes", end="\r")
+    print()
+    return scores
+
+
+def mine_footage(model, spec, conf, batch, stride, output_dir):
+    """
+    Busca falsos positivos en una grabación y guarda esos frames como imágenes
+
+    La grabación no debe contener el cubo: cualquier detección cuenta como error.
+
+    Returns:
+        dict: {ruta guardada: (confianza máxima, número de detecciones)}
+    """
+    source = open_source(spec, pacing=PACING_FAST)
+    source.start()
+    prefix = Path(str(spec)).stem
+
+    scores = {}
+    pending = []
+
+    def flush():
+        results = model([frame.image for frame in pending], conf=conf, verbose=False)
+        for frame, result in zip(pending, results):
+            if len(result.boxes) == 0:
+                continue
+            path = str(Path(output_dir) / f"minado_{prefix}_{frame.sequence:06d}.jpg")
+            cv2.imwrite(path, frame.image)
+            scores[path] = (max_confidence(result), len(result.boxes))
+        pending.clear()
+
+    try:
+        for frame in source:
+            if frame.sequence % stride:
+                continue
+            pending.append(frame)
+            if len(pending) >= batch:
+                flush()
+        if pending:
+            flush()
+    finally:
+        source.release()
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minar falsos positivos en imágenes sin cubo")
+    parser.add_argument("--model", default=MODEL_PATH, help="Modelo a evaluar")
+    parser.add_argument("--conf", type=float, default=CONF_THRESHOLD,
+                        help="Confianza mínima de un falso positivo")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Imágenes por lote")
+    parser.add_argument("--footage", nargs="*", default=[],
+                        help="Grabaciones o carpetas SIN cubo para minar también")
+    parser.add_argument("--stride", type=int, default=FOOTAGE_STRIDE,
+                        help="Analizar 1 de cada N frames de las grabaciones")
+    parser.add_argument("--output", default=str(NEGATIVES_PATH), help="Archivo de resultados")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    print("=" * 60)
+    print("MINADO DE FALSOS POSITIVOS")
+    print("=" * 60)
+
+    start_time = time.monotonic()
+    model_sha1 = hash_file(args.model)
+    previous = load_results(args.output)
+
+    # Los resultados solo valen para el mismo modelo y el mismo umbral
+    scanned = {}
+    if previous.get('model_sha1') == model_sha1 and previous.get('conf') == args.conf:
+        scanned = previous.get('scanned', {})
+
+    paths = sorted(str(path) for path in Path(BACKGROUND_DIR).glob("*.jpg"))
+    current = {path: os.stat(path).st_mtime_ns for path in paths}
+    scanned = {path: entry for path, entry in scanned.items()
+               if current.get(path) == entry['mtime_ns']}
+    to_scan = [path for path in paths if path not in scanned]
+    print(f"✓ {len(paths)} imágenes de fondo ({len(to_scan)} nuevas o cambiadas)")
+
+    model = YOLO(args.model)
+    if to_scan:
+        for path, (score, count) in mine_images(model, to_scan, args.conf, args.batch).items():
+            scanned[path] = {'mtime_ns': current[path], 'score': score, 'detections': count}
+
+    for spec in args.footage:
+        print(f"Analizando grabación: {spec}")
+        found = mine_footage(model, spec, args.conf, args.batch, args.stride, BACKGROUND_DIR)
+        for path, (score, count) in found.items():
+            scanned[path] = {'mtime_ns': os.stat(path).st_mtime_ns, 'score': score,
+                             'detections': count}
+        print(f"  ✓ {len(found)} frames con falsos positivos guardados en {BACKGROUND_DIR}")
+
+    # Los minados se acumulan entre modelos (resultados antiguos: su lista de negatives)
+    mined = previous.get('mined')
+    if mined is None:
+        mined = {item['image']: {'first_mined_by': previous.get('model_sha1')}
+                 for item in previous.get('negatives', [])}
+    for path, entry in scanned.items():
+        if entry['detections'] > 0 and path not in mined:
+            mined[path] = {'first_mined_by': model_sha1}
+    mined = {path: info for path, info in mined.items() if os.path.exists(path)}
+
+    # Los que el modelo actual ve con más confianza primero: prepare_dataset.py
+    # toma los de arriba si hay tope
+    negatives = sorted(
+        ({'image': path, 'score': scanned.get(path, {}).get('score', 0.0),
+          'detections': scanned.get(path, {}).get('detections', 0),
+          'first_mined_by': info['first_mined_by']}
+         for path, info in mined.items()),
+        key=lambda item: -item['score'])
+    still_failing = sum(1 for item in negatives if item['detections'] > 0)
+
+    save_results(args.output, {
+        'model': args.model,
+        'model_sha1': model_sha1,
+        'conf': args.conf,
+        'scanned': scanned,
+        'mined': mined,
+        'negatives': negatives,
+    })
+
+    print(f"\n✓ Falsos positivos minados: {len(negatives)} ({still_failing} siguen fallando "
+          f"con este modelo, de {len(scanned)} imágenes) ({time.monotonic() - start_time:.1f} s)")
+    for item in negatives[:10]:
+        print(f"  {Path(item['image']).name}: conf {item['score']:.2f}, "
+              f"{item['detections']} detecciones")
+
+    print("\n" + "=" * 60)
+    print(f"Resultados guardados en: {args.output}")
+    print("Ejecuta prepare_dataset.py para añadirlos como fondos al dataset YOLO")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
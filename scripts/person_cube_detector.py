@@ -2,10 +2,24 @@
 Detector combinado: Personas + Cubos de Rubik
 Detecta si una persona tiene o no un cubo de Rubik
 """
+import argparse
+import os
+import sys
+import time
 from ultralytics import YOLO
 import cv2
 import numpy as np
 
+# Permite importar los módulos de la raíz del proyecto (frame_sources, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_sources import open_source, PACING_REALTIME, PACING_FAST
+from load_scheduler import LoadScheduler, SKIP_FRAMES, LOW_RESOLUTION, PAUSE_PERSON
+import config
+
+# Bajo carga, el modelo de personas es lo primero que se puede pausar:
+# las personas se mueven más despacio que el cubo en la mano
+PERSON_CUBE_LEVELS = (SKIP_FRAMES, LOW_RESOLUTION, PAUSE_PERSON)
+
 class PersonCubeDetector:
     def __init__(self):
         """Inicializa detector combinado persona + cubo"""
@@ -19,20 +33,31 @@ class PersonCubeDetector:
         self.cube_model = YOLO('runs/detect/rubik_detector2/weights/best.pt')
         
         print("✅ Ambos modelos cargados correctamente")
+
+        # Últimos resultados del modelo de personas (se reutilizan si está pausado)
+        self._person_results = []
         
-    def detect_person_with_cube(self, image, person_conf=0.5, cube_conf=0.5):
+    def detect_person_with_cube(self, image, person_conf=0.5, cube_conf=0.5, imgsz=640,
+                                pause_person=False):
         """
         Detecta personas y determina si tienen cubo de Rubik
+
+        Args:
+            imgsz: Tamaño de entrada de ambos modelos
+            pause_person: Reutilizar las últimas personas en vez de ejecutar su modelo
         
         Returns:
             list: Personas con información de si tienen cubo
         """
         
         # 1. Detectar personas
-        person_results = self.person_model(image, classes=[0], verbose=False)  # clase 0 = persona
+        if not pause_person or not self._person_results:
+            self._person_results = self.person_model(image, classes=[0], imgsz=imgsz,
+                                                     verbose=False)  # clase 0 = persona
+        person_results = self._person_results
         
         # 2. Detectar cubos
-        cube_results = self.cube_model(image, verbose=False)
+        cube_results = self.cube_model(image, imgsz=imgsz, verbose=False)
         
         # 3. Procesar personas
         persons = []
@@ -145,10 +170,20 @@ class PersonCubeDetector:
         else:
             return "cubo_visible"
     
-    def detect_realtime(self, camera_index=0):
-        """Detección en tiempo real con análisis persona-cubo"""
+    def detect_realtime(self, camera_index=0, pacing=PACING_REALTIME, budget_ms=None):
+        """
+        Detección en tiempo real con análisis persona-cubo
+
+        Args:
+            budget_ms: Retraso máximo por frame; si se supera se saltan frames,
+                se baja la resolución y se pausa el modelo de personas
+        """
         
-        cap = cv2.VideoCapture(camera_index)
+        # camera_index puede ser también un video o una carpeta de imágenes
+        source = open_source(camera_index, pacing)
+        source.start()
+        scheduler = LoadScheduler(budget_ms, levels=PERSON_CUBE_LEVELS) if budget_ms else None
+        persons, cubes = [], []
         
         print("🎥 DETECTOR PERSONA + CUBO EN TIEMPO REAL")
         print("=" * 50)
@@ -159,12 +194,20 @@ class PersonCubeDetector:
         print()
         
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            captured = source.read()
+            if captured is None:
                 break
+            frame = captured.image
+            frame_origin = captured.timestamp if source.is_live else time.monotonic()
             
-            # Detectar personas + cubos
-            persons, cubes = self.detect_person_with_cube(frame)
+            # Detectar personas + cubos (en los frames saltados se dibuja lo último)
+            if scheduler is None:
+                persons, cubes = self.detect_person_with_cube(frame)
+            elif scheduler.should_process():
+                persons, cubes = self.detect_person_with_cube(
+                    frame, imgsz=config.SCHEDULER_LOW_IMGSZ if scheduler.low_resolution else 640,
+                    pause_person=scheduler.person_paused)
+                scheduler.record((time.monotonic() - frame_origin) * 1000)
             
             # Dibujar personas
             for person in persons:
@@ -210,6 +253,8 @@ class PersonCubeDetector:
                 f"❌ Sin cubo: {people_without_cube}",
                 f"🧊 Cubos totales: {total_cubes}"
             ]
+            if scheduler:
+                stats.append(f"Carga: {scheduler.level_name}")
             
             for i, stat in enumerate(stats):
                 cv2.putText(frame, stat, (10, 30 + i*25),
@@ -220,11 +265,21 @@ class PersonCubeDetector:
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
         
-        cap.release()
+        source.release()
         cv2.destroyAllWindows()
 
 # EJEMPLO DE USO
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detector combinado persona + cubo")
+    parser.add_argument("--source", default=0,
+                        help="Índice de cámara, /dev/videoN, libcamera:N, video o carpeta de imágenes")
+    parser.add_argument("--pacing", default=PACING_REALTIME, choices=[PACING_REALTIME, PACING_FAST],
+                        help="Velocidad de reproducción para videos y carpetas")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Retraso máximo por frame; si se supera se saltan frames, "
+                             "se baja la resolución y se pausa el modelo de personas")
+    args = parser.parse_args()
+
     print("🎯 DETECTOR COMBINADO: PERSONA + CUBO DE RUBIK")
     print("=" * 60)
     print("Este sistema detecta:")
@@ -240,4 +295,4 @@ if __name__ == "__main__":
     print("Muéstrate a la cámara con y sin el cubo para probar")
     
     # Iniciar detección en tiempo real
-    # detector.detect_realtime(0)
\ No newline at end of file
+    detector.detect_realtime(args.source, args.pacing, args.budget_ms)
\ No newline at end of file
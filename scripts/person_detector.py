@@ -1,9 +1,15 @@
 """
 Script para detección de personas con diferentes modelos especializados
 """
+import os
+import sys
 from ultralytics import YOLO
 import cv2
 
+# Permite importar los módulos de la raíz del proyecto (frame_sources, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_sources import open_source, PACING_REALTIME
+
 class PersonDetector:
     def __init__(self, model_type='yolo'):
         """
@@ -71,17 +77,20 @@ class PersonDetector:
         
         return persons
     
-    def detect_realtime(self, camera_index=0):
+    def detect_realtime(self, camera_index=0, pacing=PACING_REALTIME):
         """Detección en tiempo real"""
-        cap = cv2.VideoCapture(camera_index)
+        # camera_index puede ser también un video o una carpeta de imágenes
+        source = open_source(camera_index, pacing)
+        source.start()
         
         print(f"🎥 Iniciando detección de personas en tiempo real...")
         print("Presiona 'q' para salir")
         
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            captured = source.read()
+            if captured is None:
                 break
+            frame = captured.image
             
             # Detectar personas
             persons = self.detect_persons(frame)
@@ -119,7 +128,7 @@ class PersonDetector:
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
         
-        cap.release()
+        source.release()
         cv2.destroyAllWindows()
 
 # EJEMPLOS DE USO
@@ -3,18 +3,35 @@ Ejemplos de cómo usar tu modelo entrenado en otros proyectos
 """
 from ultralytics import YOLO
 import cv2
+import os
+import sys
+
+# Dentro de este repositorio, model_manifest.py está en la raíz
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    # Opcional: si model_manifest.py está disponible se usa el backend
+    # verificado más rápido que registró export_model.py
+    from model_manifest import select_backend
+except ImportError:
+    select_backend = None
 
 class RubikDetectorPortable:
     """Detector portable para usar en cualquier proyecto"""
     
-    def __init__(self, model_path='best.pt'):
+    def __init__(self, model_path='best.pt', use_manifest=True):
         """
         Inicializa el detector
         
         Args:
             model_path: Ruta al archivo best.pt de tu modelo
+            use_manifest: Usar el backend exportado más rápido si hay manifiesto
         """
-        self.model = YOLO(model_path)
+        self.imgsz = 640
+        if use_manifest and select_backend is not None:
+            backend = select_backend(model_path)
+            model_path = backend['path']
+            self.imgsz = backend['imgsz'] or 640
+        self.model = YOLO(model_path, task='detect')
         print(f"✅ Modelo cargado desde: {model_path}")
     
     def detect_in_image(self, image_path, confidence=0.5):
@@ -28,7 +45,7 @@ class RubikDetectorPortable:
         Returns:
             list: Lista de detecciones con coordenadas y confianza
         """
-        results = self.model(image_path)
+        results = self.model(image_path, imgsz=self.imgsz)
         detections = []
         
         for result in results:
@@ -56,7 +73,7 @@ class RubikDetectorPortable:
         Returns:
             tuple: (detecciones, frame_con_rectangulos)
         """
-        results = self.model(frame, verbose=False)
+        results = self.model(frame, imgsz=self.imgsz, verbose=False)
         detections = []
         annotated_frame = frame.copy()
         
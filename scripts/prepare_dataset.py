@@ -1,82 +1,308 @@
 """
 Script para organizar el dataset en formato YOLO
-Divide las imágenes en entrenamiento (80%) y validación (20%)
+Divide las imágenes en entrenamiento (80%) y validación (20%) según el hash
+de su nombre, así el split es siempre el mismo aunque el dataset crezca
+
+La preparación es incremental: un manifiesto guarda el hash de cada archivo
+colocado en yolo_dataset, así solo se tocan los archivos nuevos o cambiados
+y las imágenes se enlazan (hard link / reflink) en vez de copiarse.
+
+Los falsos positivos minados en sin_cubo (mine_hard_negatives.py) se añaden
+como imágenes de fondo con etiqueta vacía, con un tope sobre el total.
 """
+import argparse
+import hashlib
+import json
 import os
-import shutil
-import random
+import re
+import time
 from pathlib import Path
 
+from dataset_utils import (
+    IMAGES_DIR, LABELS_DIR, YOLO_DATASET_DIR, NEGATIVES_PATH,
+    LINK_AUTO, LINK_HARDLINK, LINK_REFLINK, LINK_COPY,
+    hash_files, link_or_copy,
+)
+
 # Configuración
-DATASET_ROOT = "../yolo_dataset"
+DATASET_ROOT = YOLO_DATASET_DIR
 TRAIN_RATIO = 0.8  # 80% entrenamiento, 20% validación
+MANIFEST_NAME = "manifest.json"
+SPLITS = ("train", "val")
+NEGATIVE_RATIO = 0.1  # Fracción máxima de imágenes de fondo en el dataset
+
+# Agrupación para el split (ver group_key)
+GROUP_BY_IMAGE = "image"
+GROUP_PREFIX_LENGTH = {"day": 8, "hour": 10, "minute": 12, "second": 14}
+CAPTURE_NAME_RE = re.compile(r"_(\d{8})_(\d{6})")
+
+
+def load_manifest(dataset_root):
+    """Carga el manifiesto de la preparación anterior (vacío si no existe)"""
+    path = Path(dataset_root) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(dataset_root, files):
+    """Guarda el manifiesto de forma atómica"""
+    path = Path(dataset_root) / MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': 1, 'files': files}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def group_key(stem, group_by=GROUP_BY_IMAGE):
+    """
+    Clave de agrupación para el split
+
+    Con nombres de capture_images.py (cubo_YYYYMMDD_HHMMSS_ffffff) se pueden
+    agrupar las fotos de una misma sesión para que no queden repartidas entre
+    train y val (fotos casi iguales en ambos lados inflan las métricas).
+
+    Args:
+        stem: Nombre del archivo sin extensión
+        group_by: 'image', 'second', 'minute', 'hour' o 'day'
+
+    Returns:
+        str: Clave (el propio stem si el nombre no tiene fecha)
+    """
+    if group_by == GROUP_BY_IMAGE:
+        return stem
+
+    match = CAPTURE_NAME_RE.search(stem)
+    if match is None:
+        return stem
+
+    timestamp = match.group(1) + match.group(2)  # YYYYMMDDHHMMSS
+    return timestamp[:GROUP_PREFIX_LENGTH[group_by]]
+
+
+def split_for(key, train_ratio=TRAIN_RATIO, salt=""):
+    """
+    Asigna train o val según el hash de la clave
+
+    El resultado depende solo de la clave: la misma imagen cae siempre en el
+    mismo split y al añadir imágenes las existentes no se mueven.
+    """
+    digest = hashlib.sha1(f"{salt}{key}".encode("utf-8")).hexdigest()
+    # Primeros 32 bits del hash como número en [0, 1)
+    fraction = int(digest[:8], 16) / 2**32
+    return "train" if fraction < train_ratio else "val"
+
+
+def assign_splits(stems, group_by=GROUP_BY_IMAGE, salt=""):
+    """
+    Decide si cada imagen va a train o val de forma determinista
+
+    Returns:
+        dict: {stem: 'train' o 'val'}
+    """
+    return {stem: split_for(group_key(stem, group_by), TRAIN_RATIO, salt) for stem in stems}
+
+
+def load_negatives(path, n_positives, ratio=NEGATIVE_RATIO):
+    """
+    Elige las imágenes de fondo (falsos positivos minados) a incluir
+
+    Se toman las de mayor confianza hasta que sean como mucho `ratio`
+    del total de imágenes del dataset.
+
+    Returns:
+        dict: {stem: ruta de la imagen}
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            items = json.load(f).get('negatives', [])
+    except (OSError, ValueError):
+        return {}
+
+    limit = int(n_positives * ratio / (1 - ratio)) if ratio < 1 else len(items)
+    negatives = {}
+    for item in items:
+        if len(negatives) >= limit:
+            break
+        image = Path(item['image'])
+        if image.exists():
+            negatives[image.stem] = str(image)
+    return negatives
+
+
+def build_plan(images_dir, labels_dir, splits, negatives=None):
+    """
+    Lista qué archivo de origen va a cada destino dentro de yolo_dataset
+
+    Returns:
+        dict: {destino relativo: {'source': ruta, 'link': bool, 'empty': bool}}
+    """
+    plan = {}
+    for stem, split in splits.items():
+        if negatives and stem in negatives:
+            # Fondo: la imagen se enlaza y la etiqueta se crea vacía. Como
+            # origen de la etiqueta usamos la imagen, así cambia si ella cambia
+            plan[f"images/{split}/{stem}.jpg"] = {'source': negatives[stem], 'link': True}
+            plan[f"labels/{split}/{stem}.txt"] = {'source': negatives[stem], 'link': False,
+                                                  'empty': True}
+            continue
+
+        # Las etiquetas se copian (son pequeñas y se editan en el origen)
+        plan[f"labels/{split}/{stem}.txt"] = {
+            'source': str(Path(labels_dir) / f"{stem}.txt"),
+            'link': False,
+        }
+
+        img_file = Path(images_dir) / f"{stem}.jpg"
+        if img_file.exists():
+            # Las imágenes no cambian una vez capturadas: se pueden enlazar
+            plan[f"images/{split}/{stem}.jpg"] = {'source': str(img_file), 'link': True}
+
+    return plan
+
 
-def prepare_yolo_dataset():
+def hash_sources(plan, manifest, workers):
+    """
+    Obtiene el hash de cada origen, reutilizando el del manifiesto
+    si el tamaño y la fecha de modificación no cambiaron
+
+    Returns:
+        dict: {destino: {'source', 'sha1', 'size', 'mtime_ns'}}
+    """
+    entries = {}
+    to_hash = []
+
+    for dest, item in plan.items():
+        stat = os.stat(item['source'])
+        entry = {'source': item['source'], 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if item.get('empty'):
+            entry['empty'] = True
+
+        old = manifest.get(dest)
+        if (old and old.get('source') == entry['source'] and old.get('size') == entry['size']
+                and old.get('mtime_ns') == entry['mtime_ns']
+                and old.get('empty') == entry.get('empty')):
+            entry['sha1'] = old['sha1']
+        else:
+            to_hash.append(item['source'])
+
+        entries[dest] = entry
+
+    # Solo calculamos el hash de lo nuevo o modificado, en paralelo
+    hashes = hash_files(set(to_hash), workers)
+    for entry in entries.values():
+        if 'sha1' not in entry:
+            entry['sha1'] = hashes[entry['source']]
+
+    return entries
+
+
+def sync_files(dataset_root, plan, entries, manifest, link_mode):
+    """
+    Coloca en yolo_dataset los archivos nuevos o cambiados y borra los que sobran
+
+    Returns:
+        dict: Contadores de lo que se hizo
+    """
+    dataset_root = Path(dataset_root)
+    stats = {'unchanged': 0, 'added': 0, 'updated': 0, 'removed': 0,
+             LINK_HARDLINK: 0, LINK_REFLINK: 0, LINK_COPY: 0}
+
+    for dest, entry in entries.items():
+        dest_path = dataset_root / dest
+        old = manifest.get(dest)
+
+        if (old and old.get('sha1') == entry['sha1'] and old.get('empty') == entry.get('empty')
+                and dest_path.exists()):
+            stats['unchanged'] += 1
+            continue
+
+        if dest_path.exists():
+            dest_path.unlink()
+            stats['updated'] += 1
+        else:
+            stats['added'] += 1
+
+        if plan[dest].get('empty'):
+            open(dest_path, 'w').close()
+            stats[LINK_COPY] += 1
+            continue
+
+        mode = link_mode if plan[dest]['link'] else LINK_COPY
+        method = link_or_copy(entry['source'], dest_path, mode)
+        stats[method] += 1
+
+    # Borramos todo lo que no está en el plan (incluye restos de versiones viejas)
+    for split in SPLITS:
+        for kind in ("images", "labels"):
+            for path in (dataset_root / kind / split).iterdir():
+                dest = f"{kind}/{split}/{path.name}"
+                if dest not in entries and path.is_file():
+                    path.unlink()
+                    stats['removed'] += 1
+
+    return stats
+
+
+def prepare_yolo_dataset(images_dir=IMAGES_DIR, labels_dir=LABELS_DIR, dataset_root=DATASET_ROOT,
+                         link_mode=LINK_AUTO, workers=8, group_by=GROUP_BY_IMAGE, salt="",
+                         negatives_path=NEGATIVES_PATH, negative_ratio=NEGATIVE_RATIO):
     """Prepara el dataset en formato YOLO"""
     print("=" * 60)
     print("PREPARANDO DATASET PARA YOLO")
     print("=" * 60)
-    
+
+    start_time = time.monotonic()
+    dataset_root = Path(dataset_root)
+
     # Crear estructura de carpetas
-    folders = [
-        f"{DATASET_ROOT}/images/train",
-        f"{DATASET_ROOT}/images/val",
-        f"{DATASET_ROOT}/labels/train",
-        f"{DATASET_ROOT}/labels/val"
-    ]
-    
-    for folder in folders:
-        os.makedirs(folder, exist_ok=True)
-        print(f"✓ Carpeta creada: {folder}")
-    
+    for kind in ("images", "labels"):
+        for split in SPLITS:
+            os.makedirs(dataset_root / kind / split, exist_ok=True)
+
     # Obtener lista de imágenes con etiquetas
-    label_files = list(Path("../dataset/labels").glob("*.txt"))
-    print(f"\n✓ Encontradas {len(label_files)} imágenes etiquetadas")
-    
-    # Mezclar aleatoriamente
-    random.shuffle(label_files)
-    
-    # Dividir en train y val
-    split_idx = int(len(label_files) * TRAIN_RATIO)
-    train_labels = label_files[:split_idx]
-    val_labels = label_files[split_idx:]
-    
-    print(f"✓ Entrenamiento: {len(train_labels)} imágenes")
-    print(f"✓ Validación: {len(val_labels)} imágenes")
-    
-    # Copiar archivos
-    print("\nCopiando archivos...")
-    
-    # Entrenamiento
-    for label_file in train_labels:
-        # Nombre base del archivo
-        base_name = label_file.stem
-        
-        # Copiar etiqueta
-        shutil.copy(label_file, f"{DATASET_ROOT}/labels/train/{base_name}.txt")
-        
-        # Copiar imagen
-        img_file = f"../dataset/con_cubo/{base_name}.jpg"
-        if os.path.exists(img_file):
-            shutil.copy(img_file, f"{DATASET_ROOT}/images/train/{base_name}.jpg")
-    
-    # Validación
-    for label_file in val_labels:
-        base_name = label_file.stem
-        
-        # Copiar etiqueta
-        shutil.copy(label_file, f"{DATASET_ROOT}/labels/val/{base_name}.txt")
-        
-        # Copiar imagen
-        img_file = f"../dataset/con_cubo/{base_name}.jpg"
-        if os.path.exists(img_file):
-            shutil.copy(img_file, f"{DATASET_ROOT}/images/val/{base_name}.jpg")
-    
-    print("✓ Archivos copiados correctamente")
-    
+    stems = sorted(path.stem for path in Path(labels_dir).glob("*.txt"))
+    print(f"✓ Encontradas {len(stems)} imágenes etiquetadas")
+
+    # Falsos positivos minados en sin_cubo (fondos con etiqueta vacía)
+    labelled = set(stems)
+    negatives = load_negatives(negatives_path, len(stems), negative_ratio)
+    negatives = {stem: path for stem, path in negatives.items() if stem not in labelled}
+    if negatives:
+        print(f"✓ Fondos (falsos positivos minados): {len(negatives)}")
+        stems = sorted(labelled | set(negatives))
+
+    manifest = load_manifest(dataset_root)
+
+    # Dividir en train y val (determinista, por hash del nombre o de la sesión)
+    splits = assign_splits(stems, group_by, salt)
+    n_train = sum(1 for split in splits.values() if split == "train")
+    print(f"✓ Entrenamiento: {n_train} imágenes")
+    print(f"✓ Validación: {len(splits) - n_train} imágenes")
+
+    # Calcular hashes (solo de lo que cambió) y sincronizar
+    plan = build_plan(images_dir, labels_dir, splits, negatives)
+    entries = hash_sources(plan, manifest, workers)
+    stats = sync_files(dataset_root, plan, entries, manifest, link_mode)
+    save_manifest(dataset_root, entries)
+
+    print("\nSincronización:")
+    print(f"  - Sin cambios: {stats['unchanged']}")
+    print(f"  - Nuevos: {stats['added']}")
+    print(f"  - Actualizados: {stats['updated']}")
+    print(f"  - Eliminados: {stats['removed']}")
+    print(f"  - Enlaces: {stats[LINK_HARDLINK]} hard link, {stats[LINK_REFLINK]} reflink, "
+          f"{stats[LINK_COPY]} copias")
+
     # Crear archivo data.yaml para YOLO
     data_yaml = f"""# Dataset de Cubo de Rubik
-path: {os.path.abspath(DATASET_ROOT)}  # Ruta del dataset
+path: {dataset_root.resolve()}  # Ruta del dataset
 train: images/train  # Imágenes de entrenamiento
 val: images/val  # Imágenes de validación
 
@@ -84,18 +310,41 @@ val: images/val  # Imágenes de validación
 nc: 1  # Número de clases
 names: ['cubo_rubik']  # Nombres de las clases
 """
-    
-    with open(f"{DATASET_ROOT}/data.yaml", 'w') as f:
+
+    with open(dataset_root / "data.yaml", 'w') as f:
         f.write(data_yaml)
-    
-    print(f"✓ Archivo de configuración creado: {DATASET_ROOT}/data.yaml")
-    
+
+    print(f"✓ Archivo de configuración creado: {dataset_root / 'data.yaml'}")
+
     print("\n" + "=" * 60)
-    print("DATASET PREPARADO CORRECTAMENTE")
+    print(f"DATASET PREPARADO CORRECTAMENTE ({time.monotonic() - start_time:.1f} s)")
     print("=" * 60)
-    print(f"Ubicación: {os.path.abspath(DATASET_ROOT)}/")
+    print(f"Ubicación: {dataset_root.resolve()}/")
     print("=" * 60)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preparar dataset en formato YOLO")
+    parser.add_argument("--images", default=str(IMAGES_DIR), help="Carpeta de imágenes con cubo")
+    parser.add_argument("--labels", default=str(LABELS_DIR), help="Carpeta de etiquetas YOLO")
+    parser.add_argument("--output", default=str(DATASET_ROOT), help="Carpeta del dataset YOLO")
+    parser.add_argument("--link-mode", default=LINK_AUTO,
+                        choices=[LINK_AUTO, LINK_HARDLINK, LINK_REFLINK, LINK_COPY],
+                        help="Cómo colocar las imágenes (auto = enlazar si se puede)")
+    parser.add_argument("--workers", type=int, default=8, help="Hilos para calcular hashes")
+    parser.add_argument("--group-by", default=GROUP_BY_IMAGE,
+                        choices=[GROUP_BY_IMAGE] + list(GROUP_PREFIX_LENGTH),
+                        help="Agrupar por sesión de captura para evitar fugas entre train y val")
+    parser.add_argument("--split-salt", default="",
+                        help="Texto que cambia el reparto (mismo texto = mismo split)")
+    parser.add_argument("--negatives", default=str(NEGATIVES_PATH),
+                        help="Falsos positivos minados ('' = no añadir fondos)")
+    parser.add_argument("--negative-ratio", type=float, default=NEGATIVE_RATIO,
+                        help="Fracción máxima de fondos en el dataset")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    prepare_yolo_dataset()
+    args = parse_args()
+    prepare_yolo_dataset(args.images, args.labels, args.output, args.link_mode, args.workers,
+                         args.group_by, args.split_salt, args.negatives, args.negative_ratio)
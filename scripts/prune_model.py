@@ -0,0 +1,254 @@
+"""
+Poda estructurada de canales del modelo YOLO
+Quita canales internos según el gamma de sus BatchNorm (los de gamma
+pequeño apenas aportan): la capa oculta de cada Bottleneck (cv1 -> cv2) y
+las convoluciones intermedias de la cabeza Detect. Solo se podan pares
+internos, así las conexiones entre bloques (concatenaciones, sumas
+residuales, salidas de la cabeza) no cambian de forma.
+
+Después re-entrena el modelo podado con un DetectionTrainer cuyo get_model
+devuelve el modelo podado, lo exporta con export_model.py y escribe un
+reporte antes/después de parámetros, latencia y mAP.
+
+Uso:
+    python scripts/prune_model.py --ratio 0.3 --epochs 30
+"""
+import argparse
+import json
+import math
+import os
+from pathlib import Path
+
+from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from benchmark import DEFAULT_IMAGES, run_combination
+from dataset_utils import PROJECT_ROOT, YOLO_DATASET_DIR
+from export_model import export_model
+from imgsz_sweep import evaluate
+
+MODEL_PATH = str(PROJECT_ROOT / "runs/detect/rubik_detector2/weights/best.pt")
+PRUNE_RATIO = 0.3     # Fracción de los canales podables que se quita (global)
+CHANNEL_ROUND = 8     # Los canales que quedan se redondean a múltiplos de 8 (mejor en CPU)
+
+
+class PrunedDetectionTrainer(DetectionTrainer):
+    """Trainer que re-entrena el modelo ya podado en vez de construirlo desde el yaml"""
+
+    # Modelo podado; se asigna antes de entrenar
+    pruned_model = None
+
+    def get_model(self, cfg=None, weights=None, verbose=True):
+        model = self.pruned_model
+        for parameter in model.parameters():
+            parameter.requires_grad = True
+        return model
+
+
+def is_conv_bn(module):
+    """True si es un Conv de ultralytics (Conv2d + BatchNorm) sin grupos"""
+    return (hasattr(module, 'conv') and hasattr(module, 'bn')
+            and module.conv.groups == 1)
+
+
+def find_prunable_pairs(net):
+    """
+    Pares (productor, consumidor) cuyos canales intermedios se pueden quitar
+
+    Returns:
+        list: [(nombre, Conv productor, Conv o Conv2d consumidor), ...]
+    """
+    import torch.nn as nn
+
+    pairs = []
+    for name, module in net.named_modules():
+        kind = type(module).__name__
+
+        # Bottleneck: cv1 -> cv2, el canal oculto no sale del bloque
+        if kind == 'Bottleneck' and is_conv_bn(module.cv1) and is_conv_bn(module.cv2):
+            pairs.append((f"{name}.cv1", module.cv1, module.cv2))
+
+        # Detect: Conv -> Conv -> Conv2d en cada rama de cada escala
+        elif kind == 'Detect':
+            for branch_name in ('cv2', 'cv3'):
+                for level, sequence in enumerate(getattr(module, branch_name)):
+                    layers = list(sequence)
+                    for i in range(len(layers) - 1):
+                        producer, consumer = layers[i], layers[i + 1]
+                        consumer_ok = (is_conv_bn(consumer) or
+                                       (isinstance(consumer, nn.Conv2d) and consumer.groups == 1))
+                        if is_conv_bn(producer) and consumer_ok:
+                            pairs.append((f"{name}.{branch_name}.{level}.{i}", producer, consumer))
+    return pairs
+
+
+def prune_pair(producer, consumer, keep):
+    """
+    Deja solo los canales `keep` entre productor y consumidor
+
+    Los canales quitados no dan cero: dan act(beta), una constante. Su aporte
+    al consumidor se pasa a la media del BN (o al bias) para no perderlo.
+    """
+    import torch
+    import torch.nn as nn
+
+    channels = producer.bn.num_features
+    removed = torch.tensor(sorted(set(range(channels)) - set(keep.tolist())), dtype=torch.long)
+
+    # Productor: filas de la convolución y del BN
+    old_conv, old_bn = producer.conv, producer.bn
+    conv = nn.Conv2d(old_conv.in_channels, len(keep), old_conv.kernel_size, old_conv.stride,
+                     old_conv.padding, old_conv.dilation, 1, bias=old_conv.bias is not None)
+    conv.weight.data = old_conv.weight.data[keep].clone()
+    if old_conv.bias is not None:
+        conv.bias.data = old_conv.bias.data[keep].clone()
+    bn = nn.BatchNorm2d(len(keep), eps=old_bn.eps, momentum=old_bn.momentum)
+    for attribute in ('weight', 'bias', 'running_mean', 'running_var'):
+        getattr(bn, attribute).data = getattr(old_bn, attribute).data[keep].clone()
+    producer.conv, producer.bn = conv, bn
+
+    # Consumidor: columnas de la convolución
+    target = consumer.conv if is_conv_bn(consumer) else consumer
+    weight = target.weight.data
+    new_target = nn.Conv2d(len(keep), target.out_channels, target.kernel_size, target.stride,
+                           target.padding, target.dilation, 1, bias=target.bias is not None)
+    new_target.weight.data = weight[:, keep].clone()
+    if target.bias is not None:
+        new_target.bias.data = target.bias.data.clone()
+
+    if len(removed):
+        with torch.no_grad():
+            constant = producer.act(old_bn.bias.data[removed])
+            shift = weight[:, removed].sum(dim=(2, 3)) @ constant
+        if is_conv_bn(consumer):
+            consumer.bn.running_mean.data -= shift
+        else:
+            if new_target.bias is None:
+                new_target.bias = nn.Parameter(torch.zeros(target.out_channels))
+            new_target.bias.data += shift
+
+    if is_conv_bn(consumer):
+        consumer.conv = new_target
+    else:
+        return new_target
+    return None
+
+
+def prune_model(net, ratio=PRUNE_RATIO, round_to=CHANNEL_ROUND):
+    """
+    Poda global: un solo umbral de gamma para todos los pares
+
+    Returns:
+        list: [{'layer', 'before', 'after'}, ...]
+    """
+    import torch
+
+    pairs = find_prunable_pairs(net)
+    if not pairs:
+        return []
+
+    gammas = torch.cat([producer.bn.weight.data.abs().flatten() for _, producer, _ in pairs])
+    threshold = torch.quantile(gammas, ratio).item() if ratio > 0 else -1.0
+
+    # Los Conv2d finales de Detect están dentro de un Sequential: hay que reemplazarlos ahí
+    parents = {}
+    for module in net.modules():
+        if isinstance(module, torch.nn.Sequential):
+            for index, child in enumerate(module):
+                parents[id(child)] = (module, index)
+
+    report = []
+    for name, producer, consumer in pairs:
+        gamma = producer.bn.weight.data.abs()
+        channels = len(gamma)
+        count = int((gamma > threshold).sum())
+        count = min(channels, max(round_to, math.ceil(count / round_to) * round_to))
+        if count == channels:
+            continue
+
+        keep = torch.sort(torch.argsort(gamma, descending=True)[:count]).values
+        replacement = prune_pair(producer, consumer, keep)
+        if replacement is not None:
+            sequence, index = parents[id(consumer)]
+            sequence[index] = replacement
+        report.append({'layer': name, 'before': channels, 'after': count})
+    return report
+
+
+def measure(model_path, imgsz, data, threads):
+    """Parámetros, latencia p50 en CPU y mAP de un modelo"""
+    model = YOLO(model_path)
+    params = sum(p.numel() for p in model.model.parameters())
+    bench_args = argparse.Namespace(images=str(DEFAULT_IMAGES), video=None, max_images=32,
+                                    warmup=3, iterations=30)
+    timing = run_combination(model_path, imgsz, 1, threads, bench_args)
+    return {
+        'model': model_path,
+        'params': params,
+        'file_size_bytes': os.path.getsize(model_path),
+        'latency_ms': timing.get('latency_ms', {}).get('p50'),
+        **evaluate(model_path, imgsz, data, 16),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poda estructurada de canales y re-entrenamiento")
+    parser.add_argument("--model", default=MODEL_PATH, help="Modelo .pt a podar")
+    parser.add_argument("--ratio", type=float, default=PRUNE_RATIO,
+                        help="Fracción de canales podables a quitar")
+    parser.add_argument("--epochs", type=int, default=30, help="Épocas de re-entrenamiento")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamaño de entrada")
+    parser.add_argument("--data", default=str(YOLO_DATASET_DIR / "data.yaml"), help="data.yaml")
+    parser.add_argument("--device", default="cpu", help="Dispositivo de entrenamiento")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                        help="Hilos de CPU para medir latencia")
+    parser.add_argument("--no-export", action="store_true", help="No exportar el modelo podado")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("PODA ESTRUCTURADA DE CANALES")
+    print("=" * 60)
+
+    print("Midiendo el modelo original...")
+    before = measure(args.model, args.imgsz, args.data, args.threads)
+
+    model = YOLO(args.model)
+    net = model.model.float()
+    layers = prune_model(net, args.ratio)
+    pruned_params = sum(p.numel() for p in net.parameters())
+    print(f"✓ Podadas {len(layers)} capas: {before['params']:,} -> {pruned_params:,} parámetros")
+    for layer in layers:
+        print(f"  {layer['layer']}: {layer['before']} -> {layer['after']} canales")
+
+    # Re-entrenamiento: recupera la precisión perdida por la poda
+    PrunedDetectionTrainer.pruned_model = net
+    model.train(data=args.data, epochs=args.epochs, imgsz=args.imgsz, batch=16,
+                device=args.device, name='rubik_pruned', patience=10, seed=42,
+                trainer=PrunedDetectionTrainer)
+    pruned_path = str(model.trainer.best)
+
+    print("\nMidiendo el modelo podado...")
+    after = measure(pruned_path, args.imgsz, args.data, args.threads)
+
+    if not args.no_export:
+        export_model(pruned_path)
+
+    report = {'ratio': args.ratio, 'epochs': args.epochs, 'imgsz': args.imgsz,
+              'layers': layers, 'before': before, 'after': after}
+    report_path = Path(pruned_path).with_name("prune_report.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print("RESULTADO")
+    print("=" * 60)
+    for key, label in (('params', 'Parámetros'), ('latency_ms', 'Latencia p50 (ms)'),
+                       ('map50', 'mAP50'), ('map50_95', 'mAP50-95')):
+        print(f"  {label:<18} {before[key]!s:>12} -> {after[key]!s:>12}")
+    print(f"\nModelo podado: {pruned_path}")
+    print(f"Reporte: {report_path}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Consultas sobre los eventos de detección guardados por main.py
+Usa el índice de cada segmento para leer solo los lotes del rango pedido.
+
+Uso:
+    python scripts/query_events.py --per-minute --last 60
+    python scripts/query_events.py --from "2026-10-19 14:00" --to "2026-10-19 14:05"
+    python scripts/query_events.py --per-minute --type appeared --camera /dev/video0
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from dataset_utils import PROJECT_ROOT
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, str(PROJECT_ROOT))
+import config
+from event_store import EventReader, EVENT_APPEARED, EVENT_DETECTION, EVENT_LOST
+
+
+def parse_time(text):
+    """Segundos desde epoch a partir de 'YYYY-MM-DD HH:MM[:SS]' o de un número"""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultar eventos de detección")
+    parser.add_argument("--dir", default=str(PROJECT_ROOT / config.EVENTS_DIR),
+                        help="Carpeta de los segmentos de eventos")
+    parser.add_argument("--from", dest="start", type=parse_time, default=None,
+                        help="Desde (fecha/hora local o segundos desde epoch)")
+    parser.add_argument("--to", dest="end", type=parse_time, default=None,
+                        help="Hasta (fecha/hora local o segundos desde epoch)")
+    parser.add_argument("--last", type=float, default=None,
+                        help="Solo los últimos N minutos (en lugar de --from)")
+    parser.add_argument("--camera", default=None, help="Solo eventos de esta cámara")
+    parser.add_argument("--type", default=None, choices=[EVENT_APPEARED, EVENT_DETECTION, EVENT_LOST],
+                        help="Solo eventos de este tipo")
+    parser.add_argument("--per-minute", action="store_true", help="Contar eventos por minuto")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de eventos a mostrar")
+    parser.add_argument("--json", action="store_true", help="Un evento JSON por línea")
+    args = parser.parse_args()
+
+    start = time.time() - args.last * 60 if args.last else args.start
+    reader = EventReader(args.dir)
+
+    if args.per_minute:
+        counts = reader.counts_per_minute(start, args.end, args.camera, args.type)
+        for minute, count in counts.items():
+            print(f"{format_time(minute)[:16]}  {count:>7}")
+        print(f"Total: {sum(counts.values())} eventos en {len(counts)} minutos")
+        return
+
+    shown = 0
+    for event in reader.events(start, args.end, args.camera, args.type):
+        if args.limit is not None and shown >= args.limit:
+            break
+        if args.json:
+            print(json.dumps(event))
+        else:
+            bbox = event.get('bbox')
+            print(f"{format_time(event['t'])}  {event['camera']:<16} {event['type']:<10} "
+                  f"track {event.get('track', '-'):<5} conf {event.get('conf', '-'):<6} "
+                  f"{bbox if bbox else ''}")
+        shown += 1
+    if not args.json:
+        print(f"{shown} eventos")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,141 +1,325 @@
 """
 Script para revisar y limpiar etiquetas incorrectas
 Muestra cada imagen etiquetada y permite eliminar las que están mal
+
+Con --grid muestra páginas de miniaturas con todas las cajas de cada etiqueta;
+un clic marca/desmarca una imagen para eliminar.
 """
+import argparse
 import cv2
-import os
 import glob
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dataset_utils import IMAGES_DIR, LABELS_DIR, read_yolo_labels
+
+# Configuración
+IMAGES_FOLDER = str(IMAGES_DIR)
+LABELS_FOLDER = str(LABELS_DIR)
+WINDOW_NAME = "Revision de Etiquetas"
+CACHE_SIZE = 256     # Imágenes decodificadas que se guardan en memoria
+WAIT_MS = 30
+COLOR_OK = (0, 255, 0)
+COLOR_DELETE = (0, 0, 255)
+
+
+class LRUImageCache:
+    """Caché LRU de imágenes decodificadas, con carga en paralelo"""
+
+    def __init__(self, capacity=CACHE_SIZE, thumb_size=None, workers=8):
+        """
+        Args:
+            capacity: Máximo de imágenes en memoria
+            thumb_size: Si se indica, se guardan miniaturas de ese ancho máximo
+            workers: Hilos para decodificar
+        """
+        self.capacity = capacity
+        self.thumb_size = thumb_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def _load(self, path):
+        image = cv2.imread(path)
+        if image is not None and self.thumb_size:
+            height, width = image.shape[:2]
+            scale = self.thumb_size / max(height, width)
+            image = cv2.resize(image, (int(width * scale), int(height * scale)),
+                               interpolation=cv2.INTER_AREA)
+        return image
+
+    def _store(self, path, image):
+        with self.lock:
+            self.items[path] = image
+            self.items.move_to_end(path)
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+
+    def get(self, path):
+        """Imagen decodificada (desde la caché si ya está)"""
+        with self.lock:
+            if path in self.items:
+                self.items.move_to_end(path)
+                return self.items[path]
+        image = self._load(path)
+        self._store(path, image)
+        return image
+
+    def get_many(self, paths):
+        """Decodifica en paralelo las imágenes que faltan y las retorna en orden"""
+        with self.lock:
+            missing = [path for path in paths if path not in self.items]
+        for path, image in zip(missing, self.pool.map(self._load, missing)):
+            self._store(path, image)
+        return [self.get(path) for path in paths]
+
+    def prefetch(self, paths):
+        """Carga imágenes en segundo plano (para la página siguiente)"""
+        with self.lock:
+            missing = [path for path in paths if path not in self.items]
+        for path in missing:
+            self.pool.submit(lambda p=path: self._store(p, self._load(p)))
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+
+def image_for_label(label_path):
+    """Ruta de la imagen que corresponde a un archivo de etiquetas"""
+    label_name = os.path.splitext(os.path.basename(label_path))[0]
+    return f"{IMAGES_FOLDER}/{label_name}.jpg"
+
+
+def draw_boxes(img, labels, color, thickness=2):
+    """Dibuja todas las cajas YOLO (normalizadas) sobre la imagen"""
+    img_h, img_w = img.shape[:2]
+    for _, x_center, y_center, width, height in labels:
+        # Convertir a coordenadas de píxeles
+        x_min = int((x_center - width / 2) * img_w)
+        y_min = int((y_center - height / 2) * img_h)
+        x_max = int((x_center + width / 2) * img_w)
+        y_max = int((y_center + height / 2) * img_h)
+        cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, thickness)
+
+
+def delete_marked(deleted_labels):
+    """Elimina las etiquetas marcadas"""
+    if deleted_labels:
+        print(f"\nEliminando {len(deleted_labels)} etiquetas...")
+        for label_to_delete in deleted_labels:
+            if os.path.exists(label_to_delete):
+                os.remove(label_to_delete)
+                print(f"✗ Eliminada: {os.path.basename(label_to_delete)}")
+
+
+def review_single(label_files, deleted_labels):
+    """Revisión de una imagen a la vez"""
+    cache = LRUImageCache()
+    labels_cache = {}
 
-def review_labels():
-    """Revisa las etiquetas y permite eliminar las incorrectas"""
-    print("=" * 60)
-    print("REVISIÓN DE ETIQUETAS")
-    print("=" * 60)
-    print("Instrucciones:")
-    print("  - Presiona 'd' para MARCAR/DESMARCAR para eliminar")
-    print("  - Presiona ESPACIO o 'n' para ir a la SIGUIENTE imagen")
-    print("  - Presiona 'p' para ir a la imagen ANTERIOR")
-    print("  - Presiona 'q' para SALIR y eliminar las marcadas")
-    print("=" * 60)
-    
-    # Obtener todas las etiquetas
-    label_files = sorted(glob.glob("dataset/labels/*.txt"))
-    
-    if len(label_files) == 0:
-        print("No hay etiquetas para revisar")
-        return
-    
-    print(f"\nTotal de etiquetas: {len(label_files)}\n")
-    
-    # Conjunto para guardar las marcadas para eliminar
-    deleted_labels = set()
-    
     idx = 0
     while idx >= 0 and idx < len(label_files):
         label_path = label_files[idx]
-        
-        # Nombre de la imagen
-        label_name = os.path.basename(label_path).replace('.txt', '')
-        image_path = f"dataset/con_cubo/{label_name}.jpg"
-        
-        # Verificar que la imagen existe
-        if not os.path.exists(image_path):
+        label_name = os.path.splitext(os.path.basename(label_path))[0]
+        image_path = image_for_label(label_path)
+
+        # Cargar imagen (desde la caché si ya la vimos)
+        base_img = cache.get(image_path)
+        if base_img is None:
             print(f"[{idx+1}/{len(label_files)}] Imagen no encontrada: {image_path}")
             idx += 1
             continue
-        
-        # Cargar imagen
-        img = cv2.imread(image_path)
-        
-        # Leer etiqueta y dibujar rectángulo
-        with open(label_path, 'r') as f:
-            line = f.readline().strip()
-            if line:
-                # Formato YOLO: class x_center y_center width height (normalizado)
-                parts = line.split()
-                x_center = float(parts[1])
-                y_center = float(parts[2])
-                width = float(parts[3])
-                height = float(parts[4])
-                
-                # Convertir a coordenadas de píxeles
-                img_h, img_w = img.shape[:2]
-                x_min = int((x_center - width/2) * img_w)
-                y_min = int((y_center - height/2) * img_h)
-                x_max = int((x_center + width/2) * img_w)
-                y_max = int((y_center + height/2) * img_h)
-                
-                # Color del rectángulo: rojo si está marcada para eliminar, verde si no
-                color = (0, 0, 255) if label_path in deleted_labels else (0, 255, 0)
-                cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, 2)
-        
+
+        # Precargamos la siguiente mientras revisas esta
+        if idx + 1 < len(label_files):
+            cache.prefetch([image_for_label(label_files[idx + 1])])
+
+        if label_path not in labels_cache:
+            labels_cache[label_path] = read_yolo_labels(label_path)
+
+        img = base_img.copy()
+
+        # Color del rectángulo: rojo si está marcada para eliminar, verde si no
+        marked = label_path in deleted_labels
+        draw_boxes(img, labels_cache[label_path], COLOR_DELETE if marked else COLOR_OK)
+
         # Mostrar información
-        status = " [MARCADA PARA ELIMINAR]" if label_path in deleted_labels else ""
+        status = " [MARCADA PARA ELIMINAR]" if marked else ""
         info = f"[{idx+1}/{len(label_files)}] {label_name}{status}"
         text_color = (0, 0, 255) if status else (255, 255, 255)
         cv2.putText(img, info, (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, text_color, 2)
-        
+
         instrucciones = "D: Marcar/Desmarcar | ESPACIO/N: Siguiente | P: Anterior | Q: Salir"
         cv2.putText(img, instrucciones, (10, img.shape[0] - 20),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
-        # Mostrar imagen
-        cv2.imshow("Revision de Etiquetas", img)
-        
+
+        cv2.imshow(WINDOW_NAME, img)
+
         # Esperar tecla
         key = cv2.waitKey(0) & 0xFF
-        
-        # D - Marcar/Desmarcar para eliminar
+
+        # D - Marcar/Desmarcar para eliminar (se redibuja desde la caché)
         if key == ord('d') or key == ord('D'):
-            if label_path in deleted_labels:
-                # Si ya estaba marcada, desmarcarla
+            if marked:
                 deleted_labels.remove(label_path)
                 print(f"↶ Desmarcada: {label_name}")
             else:
-                # Si no estaba marcada, marcarla
                 deleted_labels.add(label_path)
                 print(f"✗ Marcada para eliminar: {label_name}")
-            # No avanzar, solo redibujar para mostrar el cambio
-            continue
-        
-        # ESPACIO o flecha derecha - Siguiente
+
+        # ESPACIO o 'n' - Siguiente
         elif key == ord(' ') or key == ord('n') or key == ord('N'):
             print(f"→ {label_name}")
             idx += 1
-        
-        # Flecha izquierda o 'p' (previous) - Anterior  
+
+        # 'p' (previous) - Anterior
         elif key == ord('p') or key == ord('P'):
             if idx > 0:
                 idx -= 1
                 print(f"← Volviendo")
             else:
                 print("Ya estás en la primera imagen")
-        
-        # Q - Salir y eliminar marcadas
+
+        # Q - Salir
+        elif key == ord('q') or key == ord('Q'):
+            break
+
+    cache.close()
+
+
+def review_grid(label_files, deleted_labels, cols=4, rows=3, thumb_size=240):
+    """Revisión por páginas de miniaturas"""
+    cache = LRUImageCache(thumb_size=thumb_size)
+    labels_cache = {}
+    per_page = cols * rows
+    total_pages = (len(label_files) + per_page - 1) // per_page
+    state = {'page': 0, 'redraw': True}
+
+    def page_items(page):
+        return label_files[page * per_page:(page + 1) * per_page]
+
+    def on_mouse(event, x, y, flags, param):
+        # Clic en una miniatura: marcar/desmarcar
+        if event == cv2.EVENT_LBUTTONDOWN:
+            col, row = x // thumb_size, y // thumb_size
+            position = row * cols + col
+            items = page_items(state['page'])
+            if col < cols and position < len(items):
+                label_path = items[position]
+                if label_path in deleted_labels:
+                    deleted_labels.remove(label_path)
+                else:
+                    deleted_labels.add(label_path)
+                state['redraw'] = True
+
+    cv2.namedWindow(WINDOW_NAME)
+    cv2.setMouseCallback(WINDOW_NAME, on_mouse)
+
+    while True:
+        items = page_items(state['page'])
+
+        if state['redraw']:
+            state['redraw'] = False
+            thumbs = cache.get_many([image_for_label(path) for path in items])
+
+            # Precargamos la página siguiente en segundo plano
+            if state['page'] + 1 < total_pages:
+                cache.prefetch([image_for_label(path) for path in page_items(state['page'] + 1)])
+
+            canvas = np.zeros((rows * thumb_size + 40, cols * thumb_size, 3), dtype=np.uint8)
+            for position, (label_path, thumb) in enumerate(zip(items, thumbs)):
+                row, col = divmod(position, cols)
+                y0, x0 = row * thumb_size, col * thumb_size
+                if thumb is None:
+                    cv2.putText(canvas, "sin imagen", (x0 + 10, y0 + thumb_size // 2),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+                    continue
+
+                if label_path not in labels_cache:
+                    labels_cache[label_path] = read_yolo_labels(label_path)
+
+                tile = thumb.copy()
+                marked = label_path in deleted_labels
+                draw_boxes(tile, labels_cache[label_path], COLOR_DELETE if marked else COLOR_OK, 1)
+                if marked:
+                    cv2.rectangle(tile, (0, 0), (tile.shape[1] - 1, tile.shape[0] - 1), COLOR_DELETE, 4)
+                canvas[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+
+            info = (f"Pagina {state['page']+1}/{total_pages} | Marcadas: {len(deleted_labels)} | "
+                    f"Clic: marcar | A/U: marcar/desmarcar pagina | N/P: pagina | Q: salir")
+            cv2.putText(canvas, info, (10, rows * thumb_size + 25),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+            cv2.imshow(WINDOW_NAME, canvas)
+
+        key = cv2.waitKey(WAIT_MS) & 0xFF
+
+        if key == ord(' ') or key == ord('n') or key == ord('N'):
+            if state['page'] + 1 < total_pages:
+                state['page'] += 1
+                state['redraw'] = True
+        elif key == ord('p') or key == ord('P'):
+            if state['page'] > 0:
+                state['page'] -= 1
+                state['redraw'] = True
+        # A - Marcar toda la página
+        elif key == ord('a') or key == ord('A'):
+            deleted_labels.update(items)
+            state['redraw'] = True
+        # U - Desmarcar toda la página
+        elif key == ord('u') or key == ord('U'):
+            deleted_labels.difference_update(items)
+            state['redraw'] = True
         elif key == ord('q') or key == ord('Q'):
-            cv2.destroyAllWindows()
-            
-            # Eliminar las etiquetas marcadas
-            if deleted_labels:
-                print(f"\nEliminando {len(deleted_labels)} etiquetas...")
-                for label_to_delete in deleted_labels:
-                    if os.path.exists(label_to_delete):
-                        os.remove(label_to_delete)
-                        print(f"✗ Eliminada: {os.path.basename(label_to_delete)}")
-            
-            print(f"\nTotal eliminadas: {len(deleted_labels)}")
-            return
-    
+            break
+
+    cache.close()
+
+
+def review_labels(grid=False, cols=4, rows=3, thumb_size=240):
+    """Revisa las etiquetas y permite eliminar las incorrectas"""
+    print("=" * 60)
+    print("REVISIÓN DE ETIQUETAS")
+    print("=" * 60)
+    print("Instrucciones:")
+    if grid:
+        print("  - Haz clic en una miniatura para MARCAR/DESMARCAR para eliminar")
+        print("  - Presiona 'a' / 'u' para marcar / desmarcar toda la página")
+        print("  - Presiona ESPACIO o 'n' para ir a la SIGUIENTE página")
+        print("  - Presiona 'p' para ir a la página ANTERIOR")
+    else:
+        print("  - Presiona 'd' para MARCAR/DESMARCAR para eliminar")
+        print("  - Presiona ESPACIO o 'n' para ir a la SIGUIENTE imagen")
+        print("  - Presiona 'p' para ir a la imagen ANTERIOR")
+    print("  - Presiona 'q' para SALIR y eliminar las marcadas")
+    print("=" * 60)
+
+    # Obtener todas las etiquetas
+    label_files = sorted(glob.glob(f"{LABELS_FOLDER}/*.txt"))
+
+    if len(label_files) == 0:
+        print("No hay etiquetas para revisar")
+        return
+
+    print(f"\nTotal de etiquetas: {len(label_files)}\n")
+
+    # Conjunto para guardar las marcadas para eliminar
+    deleted_labels = set()
+
+    if grid:
+        review_grid(label_files, deleted_labels, cols, rows, thumb_size)
+    else:
+        review_single(label_files, deleted_labels)
+
     cv2.destroyAllWindows()
-    
+
     # Eliminar las etiquetas marcadas al final
-    if deleted_labels:
-        print(f"\nEliminando {len(deleted_labels)} etiquetas...")
-        for label_to_delete in deleted_labels:
-            if os.path.exists(label_to_delete):
-                os.remove(label_to_delete)
-    
+    delete_marked(deleted_labels)
+
     print("\n" + "=" * 60)
     print("REVISIÓN COMPLETADA")
     print("=" * 60)
@@ -145,4 +329,10 @@ def review_labels():
 
 
 if __name__ == "__main__":
-    review_labels()
+    parser = argparse.ArgumentParser(description="Revisar etiquetas YOLO")
+    parser.add_argument("--grid", action="store_true", help="Vista de miniaturas por páginas")
+    parser.add_argument("--cols", type=int, default=4, help="Columnas de la cuadrícula")
+    parser.add_argument("--rows", type=int, default=3, help="Filas de la cuadrícula")
+    parser.add_argument("--thumb", type=int, default=240, help="Tamaño de cada miniatura")
+    args = parser.parse_args()
+    review_labels(args.grid, args.cols, args.rows, args.thumb)
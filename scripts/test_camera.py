@@ -1,48 +1,62 @@
 """
-Script para detectar qué índice de cámara funciona
-Prueba todos los índices posibles y muestra cuáles abren correctamente
+Script para detectar qué cámaras funcionan
+Prueba todos los dispositivos en paralelo y guarda el inventario en disco,
+así config.CAMERA_NAME puede usar el nombre de la cámara en vez del índice
 """
-import cv2
-
-print("Probando índices de cámara...")
-print("=" * 50)
-
-# Probamos índices del 0 al 20
-working_cameras = []
-
-for index in range(20):
-    # Intentamos abrir la cámara
-    cap = cv2.VideoCapture(index)
-    
-    # Verificamos si se abrió correctamente
-    if cap.isOpened():
-        # Intentamos leer un frame para confirmar que funciona
-        ret, frame = cap.read()
-        
-        if ret:
-            # Obtenemos información de la cámara
-            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            
-            print(f"✓ Índice {index}: FUNCIONA")
-            print(f"  Resolución: {int(width)}x{int(height)}")
-            print(f"  FPS: {fps}")
-            print()
-            
-            working_cameras.append(index)
-        else:
-            print(f"✗ Índice {index}: Se abrió pero no captura frames")
-        
-        # Liberamos la cámara
-        cap.release()
+import argparse
+import os
+import sys
+
+# Permite importar los módulos de la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from camera_discovery import get_inventory, PROBE_TIMEOUT
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventario de cámaras")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignorar el caché y volver a probar todas las cámaras")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT,
+                        help="Segundos máximos por cámara")
+    args = parser.parse_args()
+
+    print("Probando cámaras en paralelo...")
+    print("=" * 50)
+
+    inventory = get_inventory(refresh=args.refresh, timeout=args.timeout)
+
+    working_cameras = []
+
+    for key, info in sorted(inventory.items()):
+        device = info['device']
+        identity = info.get('identity', {})
+        name = identity.get('name') or "?"
+
+        if info['status'] != 'ok':
+            print(f"✗ {device} ({name}): {info['status']}")
+            continue
+
+        print(f"✓ {device}: FUNCIONA")
+        print(f"  Nombre: {name}")
+        if identity.get('usb_id'):
+            print(f"  USB: {identity['usb_id']} {identity.get('serial', '')}")
+        print(f"  Resolución: {info['width']}x{info['height']}")
+        print(f"  FPS: {info['fps']}")
+        formats = ", ".join(f['fourcc'] for f in info.get('formats', []))
+        print(f"  Formatos: {formats or info.get('fourcc') or '?'}")
+        print()
+
+        working_cameras.append((device, name))
+
+    print("=" * 50)
+    print(f"\nCámaras funcionales encontradas: {[device for device, _ in working_cameras]}")
+
+    if working_cameras:
+        device, name = working_cameras[0]
+        print(f"\nPrueba usar en config.py: CAMERA_NAME = \"{name}\"  (dispositivo {device})")
     else:
-        print(f"✗ Índice {index}: No se pudo abrir")
+        print("\nNo se encontraron cámaras funcionales")
 
-print("=" * 50)
-print(f"\nCámaras funcionales encontradas: {working_cameras}")
 
-if working_cameras:
-    print(f"\nPrueba usar el índice: {working_cameras[0]}")
-else:
-    print("\nNo se encontraron cámaras funcionales")
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,32 @@
 Script para entrenar el modelo YOLO con el dataset de cubos de Rubik
 """
 from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer
+import argparse
 import os
 
-def train():
-    """Entrena el modelo YOLOv8 con nuestro dataset"""
+from image_cache import ImageCache, attach_to_dataset, build_cache
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    """Trainer que lee las imágenes desde la caché pre-decodificada (image_cache.py)"""
+
+    # Índice de la caché; se asigna antes de entrenar
+    cache_index = None
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        dataset = super().build_dataset(img_path, mode, batch)
+        return attach_to_dataset(dataset, ImageCache(self.cache_index))
+
+
+def train(use_cache=False):
+    """
+    Entrena el modelo YOLOv8 con nuestro dataset
+
+    Args:
+        use_cache: Leer las imágenes de la caché memory-mapped en vez de
+            decodificar los JPEG en cada época
+    """
     print("=" * 60)
     print("ENTRENAMIENTO DE MODELO YOLO - DETECTOR DE CUBO RUBIK")
     print("=" * 60)
@@ -27,6 +49,14 @@ def train():
     print()
     
     # Entrenar el modelo
+    # Caché de imágenes pre-decodificadas (se crea o reutiliza)
+    trainer = None
+    if use_cache:
+        CachedDetectionTrainer.cache_index = str(build_cache(imgsz=640))
+        trainer = CachedDetectionTrainer
+        print(f"  - Caché de imágenes: {CachedDetectionTrainer.cache_index}")
+        print()
+    
     print("Iniciando entrenamiento...")
     print("Esto puede tomar entre 30 minutos a 2 horas dependiendo de tu hardware.")
     print("=" * 60)
@@ -46,6 +76,7 @@ def train():
         verbose=True,                    # Mostrar progreso detallado
         seed=42,                         # Semilla para reproducibilidad
         val=True,                        # Validar durante el entrenamiento
+        trainer=trainer,                 # None = trainer normal de ultralytics
     )
     
     print("\n" + "=" * 60)
@@ -70,4 +101,8 @@ def train():
 
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Entrenar detector de cubo Rubik")
+    parser.add_argument("--image-cache", action="store_true",
+                        help="Usar la caché de imágenes pre-decodificadas (image_cache.py)")
+    args = parser.parse_args()
+    train(args.image_cache)
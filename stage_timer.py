@@ -0,0 +1,154 @@
+"""
+Medición de tiempos por etapa del loop de detección
+Cronómetros monotónicos (time.perf_counter) y ventanas circulares
+reservadas al crear el objeto: medir un frame no reserva memoria. Sirve
+para saber si un equipo lento está limitado por la cámara o por el modelo.
+
+Uso:
+    timer = StageTimer()
+    while True:
+        timer.start_frame()
+        frame = camera.read();        timer.lap('capture')
+        results = model(frame);       timer.lap('inference')
+        ...
+        timer.end_frame()
+    timer.report()
+"""
+import time
+
+# Etapas del loop (en orden) y su nombre en pantalla
+STAGES = ('capture', 'preprocess', 'inference', 'postprocess', 'render', 'display')
+STAGE_NAMES = {
+    'capture': "captura",
+    'preprocess': "preproceso",
+    'inference': "inferencia",
+    'postprocess': "postproceso",
+    'render': "dibujo",
+    'display': "pantalla",
+}
+
+
+class RollingWindow:
+    """Últimos `size` valores en una lista de tamaño fijo"""
+
+    def __init__(self, size=120):
+        self.values = [0.0] * size
+        self.size = size
+        self.count = 0
+        self._next = 0
+
+    def add(self, value):
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def percentile(self, p):
+        """Percentil p (0-100) por rango más cercano (None si está vacía)"""
+        if not self.count:
+            return None
+        ordered = sorted(self.values[:self.count])
+        return ordered[min(self.count - 1, int(round(p / 100 * (self.count - 1))))]
+
+    def mean(self):
+        if not self.count:
+            return None
+        return sum(self.values[:self.count]) / self.count
+
+
+class StageTimer:
+    """
+    Tiempos por etapa y FPS reales sobre una ventana de frames
+
+    Los tiempos de una etapa que se mide varias veces en el mismo frame se
+    suman; las etapas que no se ejecutaron en un frame (por ejemplo la
+    inferencia en un frame saltado) no cuentan para sus percentiles.
+
+    Args:
+        stages: Nombres de las etapas
+        window: Frames que se recuerdan por etapa
+        refresh: Cada cuántos frames se recalculan los textos de pantalla
+    """
+
+    def __init__(self, stages=STAGES, window=120, refresh=10):
+        self.stages = tuple(stages)
+        self.windows = {stage: RollingWindow(window) for stage in self.stages}
+        self.frame_ms = RollingWindow(window)  # Intervalo entre inicios de frame
+        self.refresh = refresh
+        self.frames = 0
+        self._current = dict.fromkeys(self.stages, 0.0)
+        self._ran = set()
+        self._mark = None
+        self._frame_start = None
+        self._lines = []
+
+    def start_frame(self):
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self.frame_ms.add((now - self._frame_start) * 1000)
+        self._frame_start = self._mark = now
+
+    def lap(self, stage):
+        """Asigna a `stage` el tiempo desde la última marca"""
+        now = time.perf_counter()
+        self._current[stage] += (now - self._mark) * 1000
+        self._ran.add(stage)
+        self._mark = now
+
+    def move(self, from_stage, to_stage, ms):
+        """
+        Pasa parte del tiempo de una etapa a otra
+
+        Sirve para repartir una llamada medida de una vez, por ejemplo el
+        preproceso y postproceso que ultralytics informa en result.speed.
+        """
+        ms = min(ms, self._current[from_stage])
+        self._current[from_stage] -= ms
+        self._current[to_stage] += ms
+        self._ran.add(to_stage)
+
+    def end_frame(self):
+        for stage in self._ran:
+            self.windows[stage].add(self._current[stage])
+            self._current[stage] = 0.0
+        self._ran.clear()
+        self.frames += 1
+
+    @property
+    def fps(self):
+        """FPS reales (según el intervalo medio entre frames)"""
+        mean = self.frame_ms.mean()
+        return 1000.0 / mean if mean else 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict: {etapa: {'p50', 'p95', 'mean', 'count'}} de las etapas medidas
+        """
+        stats = {}
+        for stage in self.stages:
+            window = self.windows[stage]
+            if window.count:
+                stats[stage] = {'p50': window.percentile(50), 'p95': window.percentile(95),
+                                'mean': window.mean(), 'count': window.count}
+        return stats
+
+    def overlay_lines(self):
+        """Textos para la pantalla (se recalculan cada `refresh` frames)"""
+        if not self._lines or self.frames % self.refresh == 0:
+            self._lines = [f"FPS: {self.fps:.1f}"] + [
+                f"{STAGE_NAMES.get(stage, stage)}: p50 {s['p50']:.1f} / p95 {s['p95']:.1f} ms"
+                for stage, s in self.stats().items()]
+        return self._lines
+
+    def report(self):
+        """Imprime la tabla de tiempos (al salir)"""
+        stats = self.stats()
+        if not stats:
+            return
+        print(f"\n⏱️  Tiempos por etapa (últimos {self.frame_ms.size} frames, "
+              f"{self.frames} en total) - FPS reales: {self.fps:.1f}")
+        print(f"   {'etapa':<12} {'p50':>8} {'p95':>8} {'media':>8}")
+        for stage, s in stats.items():
+            print(f"   {STAGE_NAMES.get(stage, stage):<12} {s['p50']:>6.1f}ms "
+                  f"{s['p95']:>6.1f}ms {s['mean']:>6.1f}ms")
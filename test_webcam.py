@@ -1,12 +1,22 @@
 """
 Script para probar el modelo YOLO entrenado con la webcam en tiempo real
 """
+import argparse
 import cv2
 from ultralytics import YOLO
 import config
+from frame_sources import open_source, PACING_REALTIME, PACING_FAST
+from stage_timer import StageTimer
 
 def main():
     """Función principal para probar el modelo con webcam"""
+    parser = argparse.ArgumentParser(description="Prueba del modelo YOLO entrenado")
+    parser.add_argument("--source", default=config.CAMERA_INDEX,
+                        help="Índice de cámara, /dev/videoN, libcamera:N, video o carpeta de imágenes")
+    parser.add_argument("--pacing", default=PACING_REALTIME, choices=[PACING_REALTIME, PACING_FAST],
+                        help="Velocidad de reproducción para videos y carpetas")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("PROBANDO MODELO YOLO CON WEBCAM")
     print("=" * 60)
@@ -19,40 +29,53 @@ def main():
     model = YOLO(model_path)
     print(f"✓ Modelo cargado desde: {model_path}")
     
-    # Abrir cámara
-    print(f"Abriendo cámara {config.CAMERA_INDEX}...")
-    cap = cv2.VideoCapture(config.CAMERA_INDEX)
+    # Abrir cámara (o grabación)
+    print(f"Abriendo fuente {args.source}...")
+    source = open_source(args.source, args.pacing,
+                         width=config.FRAME_WIDTH, height=config.FRAME_HEIGHT)
     
-    if not cap.isOpened():
-        print(f"❌ Error: No se pudo abrir la cámara {config.CAMERA_INDEX}")
+    try:
+        source.start()
+    except Exception as e:
+        print(f"❌ Error: {e}")
         print("Verifica que la cámara esté conectada y el índice sea correcto")
         return
     
-    # Configurar cámara
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.FRAME_HEIGHT)
-    
-    print("✓ Cámara abierta correctamente")
+    print("✓ Fuente abierta correctamente")
     print("\n🔍 Iniciando detección en tiempo real...")
     print("📹 Muestra tu cubo de Rubik a la cámara\n")
     
     frame_count = 0
     total_detections = 0
+    timer = StageTimer()
     
     while True:
+        timer.start_frame()
+
         # Capturar frame
-        ret, frame = cap.read()
+        captured = source.read()
+        timer.lap('capture')
         
-        if not ret:
-            print("❌ Error al capturar frame")
+        if captured is None:
+            if source.is_live:
+                print("❌ Error al capturar frame")
+            else:
+                print("Fin de la grabación")
             break
         
+        frame = captured.image
+        
         frame_count += 1
         
         # Hacer predicción con YOLO cada 3 frames (para optimizar velocidad)
         if frame_count % 3 == 0:
             # Ejecutar detección
             results = model(frame, verbose=False)
+            timer.lap('inference')
+            # ultralytics informa por separado su preproceso y postproceso
+            speed = results[0].speed
+            timer.move('inference', 'preprocess', speed.get('preprocess') or 0.0)
+            timer.move('inference', 'postprocess', speed.get('postprocess') or 0.0)
             
             # Procesar resultados
             if len(results[0].boxes) > 0:
@@ -73,26 +96,35 @@ def main():
                         label = f"Cubo Rubik {confidence:.2f}"
                         cv2.putText(frame, label, (x1, y1 - 10),
                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            timer.lap('postprocess')
         
         # Información en pantalla
         info_text = f"Frame: {frame_count} | Detecciones: {total_detections}"
         cv2.putText(frame, info_text, (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
-        # FPS aproximado
-        fps_text = f"Modelo: YOLO v8 | Camara: {config.CAMERA_INDEX}"
+        # FPS reales (medidos), fuente y tiempos p50/p95 de cada etapa
+        timing_lines = timer.overlay_lines()
+        fps_text = f"{timing_lines[0]} | Modelo: YOLO v8 | Fuente: {args.source}"
         cv2.putText(frame, fps_text, (10, 60),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        for i, line in enumerate(timing_lines[1:]):
+            cv2.putText(frame, line, (10, 80 + i * 20),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
         
         # Instrucciones
         cv2.putText(frame, "Presiona 'Q' para salir", (10, frame.shape[0] - 20),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
+        timer.lap('render')
+        
         # Mostrar frame
         cv2.imshow("YOLO Cubo Rubik - Deteccion en Tiempo Real", frame)
         
         # Verificar tecla presionada
         key = cv2.waitKey(1) & 0xFF
+        timer.lap('display')
+        timer.end_frame()
         if key == ord('q') or key == ord('Q'):
             print(f"\n✅ Saliendo...")
             print(f"📊 Resumen:")
@@ -100,8 +132,10 @@ def main():
             print(f"   - Detecciones totales: {total_detections}")
             break
     
+    timer.report()
+
     # Limpiar
-    cap.release()
+    source.release()
     cv2.destroyAllWindows()
     print("🔚 Programa finalizado")
 
@@ -0,0 +1,155 @@
+"""
+Inferencia por mosaicos (tiles) para cubos pequeños o lejanos
+Divide el frame en mosaicos solapados a resolución nativa, los procesa en
+un solo lote y une las detecciones con NMS o fusión ponderada de cajas
+(WBF). Opcionalmente una pasada rápida a baja resolución sobre el frame
+completo decide qué mosaicos vale la pena evaluar.
+"""
+from tracking import iou
+
+# Formas de unir detecciones de mosaicos solapados
+MERGE_NMS = "nms"
+MERGE_WBF = "wbf"
+
+
+def make_tiles(width, height, tile_size, overlap=0.2):
+    """
+    Mosaicos que cubren todo el frame con solapamiento
+
+    El último mosaico de cada fila/columna se alinea con el borde,
+    así todos tienen el mismo tamaño (bueno para procesarlos en lote).
+
+    Returns:
+        list: [(x1, y1, x2, y2), ...]
+    """
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        step = max(1, int(tile_size * (1 - overlap)))
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    return [(x, y, x + tile_w, y + tile_h) for y in starts(height) for x in starts(width)]
+
+
+def nms(detections, iou_threshold=0.5):
+    """Supresión de no-máximos sobre [(x1, y1, x2, y2, conf), ...]"""
+    kept = []
+    for detection in sorted(detections, key=lambda d: -d[4]):
+        if all(iou(detection, other) < iou_threshold for other in kept):
+            kept.append(detection)
+    return kept
+
+
+def weighted_box_fusion(detections, iou_threshold=0.5):
+    """
+    Fusión ponderada de cajas
+
+    Las cajas que se solapan se promedian pesando por su confianza. Como
+    confianza se usa la mayor del grupo: un cubo cortado por el borde de
+    un mosaico no debe bajar la confianza del que se ve entero en otro.
+    """
+    clusters = []
+    for detection in sorted(detections, key=lambda d: -d[4]):
+        for cluster in clusters:
+            if iou(detection, cluster['box']) >= iou_threshold:
+                cluster['members'].append(detection)
+                total = sum(member[4] for member in cluster['members'])
+                cluster['box'] = tuple(
+                    sum(member[i] * member[4] for member in cluster['members']) / total
+                    for i in range(4))
+                break
+        else:
+            clusters.append({'box': tuple(detection[:4]), 'members': [detection]})
+
+    return [(*cluster['box'], max(member[4] for member in cluster['members']))
+            for cluster in clusters]
+
+
+def boxes_from_result(result, offset_x=0, offset_y=0):
+    """Detecciones de un resultado de ultralytics en coordenadas del frame"""
+    return [(float(x1) + offset_x, float(y1) + offset_y, float(x2) + offset_x,
+             float(y2) + offset_y, float(conf))
+            for (x1, y1, x2, y2), conf in zip(result.boxes.xyxy.tolist(),
+                                               result.boxes.conf.tolist())]
+
+
+class TiledDetector:
+    """
+    Detector que evalúa el frame por mosaicos
+
+    Args:
+        model: Modelo YOLO de ultralytics
+        tile_size: Lado del mosaico en píxeles del frame original
+        overlap: Fracción de solapamiento entre mosaicos vecinos
+        imgsz: Tamaño de entrada del modelo para cada mosaico
+        conf: Confianza mínima de las detecciones
+        merge: MERGE_NMS o MERGE_WBF
+        coarse_imgsz: Tamaño de la pasada rápida (None = evaluar siempre todos)
+        coarse_conf: Confianza mínima de la pasada rápida para elegir mosaicos
+        full_scan_interval: Cada cuántos frames se evalúan todos los mosaicos
+            aunque la pasada rápida no vea nada (cubos demasiado pequeños para ella)
+    """
+
+    def __init__(self, model, tile_size=640, overlap=0.2, imgsz=640, conf=0.25,
+                 merge=MERGE_NMS, iou_threshold=0.5, coarse_imgsz=320, coarse_conf=0.05,
+                 full_scan_interval=10):
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.imgsz = imgsz
+        self.conf = conf
+        self.merge = merge
+        self.iou_threshold = iou_threshold
+        self.coarse_imgsz = coarse_imgsz
+        self.coarse_conf = coarse_conf
+        self.full_scan_interval = full_scan_interval
+        self.frame_count = 0
+        self.last_tiles = 0  # Mosaicos evaluados en el último frame
+        self._tiles = {}     # Caché de mosaicos por tamaño de frame
+
+    def tiles_for(self, width, height):
+        key = (width, height)
+        if key not in self._tiles:
+            self._tiles[key] = make_tiles(width, height, self.tile_size, self.overlap)
+        return self._tiles[key]
+
+    def detect(self, frame):
+        """
+        Detecta cubos en un frame
+
+        Returns:
+            list: [(x1, y1, x2, y2, conf), ...] en coordenadas del frame
+        """
+        height, width = frame.shape[:2]
+        tiles = self.tiles_for(width, height)
+        self.frame_count += 1
+
+        detections = []
+        selected = tiles
+        full_scan = (self.full_scan_interval
+                     and (self.frame_count - 1) % self.full_scan_interval == 0)
+
+        if self.coarse_imgsz and len(tiles) > 1:
+            # Pasada rápida: detecta los cubos grandes y señala dónde mirar
+            coarse = boxes_from_result(self.model(frame, imgsz=self.coarse_imgsz,
+                                                  conf=self.coarse_conf, verbose=False)[0])
+            detections.extend(d for d in coarse if d[4] >= self.conf)
+            if not full_scan:
+                selected = [tile for tile in tiles
+                            if any(d[0] < tile[2] and d[2] > tile[0] and
+                                   d[1] < tile[3] and d[3] > tile[1] for d in coarse)]
+
+        self.last_tiles = len(selected)
+        if selected:
+            # Todos los mosaicos en un solo lote (recortes sin copia)
+            crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in selected]
+            results = self.model(crops, imgsz=self.imgsz, conf=self.conf, verbose=False)
+            for (x1, y1, _, _), result in zip(selected, results):
+                detections.extend(boxes_from_result(result, x1, y1))
+
+        if self.merge == MERGE_WBF:
+            return weighted_box_fusion(detections, self.iou_threshold)
+        return nms(detections, self.iou_threshold)
@@ -0,0 +1,125 @@
+"""
+Seguimiento simple de cajas entre frames por IoU
+Asocia las detecciones de cada frame con las del anterior, así se puede
+saber cuánto mide el cubo seguido o cuándo el detector "parpadea"
+(un cubo seguido desaparece o aparece uno nuevo de la nada)
+"""
+
+
+def iou(a, b):
+    """Intersección sobre unión de dos cajas (x1, y1, x2, y2)"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter)
+
+
+class Track:
+    """Un objeto seguido a lo largo de varios frames"""
+
+    __slots__ = ('track_id', 'box', 'confidence', 'hits', 'misses')
+
+    def __init__(self, track_id, box, confidence):
+        self.track_id = track_id
+        self.box = box
+        self.confidence = confidence
+        self.hits = 1     # Frames en los que se detectó
+        self.misses = 0   # Frames seguidos sin detectarse
+
+    @property
+    def size(self):
+        """Lado mayor de la caja en píxeles"""
+        return max(self.box[2] - self.box[0], self.box[3] - self.box[1])
+
+
+class TrackUpdate:
+    """Resultado de asociar las detecciones de un frame con los tracks"""
+
+    __slots__ = ('matched', 'new', 'missed')
+
+    def __init__(self):
+        self.matched = []  # [(track, detección)]
+        self.new = []      # Detecciones sin track confirmado (posible falso positivo)
+        self.missed = []   # Tracks confirmados sin detección (posible falso negativo)
+
+
+class IoUTracker:
+    """
+    Tracker por IoU con asociación voraz
+
+    Args:
+        iou_threshold: IoU mínimo para considerar que es el mismo objeto
+        max_misses: Frames sin detección antes de olvidar un track
+        min_hits: Detecciones necesarias para confirmar un track
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=5, min_hits=3):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.tracks = []
+        self._next_id = 1
+
+    def confirmed(self):
+        """Tracks con suficientes detecciones"""
+        return [track for track in self.tracks if track.hits >= self.min_hits]
+
+    def update(self, detections):
+        """
+        Asocia las detecciones de un frame
+
+        Args:
+            detections: Lista de (x1, y1, x2, y2, confianza)
+
+        Returns:
+            TrackUpdate
+        """
+        update = TrackUpdate()
+
+        # Todos los pares con IoU suficiente, del más parecido al menos
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, detection in enumerate(detections):
+                overlap = iou(track.box, detection)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, t, d))
+        pairs.sort(reverse=True)
+
+        used_tracks, used_detections = set(), set()
+        for _, t, d in pairs:
+            if t in used_tracks or d in used_detections:
+                continue
+            used_tracks.add(t)
+            used_detections.add(d)
+            track, detection = self.tracks[t], detections[d]
+            was_confirmed = track.hits >= self.min_hits
+            track.box = tuple(detection[:4])
+            track.confidence = detection[4]
+            track.hits += 1
+            track.misses = 0
+            if was_confirmed:
+                update.matched.append((track, detection))
+            else:
+                update.new.append(detection)
+
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.misses += 1
+                if track.hits >= self.min_hits:
+                    update.missed.append(track)
+
+        for d, detection in enumerate(detections):
+            if d not in used_detections:
+                self.tracks.append(Track(self._next_id, tuple(detection[:4]), detection[4]))
+                self._next_id += 1
+                update.new.append(detection)
+
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+        return update
+
+    def reset(self):
+        self.tracks = []